@@ -0,0 +1,302 @@
+"""
+Admission control in front of proof verification.
+
+A garbage proof costs a full verify (a snarkjs spawn, or a pairing check
+natively) every time it is sent.  Two things keep floods of them from eating
+the verify CPU that legitimate logins need:
+
+- InvalidProofCache remembers the digests of proofs already judged invalid,
+  so a replay is rejected after one hash and one dict lookup;
+- LoginAdmission gives each client a token bucket, charged once per login
+  request (a batch is one request) about to be verified; each
+  (hr_id, client) pair a bucket charged only when a proof fails
+  verification, so one address's failures cannot lock a user out; and each
+  hr_id a larger failure bucket across all addresses, so rotating source
+  addresses does not buy unlimited guesses against one account.
+
+The cache only catches exact replays.  A Groth16 proof can be re-randomized
+into endless distinct byte strings, and those are what the buckets are for.
+
+Both store their state in ShardedLRU: N independently locked shards, each an
+OrderedDict for LRU order plus a timing wheel that drops entries once they
+expire, so memory is bounded by ``max_entries`` and idle state goes away
+without scans.  A token bucket that has refilled completely is the same as
+no bucket, so it expires at exactly that moment.  When more keys are live
+than ``max_entries`` (say, a flood from many client addresses), the least
+recently used ones are evicted and start again with a full bucket.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional
+
+
+def _canonical(value):
+    """Numbers as decimal strings, so 5 and "5" give the same digest."""
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, int):
+        return str(value)
+    return value
+
+
+def proof_digest(proof, public_signals) -> bytes:
+    """BLAKE2b-128 of the canonical JSON of (proof, public_signals)."""
+    payload = json.dumps([_canonical(proof), _canonical(public_signals)], sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).digest()
+
+
+class _Shard:
+    """LRU order in an OrderedDict, expiry in a timing wheel; the caller holds ``lock``."""
+
+    __slots__ = ("lock", "entries", "wheel", "tick", "cursor", "max_entries", "evictions", "expirations")
+
+    def __init__(self, max_entries: int, tick: float, slots: int, now: float):
+        self.lock = threading.Lock()
+        self.entries: "OrderedDict[Hashable, list]" = OrderedDict()  # key -> [value, expires]
+        self.wheel: List[set] = [set() for _ in range(slots)]
+        self.tick = tick
+        self.cursor = int(now / tick)
+        self.max_entries = max_entries
+        self.evictions = 0
+        self.expirations = 0
+
+    def _slot(self, expires: float) -> set:
+        return self.wheel[int(expires / self.tick) % len(self.wheel)]
+
+    def advance(self, now: float) -> None:
+        """Drop the expired entries in every wheel slot passed since the last call."""
+        current = int(now / self.tick)
+        steps = min(current - self.cursor, len(self.wheel))
+        for t in range(current - steps + 1, current + 1):
+            slot = self.wheel[t % len(self.wheel)]
+            # Entries more than one revolution ahead stay for the next pass.
+            expired = [key for key in slot if self.entries[key][1] <= now]
+            for key in expired:
+                slot.discard(key)
+                del self.entries[key]
+            self.expirations += len(expired)
+        if current > self.cursor:
+            self.cursor = current
+
+    def get(self, key, now: float):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= now:
+            self._slot(entry[1]).discard(key)
+            del self.entries[key]
+            self.expirations += 1
+            return None
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, value, expires: float) -> None:
+        entry = self.entries.get(key)
+        if entry is not None:
+            self._slot(entry[1]).discard(key)
+            self.entries.move_to_end(key)
+        elif len(self.entries) >= self.max_entries:
+            old_key, (_, old_expires) = self.entries.popitem(last=False)
+            self._slot(old_expires).discard(old_key)
+            self.evictions += 1
+        self.entries[key] = [value, expires]
+        self._slot(expires).add(key)
+
+
+class ShardedLRU:
+    def __init__(self, max_entries: int, shards: int = 16, tick: float = 1.0, slots: int = 64, clock=time.monotonic):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        if shards < 1 or shards & (shards - 1):
+            raise ValueError("shards must be a power of two")
+        self.max_entries = max_entries
+        self._clock = clock
+        per_shard = max(1, -(-max_entries // shards))
+        now = clock()
+        self._shards = [_Shard(per_shard, tick, slots, now) for _ in range(shards)]
+        self._mask = shards - 1
+
+    def __len__(self) -> int:
+        return sum(len(shard.entries) for shard in self._shards)
+
+    def shard(self, key) -> _Shard:
+        return self._shards[hash(key) & self._mask]
+
+    def get(self, key):
+        shard = self.shard(key)
+        now = self._clock()
+        with shard.lock:
+            shard.advance(now)
+            return shard.get(key, now)
+
+    def put(self, key, value, ttl: float) -> None:
+        shard = self.shard(key)
+        now = self._clock()
+        with shard.lock:
+            shard.advance(now)
+            shard.put(key, value, now + ttl)
+
+    def clear(self) -> None:
+        for shard in self._shards:
+            with shard.lock:
+                shard.entries.clear()
+                for slot in shard.wheel:
+                    slot.clear()
+
+    def stats(self) -> Dict:
+        return {
+            "entries": len(self),
+            "max_entries": self.max_entries,
+            "evictions": sum(shard.evictions for shard in self._shards),
+            "expirations": sum(shard.expirations for shard in self._shards),
+        }
+
+
+class InvalidProofCache:
+    """Digests of proofs that failed verification, for ``ttl`` seconds each."""
+
+    def __init__(self, max_entries: int = 10_000, ttl: float = 600.0, shards: int = 16):
+        if ttl <= 0:
+            raise ValueError("ttl must be positive")
+        self.ttl = ttl
+        self._entries = ShardedLRU(max_entries, shards)
+        self.hits = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, digest: bytes) -> bool:
+        if self._entries.get(digest) is None:
+            return False
+        self.hits += 1
+        return True
+
+    def add(self, digest: bytes) -> None:
+        self._entries.put(digest, True, self.ttl)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def snapshot(self) -> Dict:
+        return {"ttl": self.ttl, "hits": self.hits, **self._entries.stats()}
+
+
+class TokenBuckets:
+    """One token bucket per key: ``rate`` tokens per second, up to ``burst``."""
+
+    def __init__(self, rate: float, burst: float, max_keys: int = 100_000, shards: int = 16, clock=time.monotonic):
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate must be positive and burst at least 1")
+        self.rate = rate
+        self.burst = float(burst)
+        self._clock = clock
+        self._buckets = ShardedLRU(max_keys, shards, clock=clock)
+        self.denied = 0
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def _tokens(self, shard, key, now) -> float:
+        # Caller holds shard.lock.
+        shard.advance(now)
+        state = shard.get(key, now)
+        if state is None:
+            return self.burst
+        return min(self.burst, state[0] + (now - state[1]) * self.rate)
+
+    def peek(self, key) -> float:
+        """Like take, but without spending the token."""
+        shard = self._buckets.shard(key)
+        now = self._clock()
+        with shard.lock:
+            tokens = self._tokens(shard, key, now)
+        if tokens >= 1.0:
+            return 0.0
+        self.denied += 1
+        return (1.0 - tokens) / self.rate
+
+    def take(self, key) -> float:
+        """Spend one token; 0.0 if one was available, else seconds until there is one."""
+        shard = self._buckets.shard(key)
+        now = self._clock()
+        with shard.lock:
+            tokens = self._tokens(shard, key, now)
+            if tokens >= 1.0:
+                tokens -= 1.0
+                wait = 0.0
+            else:
+                wait = (1.0 - tokens) / self.rate
+                self.denied += 1
+            # Once full again the bucket is indistinguishable from a new one.
+            shard.put(key, (tokens, now), now + (self.burst - tokens) / self.rate)
+        return wait
+
+    def snapshot(self) -> Dict:
+        return {"rate": self.rate, "burst": self.burst, "denied": self.denied, **self._buckets.stats()}
+
+
+class LoginThrottled(RuntimeError):
+    """Too many login attempts for this hr_id or client; ``retry_after`` is in seconds."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LoginAdmission:
+    """
+    Per-client, per-(hr_id, client) and per-hr_id token buckets; a rate of 0
+    turns that side off.  Each process keeps its own buckets, so with several
+    API workers the effective limits are multiplied by the worker count.
+
+    A client spends one token per request.  The user and account buckets are
+    only spent by proofs that failed verification (``failed``): the user
+    bucket is kept per client, so failed attempts from one address never
+    throttle the user elsewhere, and the account bucket, with a larger
+    burst, caps the failures from all addresses together.
+    """
+
+    def __init__(self, user_rate: float = 0.0, user_burst: float = 10.0,
+                 client_rate: float = 0.0, client_burst: float = 50.0,
+                 account_rate: float = 0.0, account_burst: float = 200.0, max_keys: int = 100_000):
+        self.users = TokenBuckets(user_rate, user_burst, max_keys) if user_rate > 0 else None
+        self.clients = TokenBuckets(client_rate, client_burst, max_keys) if client_rate > 0 else None
+        self.accounts = TokenBuckets(account_rate, account_burst, max_keys) if account_rate > 0 else None
+
+    def admit_client(self, client: Optional[str] = None) -> float:
+        """Charge one request to ``client``: 0.0 to go ahead, else seconds to wait."""
+        if self.clients is not None and client is not None:
+            return self.clients.take(client)
+        return 0.0
+
+    def admit_user(self, hr_id: str, client: Optional[str] = None) -> float:
+        """0.0 unless (hr_id, client) or hr_id has used up its failures; spends nothing."""
+        if self.users is not None:
+            wait = self.users.peek((hr_id, client))
+            if wait:
+                return wait
+        if self.accounts is not None:
+            return self.accounts.peek(hr_id)
+        return 0.0
+
+    def failed(self, hr_id: str, client: Optional[str] = None) -> None:
+        """Charge a proof that failed verification to (hr_id, client) and to hr_id."""
+        if self.users is not None:
+            self.users.take((hr_id, client))
+        if self.accounts is not None:
+            self.accounts.take(hr_id)
+
+    def snapshot(self) -> Dict:
+        return {
+            "per_user": self.users.snapshot() if self.users else None,
+            "per_client": self.clients.snapshot() if self.clients else None,
+            "per_account": self.accounts.snapshot() if self.accounts else None,
+        }
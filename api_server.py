@@ -1,14 +1,38 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from typing import Dict, List
-import uvicorn
-from zkp_protocol import Server, Client
+from typing import Dict, List, Optional
+import argparse
+import hmac
+import json
+import logging
+import math
+import threading
+import time
+from admission import InvalidProofCache, LoginAdmission, LoginThrottled
+from user_store import open_store
+from user_transfer import LineSplitter, RegistrationImporter, export_line, export_pages
+from zkp_protocol import CHALLENGE_TTL, Server, Client
 from hash_utils import reduce_to_field
+from metrics import METRICS
+from profiling import MAX_SECONDS, PROFILER, ProfilerBusy, collapsed, flamegraph_svg
+from tracing import TRACER, TraceMiddleware
+from verify_scheduler import QueueFullError, VerificationScheduler
+from zksnark_utils import ARTIFACTS
 import os
 from pathlib import Path
 
+# Library modules log through `logging`; LOG_LEVEL=DEBUG shows their detail.
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "WARNING").upper())
+logger = logging.getLogger(__name__)
+
+# Default location of the user database and chaotic checkpoints, next to this
+# file rather than in whatever directory the server was started from.
+BUILD_DIR = Path(__file__).resolve().parent / "build"
+
 app = FastAPI(
     title="zkSNARK Authentication API",
     description="Passwordless authentication using Zero-Knowledge Proofs",
@@ -22,8 +46,141 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Opens a root span per request while tracing is switched on (/api/admin/tracing).
+app.add_middleware(TraceMiddleware)
+
+# g0 comes from CHAOTIC_SHARDS generator shards derived from a master seed and
+# checkpointed to CHAOTIC_CHECKPOINT, so a restart resumes instead of replaying
+# the same sequence.  With several workers each process claims a worker slot:
+# slot n checkpoints to CHAOTIC_CHECKPOINT.n and takes the next CHAOTIC_SHARDS
+# shard indices after CHAOTIC_SHARD_OFFSET, so no two workers share a
+# trajectory.  0 shards keeps the single in-memory generator.  The shards
+# (and NumPy) are loaded by the startup warm-up or the first g0 request,
+# not on import.
+_chaotic_shards = int(os.environ.get("CHAOTIC_SHARDS", "4"))
+chaotic_source = None
+
+
+def _open_chaotic_source():
+    # Called once, under the Server's lock; the slot's lock file stays open
+    # for the life of the process.
+    global chaotic_source, _worker_slot_fd
+    from chaotic_shards import ShardedChaoticGenerator, claim_worker_slot, worker_checkpoint_path
+
+    master_seed = os.environ.get("CHAOTIC_MASTER_SEED")
+    checkpoint = os.environ.get("CHAOTIC_CHECKPOINT", str(BUILD_DIR / "chaotic_state.json"))
+    worker_slot, _worker_slot_fd = claim_worker_slot(checkpoint)
+    chaotic_source = ShardedChaoticGenerator(
+        master_seed=bytes.fromhex(master_seed) if master_seed else None,
+        shards=_chaotic_shards,
+        checkpoint_path=worker_checkpoint_path(checkpoint, worker_slot),
+        checkpoint_interval=float(os.environ.get("CHAOTIC_CHECKPOINT_INTERVAL", "30")),
+        shard_offset=int(os.environ.get("CHAOTIC_SHARD_OFFSET", "0")) + worker_slot * _chaotic_shards,
+    ).start()
+    return chaotic_source
+
+
+# g0 values are precomputed in the background; 0 generates each one per request.
+# Users live in the SQLite database at USER_DB (shared by all worker
+# processes); USER_DB=memory keeps them in this process only.  USER_INDEX=1
+# (the default where flock exists) puts an mmap hash index in front of it
+# that all workers read without locks.
+# Before a proof is verified, replays of proofs already found invalid are
+# rejected from INVALID_PROOF_CACHE (0 turns it off), and the client address
+# spends a token per login request (a batch is one request).  Each (hr_id,
+# client) pair spends a token per proof that fails verification, so failures
+# from one address cannot lock a user out, and so does the hr_id itself, with
+# a larger burst, so rotating addresses does not give unlimited guesses.
+# LOGIN_RATE_PER_CLIENT, LOGIN_RATE_PER_USER and LOGIN_RATE_PER_ACCOUNT
+# tokens per second, bursts up to the *_BURST values, 0 turns a limit off.
+# Over the limit, logins get 429 with a Retry-After.
+_invalid_cache_size = int(os.environ.get("INVALID_PROOF_CACHE", "10000"))
+server_instance = Server(
+    g0_reservoir_size=int(os.environ.get("G0_RESERVOIR_SIZE", "1024")),
+    chaotic=_open_chaotic_source if _chaotic_shards > 0 else None,
+    store=open_store(
+        os.environ.get("USER_DB", str(BUILD_DIR / "users.db")),
+        shared_index=os.environ.get("USER_INDEX", "1" if os.name == "posix" else "0") == "1",
+    ),
+    invalid_proofs=InvalidProofCache(
+        _invalid_cache_size, ttl=float(os.environ.get("INVALID_PROOF_CACHE_TTL", "600")),
+    ) if _invalid_cache_size > 0 else None,
+    admission=LoginAdmission(
+        user_rate=float(os.environ.get("LOGIN_RATE_PER_USER", "1")),
+        user_burst=float(os.environ.get("LOGIN_BURST_PER_USER", "10")),
+        client_rate=float(os.environ.get("LOGIN_RATE_PER_CLIENT", "10")),
+        client_burst=float(os.environ.get("LOGIN_BURST_PER_CLIENT", "50")),
+        account_rate=float(os.environ.get("LOGIN_RATE_PER_ACCOUNT", "1")),
+        account_burst=float(os.environ.get("LOGIN_BURST_PER_ACCOUNT", "200")),
+        max_keys=int(os.environ.get("LOGIN_RATE_MAX_KEYS", "100000")),
+    ),
+    lazy=True,
+)
+
+# Proof verification runs off the event loop, bounded by these limits; when the
+# wait queue is full, logins get 503 with a Retry-After hint.
+verify_scheduler = VerificationScheduler(
+    max_concurrency=int(os.environ.get("VERIFY_MAX_CONCURRENCY", str(os.cpu_count() or 4))),
+    max_queue=int(os.environ.get("VERIFY_MAX_QUEUE", "64")),
+    executor=os.environ.get("VERIFY_EXECUTOR", "thread"),
+)
+
+
+METRICS.gauge("zkp_users_registered", "Registered users.", lambda: len(server_instance.users))
+METRICS.gauge("zkp_verify_in_flight", "Proof verifications running.", lambda: verify_scheduler.in_flight)
+METRICS.gauge("zkp_verify_queued", "Proof verifications waiting for a slot.", lambda: verify_scheduler.queued)
+# A counter, exported at 0 before the first rejection so rate() has a series.
+METRICS.inc("zkp_verify_rejected_total", 0)
+if server_instance.invalid_proofs is not None:
+    METRICS.gauge("zkp_invalid_proof_cache_entries", "Digests of proofs known to be invalid.",
+                  lambda: len(server_instance.invalid_proofs))
+if server_instance.g0_reservoir is not None:
+    METRICS.gauge("zkp_g0_reservoir_fill", "Precomputed g0 values ready.", lambda: len(server_instance.g0_reservoir))
+
+# With WARMUP=1 (the default) a background thread started at startup checks
+# the artifacts and runs Server.warm_up: chaotic shards and a first g0, the
+# verifier (or snarkjs workers) and one verification.  /api/ready answers 503
+# until it has succeeded (a failed warm-up keeps it there; see "error"),
+# while /api/health stays a liveness check.  WARMUP=0 is ready at once and
+# leaves that work to the first requests.
+WARMUP = os.environ.get("WARMUP", "1") == "1"
+_warmup_state = {"state": "pending" if WARMUP else "skipped", "seconds": None, "steps": {}, "error": None}
+
+
+def _warm_up() -> None:
+    _warmup_state["state"] = "running"
+    started = time.perf_counter()
+    try:
+        with METRICS.timer("warmup"):
+            ARTIFACTS.refresh()
+            steps = server_instance.warm_up()
+    except Exception as exc:
+        logger.exception("warm-up failed; /api/ready stays at 503")
+        _warmup_state.update(state="failed", error=str(exc))
+    else:
+        _warmup_state.update(state="ready", steps={name: round(seconds, 4) for name, seconds in steps.items()})
+    _warmup_state["seconds"] = round(time.perf_counter() - started, 4)
+
+
+def _queue_full_response(exc: QueueFullError) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail=f"Server busy: {exc}",
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
 
-server_instance = Server()
+def _throttled_response(exc: LoginThrottled) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail=str(exc),
+        headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))},
+    )
+
+
+def _client_id(http_request: Request) -> Optional[str]:
+    # The peer address; behind a reverse proxy every login shares the proxy's.
+    return http_request.client.host if http_request.client else None
 
 
 class RegisterRequest(BaseModel):
@@ -36,6 +193,22 @@ class LoginRequest(BaseModel):
     hr_id: str
     proof: Dict
     public_signals: List[str]
+    binding: Optional[str] = None
+
+
+class ChallengeRequest(BaseModel):
+    hr_id: str
+
+
+class BatchLoginRequest(BaseModel):
+    logins: List[LoginRequest]
+
+
+MAX_LOGIN_BATCH = int(os.environ.get("MAX_LOGIN_BATCH", "256"))
+# Bulk registration commits BULK_CHUNK_SIZE lines per transaction and lists
+# at most MAX_BULK_ERRORS rejected lines in its response (the rest are counted).
+BULK_CHUNK_SIZE = int(os.environ.get("BULK_CHUNK_SIZE", "1000"))
+MAX_BULK_ERRORS = int(os.environ.get("MAX_BULK_ERRORS", "1000"))
 
 
 @app.get("/")
@@ -45,24 +218,115 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "health": "/api/health",
+            "ready": "/api/ready",
+            "metrics": "/api/metrics",
             "register_g0": "/api/register/g0",
             "register": "/api/register",
+            "register_bulk": "/api/register/bulk",
+            "export_users": "/api/users/export",
             "user_data": "/api/users/{hr_id}/data",
-            "login": "/api/login"
+            "login_challenge": "/api/login/challenge",
+            "login": "/api/login",
+            "login_batch": "/api/login/batch"
         }
     }
 
 
 @app.get("/api/health")
-async def health_check():
+def health_check():
+    # A plain def, so the store's SQLite count and the snapshots below run in
+    # the threadpool rather than on the event loop.
     return {
         "status": "healthy",
-        "users_registered": len(server_instance.users)
+        "users_registered": len(server_instance.users),
+        "user_store": server_instance.users.snapshot(),
+        "verification": verify_scheduler.snapshot(),
+        "artifacts": ARTIFACTS.snapshot(),
+        "g0_reservoir": server_instance.g0_reservoir.snapshot() if server_instance.g0_reservoir else None,
+        "invalid_proof_cache": server_instance.invalid_proofs.snapshot() if server_instance.invalid_proofs else None,
+        "login_admission": server_instance.admission.snapshot() if server_instance.admission else None,
+        "chaotic": chaotic_source.snapshot() if chaotic_source else None,
+        "warmup": _warmup_state["state"],
     }
 
 
+@app.get("/api/ready")
+async def readiness_check():
+    # Readiness probe: 200 once the startup warm-up has finished (or with
+    # WARMUP=0), 503 while it runs or after it failed.
+    ready = _warmup_state["state"] in ("ready", "skipped")
+    return JSONResponse({"ready": ready, "warmup": dict(_warmup_state)}, status_code=200 if ready else 503)
+
+
+@app.get("/api/metrics", response_class=PlainTextResponse)
+def metrics():
+    # Prometheus text exposition: per-stage latency histograms, login and
+    # verification outcome counters, scheduler and user gauges.
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4")
+
+
+# The /api/admin endpoints only exist when ADMIN_TOKEN is set; callers send it
+# as "Authorization: Bearer <token>" or "X-Admin-Token: <token>".
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+
+
+def _require_admin(request: Request) -> None:
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    token = request.headers.get("x-admin-token", "")
+    authorization = request.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        token = authorization[7:].strip()
+    if not hmac.compare_digest(token.encode("utf-8"), ADMIN_TOKEN.encode("utf-8")):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+@app.post("/api/admin/profile")
+def capture_profile(request: Request, seconds: float = 5.0, interval: float = 0.005, format: str = "collapsed"):
+    # Blocks one threadpool thread for the capture; the other threads are sampled.
+    _require_admin(request)
+    if format not in ("collapsed", "svg"):
+        raise HTTPException(status_code=400, detail="format must be 'collapsed' or 'svg'")
+    if not 0 < seconds <= MAX_SECONDS or interval <= 0:
+        raise HTTPException(status_code=400, detail=f"seconds must be in (0, {MAX_SECONDS:g}] and interval positive")
+    try:
+        counts = PROFILER.profile(seconds, interval)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if format == "svg":
+        title = f"{seconds:g}s, {PROFILER.last_samples} sampling passes every {interval * 1000:g}ms"
+        return PlainTextResponse(flamegraph_svg(counts, title), media_type="image/svg+xml")
+    return PlainTextResponse(collapsed(counts))
+
+
+@app.post("/api/admin/tracing")
+def set_tracing(request: Request, enabled: bool, capacity: Optional[int] = None):
+    _require_admin(request)
+    try:
+        TRACER.enable(capacity) if enabled else TRACER.disable()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return TRACER.snapshot()
+
+
+@app.get("/api/admin/traces")
+def get_traces(request: Request, limit: int = 50):
+    _require_admin(request)
+    return {"tracing": TRACER.snapshot(), "traces": TRACER.traces(max(limit, 0))}
+
+
+@app.delete("/api/admin/traces")
+def clear_traces(request: Request):
+    _require_admin(request)
+    TRACER.clear()
+    return TRACER.snapshot()
+
+
 @app.get("/api/register/g0")
-async def get_g0():
+def get_g0():
+    # This and the other handlers that touch the user store or build the
+    # chaotic shards are plain defs: SQLite commits and the first shard
+    # build block, so they run in the threadpool, not on the event loop.
     try:
         g0 = server_instance.get_random_g0()
         return {"g0": str(g0)}
@@ -71,7 +335,7 @@ async def get_g0():
 
 
 @app.post("/api/register")
-async def register_user(request: RegisterRequest):
+def register_user(request: RegisterRequest):
     try:
         Y = reduce_to_field(int(request.Y))
         g0 = reduce_to_field(int(request.g0))
@@ -96,25 +360,88 @@ async def register_user(request: RegisterRequest):
         raise HTTPException(status_code=500, detail=f"Registration failed: {str(e)}")
 
 
+@app.post("/api/register/bulk")
+async def register_users_bulk(request: Request):
+    # NDJSON body, one {"hr_id", "Y", "g0"} object per line, read as it streams in.
+    importer = RegistrationImporter(server_instance, BULK_CHUNK_SIZE)
+    splitter = LineSplitter()
+    errors = []
+
+    def report(events):
+        for event in events:
+            if len(errors) < MAX_BULK_ERRORS:
+                errors.append(event)
+
+    async def take(lines):
+        for line in lines:
+            error = importer.add_line(line)
+            if error is not None:
+                report([error])
+            if importer.full:
+                report(await run_in_threadpool(importer.flush))
+
+    async for data in request.stream():
+        await take(splitter.feed(data))
+    await take(splitter.finish())
+    report(await run_in_threadpool(importer.flush))
+
+    summary = importer.summary()
+    rejected = summary["duplicates"] + summary["invalid"] + summary["failed"]
+    return {
+        "success": rejected == 0,
+        "summary": summary,
+        "errors": errors,
+        "errors_truncated": rejected > len(errors),
+    }
+
+
+@app.get("/api/users/export")
+def export_users(cursor: Optional[str] = None, limit: Optional[int] = None):
+    # Streams NDJSON in hr_id order, one page of the store at a time.  With a
+    # limit, a final {"next_cursor": ...} line gives the cursor for the next
+    # request when the limit was reached.
+    def lines():
+        sent, last = 0, None
+        for page in export_pages(server_instance.users, cursor, limit):
+            yield b"".join(export_line(hr_id, record) for hr_id, record in page)
+            sent += len(page)
+            last = page[-1][0]
+        if limit is not None and sent == limit and last is not None:
+            yield json.dumps({"next_cursor": last}).encode() + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 @app.get("/api/users/{hr_id}/data")
-async def get_user_data(hr_id: str):
-    if hr_id not in server_instance.users:
+def get_user_data(hr_id: str):
+    user_data = server_instance.get_user_data(hr_id)
+    if user_data is None:
         raise HTTPException(status_code=404, detail="User not found")
-    
-    user_data = server_instance.users[hr_id]
+
     return {
         "g0": str(user_data["g0"]),
         "Y": str(user_data["Y"])
     }
 
 
+@app.post("/api/login/challenge")
+def get_login_challenge(request: ChallengeRequest):
+    challenge = server_instance.issue_challenge(request.hr_id)
+    if challenge is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return {"challenge": challenge, "expires_in": CHALLENGE_TTL}
+
+
 @app.post("/api/login")
-async def login_user(request: LoginRequest):
+async def login_user(request: LoginRequest, http_request: Request):
     try:
-        success, message = server_instance.authenticate_user(
+        success, message = await server_instance.authenticate_user_async(
             request.hr_id,
             request.proof,
-            request.public_signals
+            request.public_signals,
+            verify_scheduler,
+            binding=request.binding,
+            client=_client_id(http_request)
         )
         
         if not success:
@@ -127,36 +454,104 @@ async def login_user(request: LoginRequest):
         }
     except HTTPException:
         raise
+    except LoginThrottled as e:
+        raise _throttled_response(e)
+    except QueueFullError as e:
+        raise _queue_full_response(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Authentication failed: {str(e)}")
 
 
+@app.post("/api/login/batch")
+async def login_users_batch(request: BatchLoginRequest, http_request: Request):
+    # The batch is one request to the client's rate limit (429 when over it);
+    # a login whose hr_id is throttled comes back as "Too many login attempts".
+    if len(request.logins) > MAX_LOGIN_BATCH:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(request.logins)} logins (max {MAX_LOGIN_BATCH})"
+        )
+    try:
+        results = await server_instance.authenticate_users_batch_async([
+            (login.hr_id, login.proof, login.public_signals, login.binding)
+            for login in request.logins
+        ], verify_scheduler, client=_client_id(http_request))
+    except LoginThrottled as e:
+        raise _throttled_response(e)
+    except QueueFullError as e:
+        raise _queue_full_response(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Authentication failed: {str(e)}")
+
+    return {
+        "results": [
+            {"hr_id": login.hr_id, "success": success, "message": message}
+            for login, (success, message) in zip(request.logins, results)
+        ]
+    }
+
+
 @app.get("/api/users")
-async def list_users():
+def list_users(limit: Optional[int] = None, after: Optional[str] = None):
+    # Page through large stores with ?limit=N&after=<last hr_id of the previous page>,
+    # or stream everything from /api/users/export.
     return {
-        "users": list(server_instance.users.keys()),
+        "users": server_instance.list_users(limit, after),
         "count": len(server_instance.users)
     }
 
 
-static_dir = Path("static")
+@app.on_event("startup")
+async def warm_up_on_startup():
+    # Hash and parse the artifacts once up front; requests then only stat them.
+    # The warm-up thread does it off the event loop, so the port opens at once.
+    if WARMUP:
+        threading.Thread(target=_warm_up, name="warm-up", daemon=True).start()
+    else:
+        ARTIFACTS.refresh()
+
+
+@app.on_event("shutdown")
+async def shutdown_background_work():
+    verify_scheduler.shutdown()
+    server_instance.close()
+
+
+static_dir = Path(__file__).resolve().parent / "static"
 if static_dir.exists():
-    app.mount("/static", StaticFiles(directory="static"), name="static")
+    app.mount("/static", StaticFiles(directory=static_dir), name="static")
 
 
-def start_server(host: str = "0.0.0.0", port: int = 8000):
+def start_server(host: str = "0.0.0.0", port: int = 8000, workers: int = None):
+    # Each worker is a separate process with its own verifier, scheduler and
+    # chaotic shards; they share users through USER_DB and its mmap index.
+    # Login challenges stay in the process that issued them, so clients that
+    # answer challenges need a sticky load balancer in front of the workers.
+    workers = workers or int(os.environ.get("WEB_WORKERS", "1"))
     print("\n" + "=" * 60)
     print("    zkSNARK Authentication API Server")
     print("=" * 60)
-    print(f"\nServer starting on http://{host}:{port}")
+    print(f"\nServer starting on http://{host}:{port} ({workers} worker{'s' if workers > 1 else ''})")
     print(f"API Documentation: http://{host}:{port}/docs")
     print(f"Health Check: http://{host}:{port}/api/health")
+    print(f"Readiness:    http://{host}:{port}/api/ready")
     print("\nPress CTRL+C to stop the server")
     print("=" * 60 + "\n")
-    
-    uvicorn.run(app, host=host, port=port, log_level="info")
+
+    import uvicorn  # only needed to serve, not to import the app
+
+    if workers > 1:
+        # uvicorn can only fork workers from an import string.
+        uvicorn.run("api_server:app", host=host, port=port, log_level="info", workers=workers)
+    else:
+        uvicorn.run(app, host=host, port=port, log_level="info")
 
 
 if __name__ == "__main__":
-    start_server()
+    parser = argparse.ArgumentParser(description="zkSNARK Authentication API server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: WEB_WORKERS or 1)")
+    args = parser.parse_args()
+    start_server(args.host, args.port, args.workers)
 
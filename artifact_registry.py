@@ -0,0 +1,212 @@
+"""
+Cached validation of the zkSNARK artifacts (wasm, zkey, verification key).
+
+Each artifact is read, hashed and has its header parsed once; afterwards a
+check costs one ``os.stat`` per file, and the artifact is only re-read when
+its inode, device, size or mtime changes.  Listeners registered with
+``on_change`` hear about every change, so caches built from an old key (the
+native prover and verifier, the snarkjs worker pool) can be dropped when
+keys are hot-swapped.
+
+The result of probing an external tool (``snarkjs --version``) is cached
+the same way, keyed by the stat of the resolved executable; a failed probe
+is retried after ``retry_after`` seconds.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Read in 1 MiB chunks so hashing a large zkey does not double its memory.
+_CHUNK = 1 << 20
+
+
+def _stat_key(path: Path) -> Optional[Tuple[int, int, int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_dev, st.st_size, st.st_mtime_ns)
+
+
+def _parse_wasm(head: bytes, path: Path) -> Dict:
+    if head[:4] != b"\0asm":
+        raise ValueError("not a WebAssembly module")
+    return {"wasm_version": struct.unpack_from("<I", head, 4)[0]}
+
+
+def _parse_zkey(head: bytes, path: Path) -> Dict:
+    if head[:4] != b"zkey":
+        raise ValueError("not a snarkjs .zkey file")
+    version, n_sections = struct.unpack_from("<II", head, 4)
+    # Section 1 (protocol id) comes first, then section 2 (the Groth16 header).
+    offset = 12
+    info = {"zkey_version": version, "sections": n_sections}
+    with open(path, "rb") as fh:
+        for _ in range(n_sections):
+            fh.seek(offset)
+            section_type, size = struct.unpack("<IQ", fh.read(12))
+            if section_type == 1:
+                protocol = struct.unpack("<I", fh.read(4))[0]
+                info["protocol"] = "groth16" if protocol == 1 else f"unknown({protocol})"
+            elif section_type == 2:
+                n8q = struct.unpack("<I", fh.read(4))[0]
+                fh.seek(n8q, os.SEEK_CUR)
+                n8r = struct.unpack("<I", fh.read(4))[0]
+                fh.seek(n8r, os.SEEK_CUR)
+                info["n_vars"], info["n_public"], info["domain_size"] = struct.unpack("<III", fh.read(12))
+                break
+            offset += 12 + size
+    if info.get("protocol") != "groth16":
+        raise ValueError("proving key is not a Groth16 key")
+    return info
+
+
+def _parse_vkey(head: bytes, path: Path) -> Dict:
+    vkey = json.loads(Path(path).read_text(encoding="utf-8"))
+    return {
+        "protocol": vkey.get("protocol"),
+        "curve": vkey.get("curve"),
+        "n_public": vkey.get("nPublic"),
+    }
+
+
+HEADER_PARSERS: Dict[str, Callable[[bytes, Path], Dict]] = {
+    ".wasm": _parse_wasm,
+    ".zkey": _parse_zkey,
+    ".json": _parse_vkey,
+}
+
+
+class _Artifact:
+    __slots__ = ("name", "path", "stat", "sha256", "header", "error", "validated_at")
+
+    def __init__(self, name: str, path: Path):
+        self.name = name
+        self.path = Path(path)
+        self.stat = None
+        self.sha256 = None
+        self.header = None
+        self.error = "not checked"
+        self.validated_at = None
+
+    def snapshot(self) -> Dict:
+        return {
+            "path": str(self.path),
+            "present": self.stat is not None,
+            "valid": self.error is None,
+            "error": self.error,
+            "size": self.stat[2] if self.stat else None,
+            "mtime_ns": self.stat[3] if self.stat else None,
+            "inode": self.stat[0] if self.stat else None,
+            "sha256": self.sha256,
+            "header": self.header,
+            "validated_at": self.validated_at,
+        }
+
+
+class ArtifactRegistry:
+    def __init__(self, paths: Dict[str, Path], retry_after: float = 30.0):
+        self._artifacts = {name: _Artifact(name, path) for name, path in paths.items()}
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[str], None]] = []
+        self._tools: Dict[str, Dict] = {}
+        self.retry_after = retry_after
+        self.revalidations = 0
+
+    def on_change(self, listener: Callable[[str], None]) -> None:
+        """Call ``listener(name)`` whenever an artifact is re-read after a change."""
+        self._listeners.append(listener)
+
+    def _validate(self, artifact: _Artifact, stat) -> None:
+        artifact.stat = stat
+        artifact.sha256 = None
+        artifact.header = None
+        artifact.validated_at = time.time()
+        if stat is None:
+            artifact.error = "missing"
+            return
+        try:
+            digest = hashlib.sha256()
+            with open(artifact.path, "rb") as fh:
+                head = fh.read(64)
+                digest.update(head)
+                for chunk in iter(lambda: fh.read(_CHUNK), b""):
+                    digest.update(chunk)
+            artifact.sha256 = digest.hexdigest()
+            parser = HEADER_PARSERS.get(artifact.path.suffix)
+            artifact.header = parser(head, artifact.path) if parser else {}
+            artifact.error = None
+        except (OSError, ValueError, struct.error) as exc:
+            artifact.error = f"invalid: {exc}"
+
+    def refresh(self, names: Iterable[str] = None) -> List[str]:
+        """Re-stat artifacts and re-validate any that changed; returns the changed names."""
+        changed = []
+        for name in names or self._artifacts:
+            artifact = self._artifacts[name]
+            stat = _stat_key(artifact.path)
+            if stat == artifact.stat and artifact.validated_at is not None:
+                continue
+            with self._lock:
+                if stat == artifact.stat and artifact.validated_at is not None:
+                    continue
+                first = artifact.validated_at is None
+                self._validate(artifact, stat)
+                self.revalidations += 1
+            if not first:
+                changed.append(name)
+        for name in changed:
+            for listener in self._listeners:
+                listener(name)
+        return changed
+
+    def problems(self, names: Iterable[str] = None) -> Dict[str, str]:
+        """Map path -> problem ("missing" or "invalid: ...") for unusable artifacts."""
+        names = list(names or self._artifacts)
+        self.refresh(names)
+        return {
+            str(self._artifacts[name].path): self._artifacts[name].error
+            for name in names
+            if self._artifacts[name].error is not None
+        }
+
+    def check_tool(self, name: str, command: str, probe: Callable[[], bool]) -> bool:
+        """
+        Return the cached result of ``probe()`` for an external tool.
+
+        The probe is re-run when the resolved executable changes on disk,
+        and at most every ``retry_after`` seconds while it keeps failing.
+        """
+        resolved = shutil.which(command) or command
+        stat = _stat_key(Path(resolved))
+        entry = self._tools.get(name)
+        now = time.monotonic()
+        if entry is not None and entry["stat"] == stat and entry["path"] == resolved:
+            if entry["available"] or now - entry["checked"] < self.retry_after:
+                return entry["available"]
+        available = bool(probe())
+        self._tools[name] = {
+            "path": resolved,
+            "stat": stat,
+            "available": available,
+            "checked": now,
+        }
+        return available
+
+    def snapshot(self) -> Dict:
+        """State as of the last refresh(); never stats, reads or hashes a file."""
+        return {
+            "artifacts": {name: a.snapshot() for name, a in self._artifacts.items()},
+            "tools": {
+                name: {"path": entry["path"], "available": entry["available"]}
+                for name, entry in self._tools.items()
+            },
+            "revalidations": self.revalidations,
+        }
@@ -0,0 +1 @@
+"""Benchmarks and cross-checks. Run from the repository root, e.g. ``python -m benchmarks.verify_backends``."""
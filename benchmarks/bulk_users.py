@@ -0,0 +1,86 @@
+"""
+Bulk NDJSON import and streaming export of users through user_transfer.
+
+Generates --users registrations as an NDJSON file, imports them into a
+SQLite user store with RegistrationImporter, then exports them again with
+export_pages.  For each of two input sizes (--users / 4 and --users) it
+reports lines/s (understated: tracemalloc is running) and the tracemalloc
+peak, which should not grow with the number of users.  Exits non-zero if the export does not match the input or
+the peak at the larger size is more than 1.5x the smaller one.
+
+    python -m benchmarks.bulk_users [--users 500000] [--chunk-size 1000]
+"""
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from user_store import SQLiteUserStore
+from user_transfer import RegistrationImporter, export_line, export_pages, iter_file_lines
+from zkp_protocol import Server
+
+
+def write_input(path, count, rng):
+    with open(path, "w", encoding="utf-8") as fh:
+        for i in range(count):
+            fh.write(json.dumps({"hr_id": f"emp{i:08d}", "Y": str(rng.getrandbits(253)), "g0": str(rng.getrandbits(253))}))
+            fh.write("\n")
+
+
+def measured(func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def run(tmp, count, chunk_size, rng):
+    source, exported = tmp / f"in{count}.ndjson", tmp / f"out{count}.ndjson"
+    write_input(source, count, rng)
+    server = Server(store=SQLiteUserStore(tmp / f"users{count}.db", cache_size=0))
+
+    def do_import():
+        importer = RegistrationImporter(server, chunk_size)
+        with open(source, "rb") as fh:
+            errors = sum(1 for _ in importer.run(iter_file_lines(fh)))
+        return errors, importer.summary()
+
+    def do_export():
+        with open(exported, "wb") as out:
+            for page in export_pages(server.users):
+                out.write(b"".join(export_line(hr_id, record) for hr_id, record in page))
+
+    (errors, summary), import_s, import_peak = measured(do_import)
+    _, export_s, export_peak = measured(do_export)
+    server.close()
+    print(f"{count:>10,} users  import {count / import_s:10,.0f} lines/s  peak {import_peak / 2**20:6.2f} MiB"
+          f"   export {count / export_s:10,.0f} lines/s  peak {export_peak / 2**20:6.2f} MiB")
+    same = errors == 0 and summary["registered"] == count and source.read_bytes() == exported.read_bytes()
+    return same, max(import_peak, export_peak)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=500_000)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        small_ok, small_peak = run(Path(tmp), args.users // 4, args.chunk_size, rng)
+        large_ok, large_peak = run(Path(tmp), args.users, args.chunk_size, rng)
+    flat = large_peak <= 1.5 * small_peak
+    print(f"round trip intact: {small_ok and large_ok}; peak memory flat: {flat}")
+    sys.exit(0 if small_ok and large_ok and flat else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Exercise ShardedChaoticGenerator: concurrency and checkpoints.
+
+- values/s from T threads sharing one locked ChaoticGenerator (the Server
+  default) versus a ShardedChaoticGenerator with one shard per thread;
+- time to write an atomic checkpoint, and that a clean close() resumes
+  every shard exactly while a crash moves to a fresh epoch.
+
+Exits non-zero if any check fails.
+
+    python -m benchmarks.chaotic_shards [--threads N]
+"""
+
+import argparse
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from chaotic_generator import ChaoticGenerator
+from chaotic_shards import ShardedChaoticGenerator
+
+
+def threaded_rate(draw, threads, calls, count):
+    def work():
+        for _ in range(calls):
+            draw(count)
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return threads * calls * count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--calls", type=int, default=100)
+    parser.add_argument("--count", type=int, default=64)
+    args = parser.parse_args()
+    ok = True
+
+    single = ChaoticGenerator()
+    lock = threading.Lock()
+
+    def locked(count):
+        with lock:
+            return single.get_chaotic_sequence(count, 1000, 10**6)
+
+    rate = threaded_rate(locked, args.threads, args.calls, args.count)
+    print(f"{'one locked generator':<28}{rate:12.0f} values/s")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "chaotic.json"
+        sharded = ShardedChaoticGenerator(b"benchmark" * 4, args.threads, path)
+        rate = threaded_rate(
+            lambda count: sharded.get_chaotic_sequence(count, 1000, 10**6), args.threads, args.calls, args.count
+        )
+        print(f"{f'{args.threads} shards':<28}{rate:12.0f} values/s")
+
+        start = time.perf_counter()
+        sharded.checkpoint()
+        print(f"{'checkpoint write':<28}{(time.perf_counter() - start) * 1000:12.2f} ms"
+              f"  ({path.stat().st_size} bytes)")
+
+        sharded.close()
+        expected = [shard.generator.get_chaotic_sequence(500, 1, 10**6) for shard in sharded._shards]
+        resumed = ShardedChaoticGenerator(shards=args.threads, checkpoint_path=path)
+        same = [shard.generator.get_chaotic_sequence(500, 1, 10**6) for shard in resumed._shards]
+        exact = resumed.resumed == "clean" and same == expected
+        # `resumed` is never closed, as if the process had crashed.
+        crashed = ShardedChaoticGenerator(shards=args.threads, checkpoint_path=path)
+        fresh = crashed.resumed == "crash" and crashed.epoch == resumed.epoch + 1
+        print(f"clean close resumes exactly: {exact}; crash moves to a fresh epoch: {fresh}")
+        ok &= exact and fresh
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Cost of deriving a returning user's secret, with and without DerivationCache.
+
+Times Client._derive_secret (the password -> X derivation and commitment
+check that every Client.login runs) for --users users logging in --rounds
+times each: once with the cache off and once with it on.  It also checks
+that a wrong password misses, that the counters add up, and that evicted
+entries are zeroized.  Exits non-zero if a check fails.
+
+    python -m benchmarks.derivation_cache [--users 100] [--rounds 1000]
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from hash_utils import SNARK_FIELD_MODULUS, compute_commitment, hash_password_to_field
+from zkp_protocol import Client
+
+
+def make_users(count, rng):
+    users = []
+    for i in range(count):
+        password = f"correct horse {i}"
+        g0 = rng.randrange(1, SNARK_FIELD_MODULUS)
+        users.append((f"user{i}", password, g0, compute_commitment(g0, hash_password_to_field(password))))
+    return users
+
+
+def derive_all(client, users, rounds):
+    ok = True
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for hr_id, password, g0, commitment in users:
+            client.g0, client.commitment = g0, commitment
+            ok &= client._derive_secret(hr_id, password)[1]
+    return ok, len(users) * rounds / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=1000)
+    args = parser.parse_args()
+    users = make_users(args.users, random.Random(1))
+
+    plain_ok, plain = derive_all(Client(derivation_cache_size=0), users, args.rounds)
+    client = Client(derivation_cache_size=args.users)
+    cached_ok, cached = derive_all(client, users, args.rounds)
+    print(f"{'no cache':<14}{plain:14,.0f} derivations/s")
+    print(f"{'cache':<14}{cached:14,.0f} derivations/s   x{cached / plain:.2f}")
+
+    cache = client.derivation_cache
+    hr_id, password, g0, commitment = users[0]
+    client.g0, client.commitment = g0, commitment
+    wrong_misses = not client._derive_secret(hr_id, "wrong")[1] and cache.get(hr_id, g0, commitment, "wrong") is None
+    stats = cache.stats()
+    counted = stats["hits"] == args.users * (args.rounds - 1) and stats["misses"] == args.users + 2
+
+    entry = cache._entries[(hr_id, g0)]
+    buffers = (entry.tag, entry.secret_x)
+    cache.clear()
+    wiped = all(not any(buffer) for buffer in buffers)
+    print(f"stats: {stats}")
+    print(f"wrong password misses: {wrong_misses}; counters add up: {counted}; cleared entries zeroized: {wiped}")
+    sys.exit(0 if plain_ok and cached_ok and wrong_misses and counted and wiped else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Measure cheap-endpoint latency while /api/login is flooded with verifications.
+
+Drives api_server.app in-process over httpx's ASGI transport. A background
+storm of concurrent logins (native verify backend) runs while /api/health is
+polled; the script reports health p50/p99 with verification offloaded to the
+scheduler and, for comparison, with verification run inline on the event loop
+the way login_user used to.
+
+    python -m benchmarks.event_loop_latency [--logins N] [--concurrency N] [--queue N]
+        [--executor thread|process]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+os.environ.setdefault("ZKSNARK_VERIFY_BACKEND", "native")
+# The storm logs one user in over and over; it measures the event loop, not
+# the login rate limits.
+os.environ.setdefault("LOGIN_RATE_PER_USER", "0")
+os.environ.setdefault("LOGIN_RATE_PER_CLIENT", "0")
+
+import httpx  # noqa: E402
+
+import api_server  # noqa: E402
+from benchmarks.verify_backends import load_cases  # noqa: E402
+from verify_scheduler import VerificationScheduler  # noqa: E402
+
+
+class InlineScheduler:
+    """Runs the job directly on the event loop: the pre-scheduler behaviour."""
+
+    async def run(self, func, *args, **kwargs):
+        return func(*args, **kwargs)
+
+    def snapshot(self):
+        return {"executor": "inline"}
+
+    def shutdown(self):
+        pass
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run_storm(logins, case):
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=api_server.app), base_url="http://bench"
+    ) as client:
+        body = {"hr_id": "bench", "proof": case["proof"], "public_signals": case["public_signals"]}
+        health_latencies = []
+        statuses = []
+        storm_done = asyncio.Event()
+
+        async def login():
+            response = await client.post("/api/login", json=body)
+            statuses.append(response.status_code)
+
+        async def storm():
+            await asyncio.gather(*(login() for _ in range(logins)))
+            storm_done.set()
+
+        async def poll_health():
+            # Latency is measured from each poll's scheduled time, so time spent
+            # waiting for a blocked loop to even send the request is counted.
+            interval = 0.01
+            first = time.perf_counter()
+            tick = 0
+            while not storm_done.is_set():
+                intended = first + tick * interval
+                await asyncio.sleep(max(0.0, intended - time.perf_counter()))
+                await client.get("/api/health")
+                health_latencies.append(time.perf_counter() - intended)
+                tick = max(tick + 1, int((time.perf_counter() - first) / interval))
+
+        start = time.perf_counter()
+        await asyncio.gather(storm(), poll_health())
+        elapsed = time.perf_counter() - start
+        return health_latencies, statuses, elapsed
+
+
+def report(label, health, statuses, elapsed):
+    ok = statuses.count(200)
+    busy = statuses.count(503)
+    print(
+        f"{label:<10} health p50 {statistics.median(health) * 1000:7.1f} ms  "
+        f"p99 {percentile(health, 99) * 1000:7.1f} ms  max {max(health) * 1000:7.1f} ms  "
+        f"({len(health)} polls) | logins ok={ok} 503={busy} in {elapsed:.2f}s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=2)
+    parser.add_argument("--queue", type=int, default=64)
+    parser.add_argument("--executor", choices=("thread", "process"), default="thread")
+    args = parser.parse_args()
+
+    case = next(case for case in load_cases() if case["expected"])
+    api_server.server_instance.register_user(
+        "bench", int(case["public_signals"][1]), int(case["public_signals"][0])
+    )
+
+    original = api_server.verify_scheduler
+    try:
+        api_server.verify_scheduler = InlineScheduler()
+        report("inline", *asyncio.run(run_storm(args.logins, case)))
+
+        api_server.verify_scheduler = VerificationScheduler(args.concurrency, args.queue, args.executor)
+        report("scheduled", *asyncio.run(run_storm(args.logins, case)))
+        print(json.dumps(api_server.verify_scheduler.snapshot()))
+        api_server.verify_scheduler.shutdown()
+    finally:
+        api_server.verify_scheduler = original
+
+
+if __name__ == "__main__":
+    main()
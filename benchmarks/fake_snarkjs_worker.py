@@ -0,0 +1,86 @@
+"""
+Stand-in for scripts/snarkjs_worker.js that needs neither Node nor snarkjs.
+
+Speaks the same JSON-lines protocol (see snarkjs_pool.py).  ``prove`` returns
+a saved proof from fixtures/auth_proofs.json whose public signals match the
+input when one exists; ``verify`` uses the in-process verifier unless a fixed
+verdict is requested.  Latency (a fixed part plus exponentially distributed
+jitter with mean --jitter-ms), failures and crashes are configurable:
+
+    python -m benchmarks.fake_snarkjs_worker [--latency-ms N] [--jitter-ms N] [--fail-rate P]
+        [--crash-after N] [--startup-ms N] [--verdict native|accept|reject]
+        <wasm> <zkey> <vkey>
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+FIXTURES = Path(__file__).parent / "fixtures" / "auth_proofs.json"
+
+
+def send(message):
+    sys.stdout.write(json.dumps(message) + "\n")
+    sys.stdout.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--startup-ms", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--crash-after", type=int, default=0)
+    parser.add_argument("--verdict", choices=("native", "accept", "reject"), default="native")
+    parser.add_argument("artifacts", nargs=3, metavar="ARTIFACT")
+    args = parser.parse_args()
+
+    time.sleep(args.startup_ms / 1000.0)
+    vkey_path = args.artifacts[2]
+    verifier = None
+    if args.verdict == "native":
+        from groth16_verifier import Groth16Verifier
+
+        verifier = Groth16Verifier.from_file(vkey_path)
+    cases = [case for case in json.loads(FIXTURES.read_text(encoding="utf-8")) if case["expected"]]
+    send({"ready": True})
+
+    jobs = 0
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        request = json.loads(line)
+        jobs += 1
+        if args.crash_after and jobs > args.crash_after:
+            os._exit(3)
+        delay = args.latency_ms + (random.expovariate(1.0 / args.jitter_ms) if args.jitter_ms > 0 else 0.0)
+        time.sleep(delay / 1000.0)
+        if random.random() < args.fail_rate:
+            send({"id": request["id"], "ok": False, "error": "injected failure"})
+            continue
+
+        op = request.get("op")
+        if op == "ping":
+            result = {"pong": True}
+        elif op == "prove":
+            signals = [request["input"]["g0"], request["input"]["Y"]]
+            match = next((c for c in cases if c["public_signals"] == signals), cases[0])
+            result = {"proof": match["proof"], "public_signals": signals}
+        elif op == "verify":
+            if verifier is not None:
+                valid = verifier.verify(request["proof"], request["public_signals"])
+            else:
+                valid = args.verdict == "accept"
+            result = {"valid": valid}
+        else:
+            send({"id": request["id"], "ok": False, "error": f"unknown op '{op}'"})
+            continue
+        send({"id": request["id"], "ok": True, "result": result})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Batched field arithmetic (field_utils) versus the per-value hash_utils calls.
+
+Over --elements random inputs (1M by default):
+
+- hashing passwords: hash_password_to_field per value vs hash_passwords_to_field;
+- commitments: compute_commitment per value vs compute_commitments;
+- inverses: pow(x, -1, p) per value vs batch_inverse;
+- exponentiation with one base: the old bit-by-bit loop (on --loop-elements
+  only, it is slow), pow() and FixedBaseTable, table build included.
+
+Reports elements/s and the speedup over the per-value path.  Exits non-zero
+if any batched result differs from the per-value one.
+
+    python -m benchmarks.field_math [--elements 1000000] [--loop-elements 20000]
+"""
+
+import argparse
+import itertools
+import random
+import sys
+import time
+
+from field_utils import FixedBaseTable, batch_inverse, compute_commitments, hash_passwords_to_field
+from hash_utils import SNARK_FIELD_MODULUS, compute_commitment, hash_password_to_field
+
+P = SNARK_FIELD_MODULUS
+
+
+def bit_loop_pow(base, exponent, modulus):
+    # hash_utils.fast_exponentiation before it switched to pow().
+    result = 1
+    base = base % modulus
+    while exponent > 0:
+        if exponent % 2 == 1:
+            result = (result * base) % modulus
+        exponent = exponent >> 1
+        base = (base * base) % modulus
+    return result
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def report(name, count, rows):
+    """rows: (label, seconds, elements); the first row is the baseline."""
+    print(name)
+    base_rate = rows[0][2] / rows[0][1]
+    for label, seconds, elements in rows:
+        rate = elements / seconds
+        print(f"  {label:<34}{rate:14,.0f} /s   x{rate / base_rate:5.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--elements", type=int, default=1_000_000)
+    parser.add_argument("--loop-elements", type=int, default=20_000)
+    args = parser.parse_args()
+    n = args.elements
+    rng = random.Random(1)
+    ok = True
+
+    passwords = [f"password-{rng.getrandbits(64):016x}" for _ in range(n)]
+    single, t_single = timed(lambda: [hash_password_to_field(pw) for pw in passwords])
+    xs, t_batch = timed(lambda: hash_passwords_to_field(passwords))
+    report(f"hash {n:,} passwords to field", n, [
+        ("hash_password_to_field", t_single, n), ("hash_passwords_to_field", t_batch, n),
+    ])
+    ok &= single == xs
+    del passwords, single
+
+    g0s = [rng.randrange(1, P) for _ in range(n)]
+    single, t_single = timed(lambda: [compute_commitment(g0, x) for g0, x in zip(g0s, xs)])
+    batch, t_batch = timed(lambda: compute_commitments(g0s, xs))
+    g0 = g0s[0]
+    fixed, t_fixed = timed(lambda: compute_commitments(itertools.repeat(g0), xs))
+    report(f"{n:,} commitments", n, [
+        ("compute_commitment", t_single, n), ("compute_commitments", t_batch, n),
+        ("compute_commitments, one g0", t_fixed, n),
+    ])
+    ok &= single == batch and fixed == [compute_commitment(g0, x) for x in xs]
+
+    single, t_single = timed(lambda: [pow(g, -1, P) for g in g0s])
+    batch, t_batch = timed(lambda: batch_inverse(g0s))
+    report(f"invert {n:,} elements", n, [("pow(x, -1, p)", t_single, n), ("batch_inverse", t_batch, n)])
+    ok &= single == batch
+    del g0s, single, batch
+
+    loop_n = min(n, args.loop_elements)
+    looped, t_loop = timed(lambda: [bit_loop_pow(g0, x, P) for x in xs[:loop_n]])
+    single, t_single = timed(lambda: [pow(g0, x, P) for x in xs])
+    batch, t_batch = timed(lambda: FixedBaseTable(g0).pow_many(xs))
+    report(f"g0 ** x for {n:,} exponents", n, [
+        (f"bit-by-bit loop ({loop_n:,} only)", t_loop, loop_n), ("pow()", t_single, n),
+        ("FixedBaseTable (incl. build)", t_batch, n),
+    ])
+    ok &= looped == single[:loop_n] and single == batch
+
+    print(f"batched results match: {ok}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
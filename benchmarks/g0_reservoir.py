@@ -0,0 +1,68 @@
+"""
+Measure /api/register/g0 latency with and without the g0 reservoir.
+
+Several threads call Server.get_random_g0 in bursts (an onboarding wave),
+with a pause between bursts in which the reservoir can refill.  Reports
+p50/p99 latency and the reservoir's miss count, i.e. the draws that fell
+back to synchronous generation.
+
+    python -m benchmarks.g0_reservoir [--threads N] [--bursts N] [--burst-size N]
+"""
+
+import argparse
+import threading
+import time
+
+from zkp_protocol import Server
+
+
+def run(server, threads, bursts, burst_size, pause):
+    latencies = []
+    lock = threading.Lock()
+
+    def worker():
+        local = []
+        for _ in range(burst_size // threads):
+            start = time.perf_counter()
+            server.get_random_g0()
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    for _ in range(bursts):
+        pool = [threading.Thread(target=worker) for _ in range(threads)]
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+        time.sleep(pause)
+    latencies.sort()
+    return latencies
+
+
+def report(label, latencies):
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000
+    print(f"{label:<22} p50 {p50:8.3f} ms   p99 {p99:8.3f} ms   n={len(latencies)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--bursts", type=int, default=5)
+    parser.add_argument("--burst-size", type=int, default=200)
+    parser.add_argument("--pause", type=float, default=0.5)
+    parser.add_argument("--capacity", type=int, default=1024)
+    args = parser.parse_args()
+
+    report("synchronous", run(Server(), args.threads, args.bursts, args.burst_size, args.pause))
+
+    server = Server(g0_reservoir_size=args.capacity)
+    time.sleep(args.pause)  # initial fill
+    report("reservoir", run(server, args.threads, args.bursts, args.burst_size, args.pause))
+    print(server.g0_reservoir.snapshot())
+    server.close()
+
+
+if __name__ == "__main__":
+    main()
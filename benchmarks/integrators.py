@@ -0,0 +1,106 @@
+"""
+Compare the ChaoticGenerator integrator engines.
+
+For each engine in chaotic_integrators.INTEGRATORS this reports:
+
+- steps/s: RK steps per second for one trajectory (for ``rk45``, steps of
+  the nominal ``dt``; the adaptive step count is printed alongside);
+- B/step: bytes allocated and still live at the peak of one step, measured
+  with tracemalloc after subtracting the cost of the call itself, so an
+  engine that allocates nothing per step reports 0;
+- values/s: ChaoticGenerator.get_random_value with that engine.
+
+It also reports whether every RK4 engine reproduces the values and state
+saved in fixtures/chaotic_rk4_reference.json, which were recorded from the
+original ChaoticGenerator.iterate, and exits non-zero if one does not
+(tests/test_chaotic_integrators.py asserts the same under pytest).
+
+    python -m benchmarks.integrators [--steps N] [--values N]
+"""
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+from chaotic_generator import ChaoticGenerator
+from chaotic_integrators import INTEGRATORS, make_integrator
+
+FIXTURE = Path(__file__).parent / "fixtures" / "chaotic_rk4_reference.json"
+START = [0.1, 0.2, 0.3, 0.4, 0.5, 0.6]
+DT = 0.01
+
+
+def check_reference(name, reference) -> bool:
+    gen = ChaoticGenerator(integrator=name)
+    values = [gen.get_random_value() for _ in range(len(reference["get_random_value"]))]
+    gen = ChaoticGenerator(integrator=name)
+    gen.iterate(1000)
+    state = [float(v).hex() for v in gen.state]
+    return values == reference["get_random_value"] and state == reference["state_after_1000_steps"]
+
+
+def peak_bytes(engine, state, steps):
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    engine.advance(state, steps, DT)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak - base
+
+
+def bytes_per_step(name):
+    engine = make_integrator(name)
+    state = engine.advance(np.array(START), 200, DT)  # warm up, including interpreter caches
+    return max(0, peak_bytes(engine, state, 1) - peak_bytes(engine, state, 0))
+
+
+def steps_per_second(name, steps):
+    engine = make_integrator(name)
+    state = engine.advance(np.array(START), 10, DT)
+    with np.errstate(over="ignore", invalid="ignore"):
+        start = time.perf_counter()
+        engine.advance(state, steps, DT)
+        elapsed = time.perf_counter() - start
+    return steps / elapsed, engine
+
+
+def values_per_second(name, count):
+    gen = ChaoticGenerator(integrator=name)
+    start = time.perf_counter()
+    for _ in range(count):
+        gen.get_random_value()
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--steps", type=int, default=20000)
+    parser.add_argument("--values", type=int, default=400)
+    args = parser.parse_args()
+
+    reference = json.loads(FIXTURE.read_text())
+    ok = True
+    print(f"{'engine':<11}{'steps/s':>12}{'B/step':>9}{'values/s':>11}   matches original RK4")
+    for name in INTEGRATORS:
+        rate, engine = steps_per_second(name, args.steps)
+        values = values_per_second(name, args.values)
+        if name == "rk45":
+            same = "n/a (adaptive)"
+        else:
+            same = check_reference(name, reference)
+            ok &= same
+        print(f"{name:<11}{rate:12.0f}{bytes_per_step(name):9d}{values:11.0f}   {same}")
+        if name == "rk45":
+            print(f"{'':<11}{engine.accepted} accepted / {engine.rejected} rejected adaptive steps, "
+                  f"final h = {engine.h:.2e}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
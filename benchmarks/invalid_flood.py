@@ -0,0 +1,256 @@
+"""
+Invalid-proof floods against the invalid-proof cache and login rate limits.
+
+Uses Server with the native verifier and the users from
+``fixtures/auth_proofs.json``.
+
+1. Replay: the same invalid proof for valid_alice is sent --replays times,
+   with and without an InvalidProofCache; reports the time per attempt.
+2. Flood: for --seconds, an attacker client sends invalid proofs for
+   valid_alice back to back.  Half are replays of one proof and half are
+   fresh re-randomizations that the cache cannot recognize.  Every
+   --legit-interval seconds, valid_bob logs in from another client.  This runs
+   unprotected, with the cache alone, and with the cache plus LoginAdmission
+   (per-user --user-rate/--user-burst).  Reported for each: verifications
+   and verify CPU time spent on the attacker, and valid_bob's success rate
+   and median login latency.
+3. Lockout: with api_server's default limits, --attackers client addresses
+   each send invalid proofs for valid_alice until they are throttled; then
+   valid_alice logs in from her own address.
+4. Rotation: with the same limits and no cache, one attacker sends
+   --rotation invalid proofs for valid_alice from a new address each time,
+   until the per-account bucket throttles it.
+5. Batch: with the same limits, one client sends a batch of --batch valid
+   logins (MAX_LOGIN_BATCH by default).
+
+Exits non-zero if a cached replay is not at least 100x faster than a
+verification, if valid_bob is ever rejected, if the attacker gets more
+verifications than its bucket allows, if the attackers lock valid_alice
+out, if rotating addresses gets more guesses than the account bucket
+allows, or if any login in the batch is rejected.
+
+    python -m benchmarks.invalid_flood [--seconds S] [--replays N] [--legit-interval S]
+        [--attackers N] [--rotation N] [--batch N]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import zkp_protocol
+from admission import InvalidProofCache, LoginAdmission, LoginThrottled
+from zkp_protocol import Server
+from zksnark_utils import rerandomize_proof
+
+FIXTURES = Path(__file__).parent / "fixtures" / "auth_proofs.json"
+
+
+class CountingVerify:
+    """Stands in for zkp_protocol.verify_proof and counts calls and time."""
+
+    def __init__(self, verify):
+        self._verify = verify
+        self.calls = 0
+        self.seconds = 0.0
+
+    def __call__(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self._verify(*args, **kwargs)
+        finally:
+            self.calls += 1
+            self.seconds += time.perf_counter() - start
+
+
+def make_server(cases, cache=False, admission=None):
+    server = Server(
+        verify_backend="native",
+        invalid_proofs=InvalidProofCache() if cache else None,
+        admission=admission,
+    )
+    for name in ("valid_alice", "valid_bob"):
+        g0, Y = cases[name]["public_signals"]
+        server.register_user(name, int(Y), int(g0))
+    return server
+
+
+def attempt(server, hr_id, case, proof=None, client=None):
+    try:
+        return server.authenticate_user(hr_id, proof or case["proof"], case["public_signals"], client=client)[0]
+    except LoginThrottled:
+        return False
+
+
+def replay(cases, count):
+    bad = cases["scaled_pi_a"]
+    rows = []
+    for cache in (False, True):
+        server = make_server(cases, cache=cache)
+        times = []
+        for _ in range(count):
+            start = time.perf_counter()
+            attempt(server, "valid_alice", bad)
+            times.append(time.perf_counter() - start)
+        server.close()
+        rows.append((cache, times))
+    print(f"replaying one invalid proof {count}x")
+    for cache, times in rows:
+        label = "with cache" if cache else "no cache"
+        print(f"  {label:<12} first {times[0] * 1e3:9.3f} ms   repeats median {statistics.median(times[1:]) * 1e6:10.1f} us")
+    uncached = statistics.median(rows[0][1])
+    cached = statistics.median(rows[1][1][1:])
+    return uncached / cached
+
+
+def flood(cases, seconds, interval, fresh, user_rate, user_burst, cache, limits):
+    bad, good = cases["scaled_pi_a"], cases["valid_bob"]
+    admission = LoginAdmission(user_rate=user_rate, user_burst=user_burst) if limits else None
+    server = make_server(cases, cache=cache, admission=admission)
+    counter = CountingVerify(zkp_protocol.verify_proof)
+    original, zkp_protocol.verify_proof = zkp_protocol.verify_proof, counter
+    attacker = {"attempts": 0, "verifies": 0, "seconds": 0.0}
+    legit = []
+    try:
+        began = time.perf_counter()
+        deadline, next_legit = began + seconds, began
+        i = 0
+        while (now := time.perf_counter()) < deadline:
+            if now >= next_legit:
+                next_legit += interval
+                ok = attempt(server, "valid_bob", good, client="legit")
+                legit.append((ok, time.perf_counter() - now))
+                continue
+            proof = fresh[i % len(fresh)] if i % 2 else None
+            i += 1
+            calls, spent = counter.calls, counter.seconds
+            attempt(server, "valid_alice", bad, proof, client="attacker")
+            attacker["attempts"] += 1
+            attacker["verifies"] += counter.calls - calls
+            attacker["seconds"] += counter.seconds - spent
+        attacker["elapsed"] = time.perf_counter() - began
+    finally:
+        zkp_protocol.verify_proof = original
+        server.close()
+    return attacker, legit
+
+
+def default_admission():
+    # api_server's defaults for LOGIN_RATE_* and LOGIN_BURST_*.
+    return LoginAdmission(user_rate=1, user_burst=10, client_rate=10, client_burst=50,
+                          account_rate=1, account_burst=200)
+
+
+def lockout(cases, fresh, attackers):
+    server = make_server(cases, cache=True, admission=default_admission())
+    throttled, sent = 0, 0
+    try:
+        for n in range(attackers):
+            for i in range(20):
+                sent += 1
+                try:
+                    server.authenticate_user("valid_alice", fresh[(n * 20 + i) % len(fresh)],
+                                             cases["valid_alice"]["public_signals"], client=f"10.0.0.{n}")
+                except LoginThrottled:
+                    throttled += 1
+                    break
+        ok = attempt(server, "valid_alice", cases["valid_alice"], client="alice")
+    finally:
+        server.close()
+    print(f"\nlockout: {attackers} addresses sent {sent} invalid proofs for valid_alice, {throttled} got throttled")
+    print(f"  valid_alice from her own address: {'accepted' if ok else 'REJECTED'}")
+    return ok
+
+
+def rotation(cases, fresh, guesses):
+    admission = default_admission()
+    server = make_server(cases, admission=admission)
+    verified, began = 0, time.perf_counter()
+    try:
+        for i in range(guesses):
+            try:
+                server.authenticate_user("valid_alice", fresh[i % len(fresh)],
+                                         cases["valid_alice"]["public_signals"], client=f"rotating-{i}")
+            except LoginThrottled:
+                break
+            verified += 1
+        elapsed = time.perf_counter() - began
+    finally:
+        server.close()
+    allowed = admission.accounts.burst + admission.accounts.rate * elapsed + 1
+    print(f"\nrotation: one address per guess, {verified} invalid proofs for valid_alice verified "
+          f"before throttling (account bucket allows {allowed:.0f})")
+    return verified <= allowed
+
+
+def batch(cases, size):
+    server = make_server(cases, cache=True, admission=default_admission())
+    names = ("valid_alice", "valid_bob")
+    logins = [
+        (name, rerandomize_proof(cases[name]["proof"]), cases[name]["public_signals"])
+        for name in (names[i % 2] for i in range(size))
+    ]
+    try:
+        start = time.perf_counter()
+        results = server.authenticate_users_batch(logins, client="batcher")
+        elapsed = time.perf_counter() - start
+    except LoginThrottled:
+        results, elapsed = [], 0.0
+    finally:
+        server.close()
+    accepted = sum(1 for success, _ in results if success)
+    print(f"\nbatch of {size} valid logins from one client, default limits: "
+          f"{accepted}/{size} accepted in {elapsed:.2f}s")
+    return accepted == size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--replays", type=int, default=50)
+    parser.add_argument("--legit-interval", type=float, default=1.0)
+    parser.add_argument("--fresh-proofs", type=int, default=200)
+    parser.add_argument("--user-rate", type=float, default=1.0)
+    parser.add_argument("--user-burst", type=float, default=5.0)
+    parser.add_argument("--attackers", type=int, default=12)
+    parser.add_argument("--rotation", type=int, default=400)
+    parser.add_argument("--batch", type=int, default=int(os.environ.get("MAX_LOGIN_BATCH", "256")))
+    args = parser.parse_args()
+
+    cases = {case["name"]: case for case in json.loads(FIXTURES.read_text(encoding="utf-8"))}
+    ok = True
+
+    speedup = replay(cases, args.replays)
+    print(f"  cached rejection is {speedup:,.0f}x faster than verifying")
+    ok &= speedup >= 100
+
+    fresh = [rerandomize_proof(cases["scaled_pi_a"]["proof"]) for _ in range(args.fresh_proofs)]
+    print(f"\nflood: invalid proofs back to back, one valid login every {args.legit_interval:g}s, {args.seconds:g}s each")
+    print(f"{'protection':<18}{'attempts':>9}{'verified':>9}{'verify s':>9}{'bob ok':>9}{'bob p50':>11}")
+    for label, cache, limits in (
+        ("none", False, False),
+        ("cache", True, False),
+        ("cache+limits", True, True),
+    ):
+        attacker, legit = flood(cases, args.seconds, args.legit_interval, fresh,
+                                args.user_rate, args.user_burst, cache, limits)
+        good = sum(1 for success, _ in legit if success)
+        p50 = statistics.median(t for _, t in legit) * 1e3 if legit else 0.0
+        print(f"{label:<18}{attacker['attempts']:>9}{attacker['verifies']:>9}{attacker['seconds']:>9.2f}"
+              f"{good:>5}/{len(legit):<3}{p50:>9.1f}ms")
+        ok &= good == len(legit)
+        if limits:
+            allowed = args.user_burst + args.user_rate * attacker["elapsed"] + 1
+            ok &= attacker["verifies"] <= allowed
+
+    ok &= lockout(cases, fresh, args.attackers)
+    ok &= rotation(cases, fresh, args.rotation)
+    ok &= batch(cases, args.batch)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
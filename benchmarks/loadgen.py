@@ -0,0 +1,490 @@
+"""
+End-to-end load generator for the API.
+
+``run`` drives api_server.app with concurrent virtual users: in-process over
+httpx's ASGI transport (the default), against a server already listening
+(--url), or against one it starts on a free localhost port (--spawn).  Each
+virtual user loops over a weighted --mix of:
+
+- login: replays a login from the corpus, and counts it as expected when a
+  valid proof gets 200 and an invalid one 401;
+- register: GET /api/register/g0, then Client.register for a fresh user
+  and POST /api/register;
+- health: GET /api/health.
+
+Corpus users are registered through /api/register/bulk first, and a
+--warmup period runs unrecorded.  The report covers throughput, p50/p99/p99.9
+latency per endpoint, and per-stage timings from /api/metrics (in-process
+they cover the measured period only; against a server they include
+everything since it started).  The whole result is written as JSON, to
+--out or build/loadgen/<timestamp>.json, and ``compare`` diffs two saved
+runs.
+
+--verifier picks how the server checks proofs:
+- ``fake`` (the default) runs a pool of benchmarks/fake_snarkjs_worker
+  processes with --fake-latency-ms, --fake-jitter-ms and --fake-fail-rate,
+  so no Node is needed;
+- ``native`` uses the in-process verifier;
+- ``snarkjs`` uses the real worker pool.
+The in-process and spawned servers keep users in memory and run with the
+login rate limits off (override with the usual environment variables).
+
+``record`` writes a corpus: --users fresh users registered via
+Client.register with native proofs, plus one invalid login per user (a
+proof of the next user sent with this user's signals).  Without --corpus,
+``run`` uses the logins in fixtures/auth_proofs.json.  Corpus lines are
+{"op": "register", "hr_id", "Y", "g0"} and
+{"op": "login", "hr_id", "proof", "public_signals", "expected"}.
+
+Exits non-zero when a request fails (transport error or 500), or, when no
+failures were injected, any response is other than expected.
+
+    python -m benchmarks.loadgen record [--users N] [--out FILE]
+    python -m benchmarks.loadgen run [--corpus FILE] [--url URL | --spawn] [--concurrency N]
+        [--duration S] [--mix login=8,register=2] [--verifier fake|native|snarkjs]
+        [--fake-latency-ms N] [--fake-jitter-ms N] [--fake-fail-rate P] [--out FILE]
+    python -m benchmarks.loadgen compare OLD.json NEW.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import secrets
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+FIXTURES = Path(__file__).parent / "fixtures" / "auth_proofs.json"
+RESULTS_DIR = Path("build") / "loadgen"
+QUANTILES = (("p50", 0.5), ("p99", 0.99), ("p999", 0.999))
+_STAGE_LINE = re.compile(r'^zkp_stage_duration_(quantile_seconds|seconds_count|seconds_sum)\{([^}]*)\} (\S+)$')
+
+
+# --- corpus -----------------------------------------------------------------
+
+def fixture_corpus():
+    """Registrations for the fixture's valid users and every fixture login that passes the signal checks."""
+    cases = json.loads(FIXTURES.read_text(encoding="utf-8"))
+    users = {case["name"]: case["public_signals"] for case in cases if case["expected"]}
+    registrations = [{"hr_id": name, "g0": g0, "Y": Y} for name, (g0, Y) in users.items()]
+    logins = []
+    for case in cases:
+        for name, signals in users.items():
+            if case["public_signals"] == signals:
+                logins.append({"hr_id": name, "proof": case["proof"],
+                               "public_signals": case["public_signals"], "expected": case["expected"]})
+    return registrations, logins
+
+
+def load_corpus(path):
+    registrations, logins = [], []
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            op = entry.pop("op")
+            (registrations if op == "register" else logins).append(entry)
+    return registrations, logins
+
+
+def record(args):
+    os.environ.setdefault("ZKSNARK_PROVE_BACKEND", "native")
+    os.environ.setdefault("ZKSNARK_WITNESS_BACKEND", "native")
+    from zkp_protocol import Client, Server
+
+    server = Server()
+    client = Client(proof_cache_size=0)
+    users = []
+    started = time.perf_counter()
+    for i in range(args.users):
+        hr_id = f"{args.prefix}{i}"
+        password = secrets.token_hex(12)
+        registration = client.register(hr_id, password, server.get_random_g0())
+        payload = client.login(hr_id, password)
+        users.append((registration, payload))
+    server.close()
+
+    with open(args.out, "w", encoding="utf-8") as out:
+        for registration, _ in users:
+            out.write(json.dumps({"op": "register", "hr_id": registration["hr_id"],
+                                  "Y": str(registration["Y"]), "g0": str(registration["g0"])}) + "\n")
+        for registration, payload in users:
+            out.write(json.dumps({"op": "login", **payload, "expected": True}) + "\n")
+        for i, (_, payload) in enumerate(users):
+            other = users[(i + 1) % len(users)][1]
+            if len(users) > 1:
+                out.write(json.dumps({"op": "login", "hr_id": payload["hr_id"], "proof": other["proof"],
+                                      "public_signals": payload["public_signals"], "expected": False}) + "\n")
+    print(f"recorded {len(users)} users in {time.perf_counter() - started:.1f}s to {args.out}")
+
+
+# --- statistics -------------------------------------------------------------
+
+def percentile(ordered, q):
+    """Nearest-rank percentile of a sorted list."""
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+def summarize(samples, elapsed):
+    out = {}
+    for endpoint, rows in sorted(samples.items()):
+        latencies = sorted(latency for latency, _, _ in rows)
+        statuses = {}
+        for _, status, _ in rows:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        out[endpoint] = {
+            "count": len(rows),
+            "rps": len(rows) / elapsed,
+            "unexpected": sum(1 for _, _, expected in rows if not expected),
+            "statuses": statuses,
+            "mean_ms": sum(latencies) / len(latencies) * 1e3,
+            **{f"{name}_ms": percentile(latencies, q) * 1e3 for name, q in QUANTILES},
+            "max_ms": latencies[-1] * 1e3,
+        }
+    return out
+
+
+def parse_stages(text):
+    """{stage: {count, sum_s, p50_ms, ...}} from the /api/metrics exposition."""
+    stages = {}
+    for line in text.splitlines():
+        match = _STAGE_LINE.match(line)
+        if not match:
+            continue
+        kind, labels, value = match.groups()
+        labels = dict(re.findall(r'(\w+)="([^"]*)"', labels))
+        stage = stages.setdefault(labels["stage"], {})
+        if kind == "seconds_count":
+            stage["count"] = int(float(value))
+        elif kind == "seconds_sum":
+            stage["sum_s"] = float(value)
+        else:
+            name = {"0.5": "p50", "0.99": "p99", "0.999": "p999", "max": "max"}.get(labels["quantile"])
+            if name:
+                stage[f"{name}_ms"] = float(value) * 1e3
+    return stages
+
+
+def stage_delta(before, after):
+    """Counts and means for the run only; quantiles are as reported at the end."""
+    out = {}
+    for stage, values in after.items():
+        count = values.get("count", 0) - before.get(stage, {}).get("count", 0)
+        if count <= 0:
+            continue
+        total = values.get("sum_s", 0.0) - before.get(stage, {}).get("sum_s", 0.0)
+        out[stage] = {**values, "count": count, "sum_s": total, "mean_ms": total / count * 1e3}
+    return out
+
+
+# --- load -------------------------------------------------------------------
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ("login", "register", "health"):
+            raise SystemExit(f"unknown operation in --mix: {name}")
+        mix[name] = float(weight or 1)
+    if not any(mix.values()):
+        raise SystemExit("--mix needs at least one positive weight")
+    return mix
+
+
+def server_env(args, tmp):
+    """Environment for an in-process or spawned server."""
+    env = {
+        "USER_DB": "memory",
+        "CHAOTIC_CHECKPOINT": str(Path(tmp) / "chaotic_state.json"),
+        "LOGIN_RATE_PER_USER": "0",
+        "LOGIN_RATE_PER_CLIENT": "0",
+    }
+    if args.verifier == "fake":
+        options = [sys.executable, "-m", "benchmarks.fake_snarkjs_worker",
+                   "--latency-ms", str(args.fake_latency_ms), "--jitter-ms", str(args.fake_jitter_ms),
+                   "--fail-rate", str(args.fake_fail_rate), "--verdict", args.fake_verdict]
+        env.update({"ZKSNARK_VERIFY_BACKEND": "snarkjs", "SNARKJS_POOL_SIZE": str(args.pool_size),
+                    "SNARKJS_WORKER_CMD": " ".join(options)})
+    elif args.verifier == "snarkjs":
+        env.update({"ZKSNARK_VERIFY_BACKEND": "snarkjs", "SNARKJS_POOL_SIZE": str(args.pool_size)})
+    else:
+        env["ZKSNARK_VERIFY_BACKEND"] = "native"
+    # Anything set explicitly in the environment wins.
+    return {key: os.environ.get(key, value) for key, value in env.items()}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def spawn_server(env, port):
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api_server:app", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning"],
+        env={**os.environ, **env},
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"server exited with status {proc.returncode}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/api/health", timeout=1).status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    proc.terminate()
+    raise SystemExit("server did not come up within 60s")
+
+
+class Load:
+    def __init__(self, http, logins, mix, run_id, seed):
+        self.http = http
+        self.logins = logins
+        self.ops = [op for op, weight in mix.items() if weight > 0]
+        self.weights = [mix[op] for op in self.ops]
+        self.run_id = run_id
+        self.rng = random.Random(seed)
+        self.registered = 0
+        self.samples = {}
+        self.recording = False
+
+    async def _call(self, endpoint, request, expect):
+        start = time.perf_counter()
+        try:
+            response = await request
+            status = response.status_code
+        except httpx.HTTPError:
+            response, status = None, 0
+        latency = time.perf_counter() - start
+        if self.recording:
+            self.samples.setdefault(endpoint, []).append((latency, status, status == expect))
+        return response
+
+    async def login(self):
+        entry = self.rng.choice(self.logins)
+        body = {"hr_id": entry["hr_id"], "proof": entry["proof"], "public_signals": entry["public_signals"]}
+        await self._call("POST /api/login", self.http.post("/api/login", json=body),
+                         200 if entry["expected"] else 401)
+
+    async def register(self, client):
+        response = await self._call("GET /api/register/g0", self.http.get("/api/register/g0"), 200)
+        if response is None or response.status_code != 200:
+            return
+        self.registered += 1
+        hr_id = f"load-{self.run_id}-{self.registered}"
+        registration = client.register(hr_id, secrets.token_hex(12), int(response.json()["g0"]))
+        body = {"hr_id": hr_id, "Y": str(registration["Y"]), "g0": str(registration["g0"])}
+        await self._call("POST /api/register", self.http.post("/api/register", json=body), 200)
+
+    async def health(self):
+        await self._call("GET /api/health", self.http.get("/api/health"), 200)
+
+    async def user(self, deadline):
+        from zkp_protocol import Client
+
+        client = Client(proof_cache_size=0)
+        while time.perf_counter() < deadline:
+            op = self.rng.choices(self.ops, self.weights)[0]
+            if op == "login":
+                await self.login()
+            elif op == "register":
+                await self.register(client)
+            else:
+                await self.health()
+
+    async def run(self, concurrency, seconds):
+        deadline = time.perf_counter() + seconds
+        await asyncio.gather(*(self.user(deadline) for _ in range(concurrency)))
+
+
+async def drive(http, registrations, logins, args, reset_metrics):
+    body = "".join(json.dumps(r) + "\n" for r in registrations)
+    response = await http.post("/api/register/bulk", content=body.encode("utf-8"))
+    response.raise_for_status()
+
+    load = Load(http, logins, parse_mix(args.mix), datetime.now().strftime("%H%M%S"), args.seed)
+    if args.warmup > 0:
+        await load.run(args.concurrency, args.warmup)
+    if reset_metrics is not None:
+        reset_metrics()
+    before = parse_stages((await http.get("/api/metrics")).text)
+    load.recording = True
+    started = time.perf_counter()
+    await load.run(args.concurrency, args.duration)
+    elapsed = time.perf_counter() - started
+    load.recording = False
+    after = parse_stages((await http.get("/api/metrics")).text)
+    return load.samples, elapsed, stage_delta(before, after)
+
+
+def run(args):
+    if args.corpus:
+        registrations, logins = load_corpus(args.corpus)
+    else:
+        registrations, logins = fixture_corpus()
+    if not logins and "login" in parse_mix(args.mix):
+        raise SystemExit("the corpus has no logins")
+
+    timeout = httpx.Timeout(args.timeout)
+    with tempfile.TemporaryDirectory() as tmp:
+        env = server_env(args, tmp)
+        if args.url:
+            target = args.url
+            samples, elapsed, stages = asyncio.run(_remote(args.url, registrations, logins, args, timeout))
+        elif args.spawn:
+            port = free_port()
+            target = f"spawned http://127.0.0.1:{port}"
+            proc = spawn_server(env, port)
+            try:
+                samples, elapsed, stages = asyncio.run(
+                    _remote(f"http://127.0.0.1:{port}", registrations, logins, args, timeout))
+            finally:
+                proc.terminate()
+                proc.wait(10)
+        else:
+            target = "in-process"
+            os.environ.update(env)
+            import api_server
+            import zksnark_utils
+            from metrics import METRICS
+
+            async def local():
+                transport = httpx.ASGITransport(app=api_server.app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://loadgen", timeout=timeout) as http:
+                    return await drive(http, registrations, logins, args, METRICS.reset)
+
+            try:
+                samples, elapsed, stages = asyncio.run(local())
+            finally:
+                api_server.verify_scheduler.shutdown()
+                api_server.server_instance.close()
+                zksnark_utils.shutdown_worker_pool()
+
+    endpoints = summarize(samples, elapsed)
+    total = sum(e["count"] for e in endpoints.values())
+    result = {
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "target": target,
+        "config": {**{k: v for k, v in vars(args).items() if k != "func"},
+                   "corpus_logins": len(logins), "corpus_users": len(registrations), "cpus": os.cpu_count()},
+        "server_env": env if not args.url else None,
+        "duration_s": elapsed,
+        "requests": total,
+        "throughput_rps": total / elapsed,
+        "endpoints": endpoints,
+        "stages": stages,
+    }
+    out = Path(args.out) if args.out else RESULTS_DIR / f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(result, indent=2) + "\n", encoding="utf-8")
+
+    report(result)
+    print(f"\nresults written to {out}")
+    failed = sum(n for e in endpoints.values() for status, n in e["statuses"].items() if status in ("0", "500"))
+    unexpected = sum(e["unexpected"] for e in endpoints.values())
+    ok = failed == 0 and (unexpected == 0 or args.fake_fail_rate > 0)
+    sys.exit(0 if ok else 1)
+
+
+async def _remote(url, registrations, logins, args, timeout):
+    limits = httpx.Limits(max_connections=args.concurrency + 2)
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as http:
+        return await drive(http, registrations, logins, args, None)
+
+
+def report(result):
+    print(f"{result['target']}: {result['requests']} requests in {result['duration_s']:.1f}s, "
+          f"{result['throughput_rps']:.1f} req/s")
+    print(f"{'endpoint':<24}{'count':>7}{'req/s':>9}{'p50 ms':>10}{'p99 ms':>10}{'p99.9 ms':>10}"
+          f"{'unexpected':>12}  statuses")
+    for endpoint, e in result["endpoints"].items():
+        statuses = " ".join(f"{s}:{n}" for s, n in sorted(e["statuses"].items()))
+        print(f"{endpoint:<24}{e['count']:>7}{e['rps']:>9.1f}{e['p50_ms']:>10.2f}{e['p99_ms']:>10.2f}"
+              f"{e['p999_ms']:>10.2f}{e['unexpected']:>12}  {statuses}")
+    if result["stages"]:
+        print(f"\n{'stage':<24}{'count':>7}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}{'p99.9 ms':>10}")
+        for stage, s in sorted(result["stages"].items()):
+            print(f"{stage:<24}{s['count']:>7}{s['mean_ms']:>10.3f}{s.get('p50_ms', 0):>10.3f}"
+                  f"{s.get('p99_ms', 0):>10.3f}{s.get('p999_ms', 0):>10.3f}")
+
+
+def _change(old, new):
+    if old is None or new is None:
+        return f"{'-' if old is None else f'{old:.2f}'} -> {'-' if new is None else f'{new:.2f}'}"
+    pct = f"{(new / old - 1):+.1%}" if old else "n/a"
+    return f"{old:.2f} -> {new:.2f} ({pct})"
+
+
+def compare(args):
+    old = json.loads(Path(args.old).read_text(encoding="utf-8"))
+    new = json.loads(Path(args.new).read_text(encoding="utf-8"))
+    print(f"old: {args.old} ({old['started_at']}, {old['target']})")
+    print(f"new: {args.new} ({new['started_at']}, {new['target']})")
+    print(f"throughput req/s: {_change(old['throughput_rps'], new['throughput_rps'])}")
+    for section, fields in (("endpoints", ("rps", "p50_ms", "p99_ms", "p999_ms")),
+                            ("stages", ("mean_ms", "p50_ms", "p99_ms", "p999_ms"))):
+        names = sorted(set(old[section]) | set(new[section]))
+        if names:
+            print(f"\n{section}")
+        for name in names:
+            a, b = old[section].get(name, {}), new[section].get(name, {})
+            print(f"  {name}")
+            for field in fields:
+                print(f"    {field:<8} {_change(a.get(field), b.get(field))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rec = commands.add_parser("record", help="write a login corpus with native proofs")
+    rec.add_argument("--users", type=int, default=10)
+    rec.add_argument("--prefix", default="corpus-user-")
+    rec.add_argument("--out", default="build/loadgen/corpus.ndjson")
+    rec.set_defaults(func=record)
+
+    go = commands.add_parser("run", help="drive the API and report latency and throughput")
+    go.add_argument("--corpus", help="NDJSON corpus from 'record' (default: the fixture proofs)")
+    where = go.add_mutually_exclusive_group()
+    where.add_argument("--url", help="an already running server, e.g. http://127.0.0.1:8000")
+    where.add_argument("--spawn", action="store_true", help="start a server on a free localhost port")
+    go.add_argument("--concurrency", type=int, default=8)
+    go.add_argument("--duration", type=float, default=10.0)
+    go.add_argument("--warmup", type=float, default=2.0)
+    go.add_argument("--mix", default="login=8,register=2")
+    go.add_argument("--verifier", choices=("fake", "native", "snarkjs"), default="fake")
+    go.add_argument("--pool-size", type=int, default=2)
+    go.add_argument("--fake-latency-ms", type=float, default=20.0)
+    go.add_argument("--fake-jitter-ms", type=float, default=5.0)
+    go.add_argument("--fake-fail-rate", type=float, default=0.0)
+    go.add_argument("--fake-verdict", choices=("native", "accept", "reject"), default="native")
+    go.add_argument("--timeout", type=float, default=60.0)
+    go.add_argument("--seed", type=int, default=None)
+    go.add_argument("--out", help="result file (default: build/loadgen/<timestamp>.json)")
+    go.set_defaults(func=run)
+
+    cmp_ = commands.add_parser("compare", help="diff two result files")
+    cmp_.add_argument("old")
+    cmp_.add_argument("new")
+    cmp_.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
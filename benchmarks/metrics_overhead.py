@@ -0,0 +1,82 @@
+"""
+Cost of the metrics layer (metrics.METRICS) on the hot path.
+
+Times an empty ``with METRICS.timer(...)`` block, a counter increment and a
+histogram record with metrics enabled and disabled, and the time to render
+/api/metrics with every stage populated.  Also checks the HDR histogram's
+quantiles against exact ones on a skewed sample: each must be within one
+bucket (1 / SUB_BUCKETS relative).  Exits non-zero if that check fails.
+
+    python -m benchmarks.metrics_overhead [--iterations 1000000]
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from metrics import SUB_BUCKETS, Histogram, Metrics
+
+
+def per_call_ns(func, iterations):
+    start = time.perf_counter_ns()
+    func(iterations)
+    return (time.perf_counter_ns() - start) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    def empty(n):
+        for _ in range(n):
+            pass
+
+    baseline = per_call_ns(empty, args.iterations)
+    for enabled in (False, True):
+        metrics = Metrics(enabled)
+        timer, inc = metrics.timer, metrics.inc
+
+        def timed(n):
+            for _ in range(n):
+                with timer("stage"):
+                    pass
+
+        def counted(n):
+            for _ in range(n):
+                inc("zkp_login_outcomes_total", outcome="valid")
+
+        print(f"metrics {'enabled' if enabled else 'disabled'}:")
+        print(f"  {'timer block':<20}{per_call_ns(timed, args.iterations) - baseline:8.0f} ns")
+        print(f"  {'counter increment':<20}{per_call_ns(counted, args.iterations) - baseline:8.0f} ns")
+
+    histogram = Histogram()
+    rng = random.Random(1)
+    sample = sorted(int(rng.lognormvariate(15, 1.5)) for _ in range(200_000))
+    record = histogram.record
+    start = time.perf_counter_ns()
+    for value in sample:
+        record(value)
+    print(f"  {'histogram record':<20}{(time.perf_counter_ns() - start) / len(sample):8.0f} ns")
+
+    ok = True
+    for q, got in zip((0.5, 0.9, 0.99, 0.999), histogram.quantiles((0.5, 0.9, 0.99, 0.999))):
+        exact = sample[max(0, int(q * len(sample) + 0.5) - 1)]
+        error = abs(got - exact) / exact
+        ok &= error <= 1 / SUB_BUCKETS
+        print(f"  p{q * 100:g}: {got / 1e6:10.3f} ms  exact {exact / 1e6:10.3f} ms  error {error:.2%}")
+
+    metrics = Metrics()
+    for stage in range(20):
+        for value in sample[::100]:
+            metrics.histogram(f"stage{stage}").record(value)
+    start = time.perf_counter()
+    text = metrics.render()
+    print(f"render 20 stages: {(time.perf_counter() - start) * 1000:.2f} ms, {len(text):,} bytes")
+    print(f"quantiles within one bucket: {ok}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Login verification throughput with N worker processes sharing one user index.
+
+Registers every user from ``fixtures/auth_proofs.json`` in a SQLite user
+store with its mmap index (mmap_index.SharedUserStore), then for each worker
+count starts that many processes.  Each one opens the shared store and builds
+its own Server with the native verifier, like an api_server worker, and runs
+authenticate_user for --seconds on the valid proofs.  Reported per worker
+count:
+
+- logins/s summed over the workers, the speedup over one worker and the
+  scaling efficiency (speedup / workers);
+- user index lookups/s summed over the workers, with no verification.
+
+Verification is CPU-bound, so scaling can only be linear up to the number of
+cores; worker counts default to powers of two up to os.cpu_count().  Exits
+non-zero if any login is rejected or a worker cannot see the users.
+
+    python -m benchmarks.multiworker [--max-workers N] [--seconds S]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from mmap_index import SharedUserStore
+from user_store import UserRecord
+
+FIXTURES = Path(__file__).parent / "fixtures" / "auth_proofs.json"
+
+
+def load_logins():
+    cases = [case for case in json.loads(FIXTURES.read_text(encoding="utf-8")) if case["expected"]]
+    return [(case["name"], case["proof"], case["public_signals"]) for case in cases]
+
+
+def worker(db, logins, seconds, mode, start, results):
+    from zkp_protocol import Server
+
+    store = SharedUserStore(db)
+    server = Server(verify_backend="native", store=store)
+    # Warm up the verifier (key parsing) before the clock starts.
+    server.authenticate_user(*logins[0])
+    start.wait()
+    count = failures = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        for hr_id, proof, signals in logins:
+            if mode == "login":
+                failures += not server.authenticate_user(hr_id, proof, signals)[0]
+            else:
+                failures += store.get(hr_id) is None
+            count += 1
+    results.put((count, failures, seconds))
+    server.close()
+
+
+def run(db, logins, workers, seconds, mode):
+    ctx = multiprocessing.get_context("spawn")
+    start = ctx.Barrier(workers + 1)
+    results = ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(db, logins, seconds, mode, start, results)) for _ in range(workers)]
+    for proc in procs:
+        proc.start()
+    start.wait()
+    totals = [results.get() for _ in procs]
+    for proc in procs:
+        proc.join()
+    rate = sum(count / elapsed for count, _, elapsed in totals)
+    return rate, sum(failures for _, failures, _ in totals)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    logins = load_logins()
+    counts = [1]
+    while counts[-1] * 2 <= args.max_workers:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != args.max_workers:
+        counts.append(args.max_workers)
+    print(f"{os.cpu_count()} CPUs, {len(logins)} users, {args.seconds:g}s per run")
+    ok = True
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = str(Path(tmp) / "users.db")
+        store = SharedUserStore(db)
+        store.add_many((hr_id, UserRecord(int(signals[0]), int(signals[1]))) for hr_id, _, signals in logins)
+        store.close()
+
+        for mode, unit in (("login", "logins/s"), ("lookup", "lookups/s")):
+            print(f"{'workers':>8}{unit:>16}{'speedup':>10}{'efficiency':>12}")
+            base = None
+            for workers in counts:
+                rate, failures = run(db, logins, workers, args.seconds, mode)
+                base = base or rate
+                speedup = rate / base
+                print(f"{workers:>8}{rate:16,.1f}{speedup:10.2f}{speedup / workers:12.0%}"
+                      + (f"   {failures} FAILED" if failures else ""))
+                ok &= failures == 0
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark the in-process Groth16 prover against snarkjs.
+
+Proves random (g0, password) statements with ``generate_proof(backend=
+"native")`` and checks every proof with ``verify_proof`` (native backend,
+plus snarkjs when installed).  Pippenger MSM is also timed against the
+naive double-and-add sum on random G1 points, and when the snarkjs CLI is
+available the same statements are proved through it for comparison.
+Re-randomizing a cached proof (the Client's repeat-login path) is timed
+too.  Exits non-zero if any proof is rejected.
+
+    python -m benchmarks.prover [--count N] [--msm-size N]
+"""
+
+import argparse
+import random
+import sys
+import time
+
+import zksnark_utils
+from bn254 import CURVE_ORDER, G1_GENERATOR, g1_lincomb, g1_msm, g1_mul
+from hash_utils import compute_commitment, hash_password_to_field
+from zksnark_utils import generate_proof, rerandomize_proof, verify_proof
+from benchmarks.verify_backends import snarkjs_available
+
+
+def make_statements(count, seed=1):
+    rng = random.Random(seed)
+    statements = []
+    for i in range(count):
+        g0 = rng.randrange(1000, 10**6)
+        x = hash_password_to_field(f"password-{i}")
+        statements.append((g0, x, compute_commitment(g0, x)))
+    return statements
+
+
+def time_prove(statements, backend):
+    proofs = []
+    start = time.perf_counter()
+    for g0, x, y in statements:
+        proofs.append(generate_proof(g0, x, y, backend=backend))
+    elapsed = time.perf_counter() - start
+    print(f"{backend:<8} prove  {elapsed / len(statements) * 1000:9.1f} ms/proof")
+    return proofs
+
+
+def check_proofs(proofs, backends) -> bool:
+    ok = True
+    for backend in backends:
+        accepted = sum(verify_proof(proof, signals, backend=backend) for proof, signals in proofs)
+        ok &= accepted == len(proofs)
+        print(f"verify_proof[{backend}] accepted {accepted}/{len(proofs)}")
+    return ok
+
+
+def time_rerandomize(proofs):
+    start = time.perf_counter()
+    fresh = [(rerandomize_proof(proof), signals) for proof, signals in proofs]
+    elapsed = time.perf_counter() - start
+    print(f"re-randomize   {elapsed / len(proofs) * 1000:9.1f} ms/proof")
+    return fresh
+
+
+def time_msm(size, seed=2):
+    rng = random.Random(seed)
+    points = [g1_mul(G1_GENERATOR, rng.randrange(1, CURVE_ORDER)) for _ in range(size)]
+    scalars = [rng.randrange(CURVE_ORDER) for _ in range(size)]
+
+    start = time.perf_counter()
+    fast = g1_msm(points, scalars)
+    pippenger = time.perf_counter() - start
+    start = time.perf_counter()
+    naive = g1_lincomb(points, scalars)
+    double_and_add = time.perf_counter() - start
+
+    print(
+        f"G1 MSM n={size}: pippenger {pippenger * 1000:.1f} ms, "
+        f"double-and-add {double_and_add * 1000:.1f} ms ({double_and_add / pippenger:.1f}x)"
+    )
+    return fast == naive
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=20)
+    parser.add_argument("--msm-size", type=int, default=256)
+    args = parser.parse_args()
+
+    statements = make_statements(args.count)
+    have_snarkjs = snarkjs_available()
+
+    start = time.perf_counter()
+    zksnark_utils._native_prover()
+    print(f"native   key load {(time.perf_counter() - start) * 1000:7.1f} ms (once per process)")
+
+    proofs = time_prove(statements, "native")
+    ok = check_proofs(proofs, ["native"] + (["snarkjs"] if have_snarkjs else []))
+
+    ok &= check_proofs(time_rerandomize(proofs), ["native"])
+
+    if have_snarkjs:
+        snarkjs_proofs = time_prove(statements, "snarkjs")
+        ok &= check_proofs(snarkjs_proofs, ["native"])
+    else:
+        print("[INFO] snarkjs not available; skipping snarkjs prove timing")
+
+    msm_ok = time_msm(args.msm_size)
+    if not msm_ok:
+        print("[FAIL] Pippenger result differs from double-and-add")
+    sys.exit(0 if ok and msm_ok else 1)
+
+
+if __name__ == "__main__":
+    main()
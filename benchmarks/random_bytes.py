@@ -0,0 +1,62 @@
+"""
+Throughput and basic statistics of ChaoticGenerator's byte stream.
+
+Times random_bytes and readinto into a preallocated buffer against the
+bytes/s that get_random_value and get_seed_from_state (after advancing the
+state with get_random_value) deliver, then runs the randomness_checks suite
+(monobit, runs, chi-square) on the stream and, for comparison, on
+os.urandom.  Exits non-zero if a check on the stream fails.
+
+    python -m benchmarks.random_bytes [--megabytes N]
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+
+from chaotic_generator import ChaoticGenerator
+import randomness_checks
+
+
+def rate(label, nbytes, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28}{nbytes / elapsed / 1e6:12.3f} MB/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--megabytes", type=int, default=16)
+    parser.add_argument("--values", type=int, default=2000)
+    args = parser.parse_args()
+    size = args.megabytes << 20
+
+    gen = ChaoticGenerator()
+    gen.random_bytes(1)  # build and warm up the stream trajectories
+    rate("random_bytes", size, lambda: gen.random_bytes(size))
+    buffer = bytearray(size)
+    rate("readinto(bytearray)", size, lambda: gen.readinto(buffer))
+
+    # get_random_value yields log2(9000) bits per call in its default range.
+    scalar = ChaoticGenerator()
+    rate("get_random_value", args.values * math.log2(9000) / 8,
+         lambda: [scalar.get_random_value() for _ in range(args.values)])
+    # get_seed_from_state only changes when the state advances.
+    rate("get_seed_from_state", args.values * 32,
+         lambda: [(scalar.get_random_value(), scalar.get_seed_from_state()) for _ in range(args.values)])
+
+    ok = True
+    sample = bytes(buffer[:1 << 20])
+    for source, data in (("stream", sample), ("os.urandom", os.urandom(len(sample)))):
+        for result in randomness_checks.run_all(data):
+            if source == "stream":
+                ok &= result["passed"]
+            print(f"{source:<12}{result['test']:<12}p={result['p_value']:.4f}  passed={result['passed']}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Operations per second for each rsa_utils path.
+
+- key pairs: fresh generation, KeyPool.get on a warm pool, and loading a
+  saved key as PEM (with and without the key check), DER and
+  passphrase-encrypted PEM;
+- raw private exponentiation c^d mod n: the old bit-by-bit loop, pow() and
+  the CRT form;
+- encrypt_number / decrypt_number one at a time against
+  encrypt_numbers / decrypt_numbers on the RSA thread pool.
+
+Every path's results are checked against the plain one (loaded keys match,
+CRT equals pow(), batches equal the sequential results); exits non-zero on
+any mismatch.  The thread pool can only beat the loop with more than one
+core.
+
+    python -m benchmarks.rsa_ops [--seconds S] [--batch N] [--key-size BITS]
+"""
+
+import argparse
+import os
+import secrets
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from rsa_utils import RSA_THREADS, KeyPool, RSAKeyPair, rsa_crt_exponentiation
+
+
+def bitwise_modexp(base, exponent, modulus):
+    """rsa_modular_exponentiation as it was: one Python step per exponent bit."""
+    result = 1
+    base = base % modulus
+    while exponent > 0:
+        if exponent % 2 == 1:
+            result = (result * base) % modulus
+        exponent = exponent >> 1
+        base = (base * base) % modulus
+    return result
+
+
+def rate(func, seconds, per_call=1):
+    """Calls of func per second over at least ``seconds`` (and at least one call)."""
+    count = 0
+    start = time.perf_counter()
+    while True:
+        func()
+        count += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds:
+            return count * per_call / elapsed
+
+
+def row(label, ops):
+    print(f"  {label:<38}{ops:12,.1f} ops/s")
+    return ops
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=2.0)
+    parser.add_argument("--batch", type=int, default=256)
+    parser.add_argument("--key-size", type=int, default=2048)
+    args = parser.parse_args()
+    seconds, bits = args.seconds, args.key_size
+    ok = True
+    print(f"{os.cpu_count()} CPUs, RSA_THREADS={RSA_THREADS}, {bits}-bit keys")
+
+    print("key pairs")
+    row("generate", rate(lambda: RSAKeyPair(bits), seconds))
+    pool = KeyPool(size=4, key_size=bits).start()
+    while len(pool) < 4:
+        time.sleep(0.05)
+    # One draw at a time, waiting for the refill between draws, so each get() hits.
+    start = time.perf_counter()
+    draws, waited = 0, 0.0
+    while time.perf_counter() - start < seconds:
+        t = time.perf_counter()
+        pool.get()
+        waited += time.perf_counter() - t
+        draws += 1
+        while len(pool) < 4:
+            time.sleep(0.01)
+    pool.stop()
+    row("KeyPool.get (warm)", draws / waited)
+    print(f"    pool: {pool.snapshot()['misses']} misses in {draws} draws")
+
+    keypair = RSAKeyPair(bits)
+    n, _ = keypair.get_public_key_numbers()
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, encoding, passphrase, validate in (
+            ("load PEM", "PEM", None, True),
+            ("load PEM, validate=False", "PEM", None, False),
+            ("load DER, validate=False", "DER", None, False),
+            ("load PEM+passphrase, validate=False", "PEM", "correct horse", False),
+        ):
+            path = Path(tmp) / f"key.{encoding.lower()}"
+            keypair.save(path, encoding, passphrase)
+            loaded = RSAKeyPair.load(path, passphrase, validate)
+            ok &= loaded.get_public_key_numbers()[0] == n
+            ok &= loaded.decrypt_number(keypair.encrypt_number(12345)) == 12345
+            row(label, rate(lambda: RSAKeyPair.load(path, passphrase, validate), seconds))
+
+    print("private exponentiation c^d mod n")
+    d, _ = keypair.get_private_key_numbers()
+    numbers = keypair.private_key.private_numbers()
+    c = secrets.randbelow(n)
+    expected = pow(c, d, n)
+    ok &= bitwise_modexp(c, d, n) == expected
+    ok &= rsa_crt_exponentiation(c, numbers) == expected
+    ok &= keypair.private_exponentiation(c) == expected
+    loop = row("bit-by-bit loop (old)", rate(lambda: bitwise_modexp(c, d, n), seconds))
+    plain = row("pow()", rate(lambda: pow(c, d, n), seconds))
+    crt = row("CRT", rate(lambda: keypair.private_exponentiation(c), seconds))
+    print(f"    CRT is {crt / plain:.1f}x pow() and {crt / loop:.1f}x the old loop")
+
+    print(f"OAEP numbers, batches of {args.batch}")
+    values = [secrets.randbits(200) for _ in range(args.batch)]
+    ciphertexts = [keypair.encrypt_number(v) for v in values]
+    ok &= keypair.decrypt_numbers(ciphertexts) == values
+    ok &= keypair.decrypt_numbers(keypair.encrypt_numbers(values)) == values
+    row("encrypt_number (loop)", rate(lambda: [keypair.encrypt_number(v) for v in values], seconds, args.batch))
+    row("encrypt_numbers (thread pool)", rate(lambda: keypair.encrypt_numbers(values), seconds, args.batch))
+    row("decrypt_number (loop)", rate(lambda: [keypair.decrypt_number(v) for v in ciphertexts], seconds, args.batch))
+    row("decrypt_numbers (thread pool)", rate(lambda: keypair.decrypt_numbers(ciphertexts), seconds, args.batch))
+
+    print("all results match" if ok else "MISMATCH")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
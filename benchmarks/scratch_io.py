@@ -0,0 +1,118 @@
+"""
+Compare the scratch modes used to hand payloads to the snarkjs CLI.
+
+For each mode in scratch_io.SCRATCH_MODES this times:
+
+- ``in-process``: write the prove payloads (input, witness, proof, public)
+  and read them back, as generate_proof does around its snarkjs calls;
+- ``child``: the same round trip through a Node child that reads its input
+  path and writes its output path with ``fs``, like snarkjs does.
+
+Every mode must hand back byte-identical payloads.  When the snarkjs CLI is
+available, the saved fixture proofs are also verified in every mode and the
+verdicts compared.
+
+    python -m benchmarks.scratch_io [--iterations N] [--payload-kb N]
+"""
+
+import argparse
+import json
+import shutil
+import sys
+import time
+
+import zksnark_utils
+from r1cs_witness import encode_wtns
+from scratch_io import SCRATCH_MODES, mode_supported, scratch_space
+from benchmarks.verify_backends import load_cases, snarkjs_available
+
+NODE_COPY = "const fs = require('fs'); fs.writeFileSync(process.argv[2], fs.readFileSync(process.argv[1]));"
+OUTPUTS = ("proof.json", "public.json")
+
+
+def make_payloads(payload_kb):
+    case = load_cases()[0]
+    witness = zksnark_utils.calculate_witness({"g0": "54918", "Y": str(54918 * 12345), "X": "12345"})
+    wtns = encode_wtns(witness)
+    if payload_kb:
+        # Pad to the witness size of a larger circuit (32 bytes per wire).
+        wtns = encode_wtns(witness + [0] * (payload_kb * 1024 // 32))
+    return {
+        "input.json": json.dumps({"g0": "54918", "Y": str(54918 * 12345), "X": "12345"}).encode(),
+        "witness.wtns": wtns,
+        "proof.json": json.dumps(case["proof"]).encode(),
+        "public.json": json.dumps(case["public_signals"]).encode(),
+    }
+
+
+def in_process_round_trip(mode, payloads):
+    with scratch_space(mode, OUTPUTS) as scratch:
+        for name, data in payloads.items():
+            scratch.write(name, data)
+        return {name: scratch.read(name) for name in payloads}
+
+
+def child_round_trip(mode, payloads, node):
+    with scratch_space(mode, ("witness.wtns",)) as scratch:
+        scratch.write("input.json", payloads["witness.wtns"])
+        zksnark_utils._run_snarkjs(
+            [node, "-e", NODE_COPY, scratch.path("input.json"), scratch.path("witness.wtns")],
+            scratch.pass_fds(),
+        )
+        return scratch.read("witness.wtns")
+
+
+def time_calls(func, iterations):
+    func()  # first call creates the per-thread buffers
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--child-iterations", type=int, default=20)
+    parser.add_argument("--payload-kb", type=int, default=0, help="pad the witness to this size")
+    args = parser.parse_args()
+
+    payloads = make_payloads(args.payload_kb)
+    node = shutil.which("node")
+    modes = [mode for mode in SCRATCH_MODES if mode_supported(mode)]
+    ok = True
+
+    print(f"witness payload {len(payloads['witness.wtns'])} bytes")
+    print(f"{'mode':<8}{'in-process':>14}{'child':>14}   identical")
+    for mode in modes:
+        same = in_process_round_trip(mode, payloads) == payloads
+        per_call = time_calls(lambda: in_process_round_trip(mode, payloads), args.iterations)
+        child = "n/a"
+        if node:
+            same &= child_round_trip(mode, payloads, node) == payloads["witness.wtns"]
+            per_child = time_calls(lambda: child_round_trip(mode, payloads, node), args.child_iterations)
+            child = f"{per_child * 1000:.2f} ms"
+        ok &= same
+        print(f"{mode:<8}{per_call * 1e6:>11.1f} us{child:>14}   {same}")
+    if not node:
+        print("[INFO] node not found; skipping child-process round trips")
+
+    if snarkjs_available():
+        cases = load_cases()
+        expected = [case["expected"] for case in cases]
+        for mode in modes:
+            zksnark_utils.SCRATCH_MODE = mode
+            verdicts = [
+                zksnark_utils.verify_proof(case["proof"], case["public_signals"], backend="snarkjs")
+                for case in cases
+            ]
+            ok &= verdicts == expected
+            print(f"snarkjs verify [{mode}] verdicts match fixtures: {verdicts == expected}")
+    else:
+        print("[INFO] snarkjs not available; skipping snarkjs verify per mode")
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Compare spawn-per-job against the persistent worker pool, and exercise the
+pool's crash recovery and job timeouts.
+
+By default the workers are benchmarks/fake_snarkjs_worker.py with a
+simulated cold start, so no Node toolchain is needed; pass --node to run the
+real scripts/snarkjs_worker.js instead.
+
+    python -m benchmarks.snarkjs_pool [--jobs N] [--size N] [--startup-ms N] [--node]
+"""
+
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import zksnark_utils
+from snarkjs_pool import SnarkjsWorker, SnarkjsWorkerPool, WorkerTimeout
+from benchmarks.verify_backends import load_cases
+
+
+def fake_command(*options):
+    return [sys.executable, "-m", "benchmarks.fake_snarkjs_worker", *options]
+
+
+def artifacts():
+    return [str(zksnark_utils.WASM_PATH), str(zksnark_utils.ZKEY_PATH), str(zksnark_utils.VERIFICATION_KEY_PATH)]
+
+
+def bench_spawn(command, case, jobs):
+    start = time.perf_counter()
+    for _ in range(jobs):
+        worker = SnarkjsWorker(command)
+        worker.call("verify", {"proof": case["proof"], "public_signals": case["public_signals"]})
+        worker.close()
+    return (time.perf_counter() - start) / jobs
+
+
+def bench_pool(command, case, jobs, size):
+    pool = SnarkjsWorkerPool(command, size=size)
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=size) as executor:
+            verdicts = list(executor.map(
+                lambda _: pool.verify(case["proof"], case["public_signals"]), range(jobs)
+            ))
+        elapsed = (time.perf_counter() - start) / jobs
+        assert all(verdicts), "pool rejected a valid proof"
+        return elapsed
+    finally:
+        pool.shutdown()
+
+
+def check_recovery(case):
+    """A worker that dies every 3 jobs must be restarted transparently."""
+    pool = SnarkjsWorkerPool(fake_command("--crash-after", "3") + artifacts(), size=2)
+    try:
+        verdicts = [pool.verify(case["proof"], case["public_signals"]) for _ in range(10)]
+        health = pool.health_check()
+        ok = all(verdicts) and health["healthy"] == 2 and pool.stats["restarts"] > 0
+        print(f"crash recovery: {'ok' if ok else 'FAILED'}  {health}")
+        return ok
+    finally:
+        pool.shutdown()
+
+
+def check_timeout(case):
+    """A job exceeding its timeout must raise and leave the pool usable."""
+    pool = SnarkjsWorkerPool(fake_command("--latency-ms", "500") + artifacts(), size=1, job_timeout=0.1)
+    try:
+        try:
+            pool.verify(case["proof"], case["public_signals"])
+            timed_out = False
+        except WorkerTimeout:
+            timed_out = True
+        recovered = pool.verify(case["proof"], case["public_signals"], timeout=5.0)
+        ok = timed_out and recovered
+        print(f"job timeout:    {'ok' if ok else 'FAILED'}  {pool.stats}")
+        return ok
+    finally:
+        pool.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=40)
+    parser.add_argument("--size", type=int, default=4)
+    parser.add_argument("--startup-ms", type=float, default=300.0, help="simulated worker cold start")
+    parser.add_argument("--node", action="store_true", help="use the real Node worker")
+    args = parser.parse_args()
+
+    case = next(case for case in load_cases() if case["expected"])
+    if args.node:
+        command = zksnark_utils._worker_command()
+    else:
+        command = fake_command("--startup-ms", str(args.startup_ms), "--verdict", "accept") + artifacts()
+
+    spawn = bench_spawn(command, case, max(1, args.jobs // 4))
+    pooled = bench_pool(command, case, args.jobs, args.size)
+    print(f"spawn per job  {spawn * 1000:8.1f} ms/job")
+    print(f"pool (size {args.size}) {pooled * 1000:8.1f} ms/job   {spawn / pooled:6.1f}x")
+
+    ok = check_recovery(case) & check_timeout(case)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Cold-start cost of the API server: import time and the first requests.
+
+1. Import: ``import api_server`` in a fresh interpreter, as shipped (heavy
+   modules load on first use) and with the modules it used to import up
+   front (NumPy through chaotic_shards, the BN254 prover and verifier,
+   uvicorn) loaded first.  Also checks that none of them is loaded by the
+   plain import.
+2. First requests: starts ``python api_server.py`` with WARMUP=1 and
+   WARMUP=0 and times, from process start, the first 200 from /api/health
+   (live) and from /api/ready (ready); then the first GET /api/register/g0,
+   registration of the fixture user valid_alice, her first login and the
+   median of the next --logins logins.
+
+Each measurement is the median of --runs fresh processes.  Exits non-zero if
+the import loads a deferred module, if a server never gets ready or rejects
+the login, or if after the warm-up the first login takes more than
+--max-first-ratio times a steady one.
+
+    python -m benchmarks.startup [--runs N] [--logins N] [--verifier native|fake]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.loadgen import FIXTURES, free_port, server_env
+
+DEFERRED = ("numpy", "bn254", "groth16_verifier", "groth16_prover", "chaotic_shards", "uvicorn")
+EAGER_IMPORTS = "import numpy, chaotic_shards, groth16_verifier, groth16_prover, uvicorn; "
+IMPORT_SCRIPT = (
+    "import json, sys, time; started = time.perf_counter(); {eager}import api_server; "
+    "print(json.dumps({{'seconds': time.perf_counter() - started, "
+    "'loaded': [m for m in {deferred!r} if m in sys.modules]}}))"
+)
+
+
+def time_import(env, eager):
+    script = IMPORT_SCRIPT.format(eager=EAGER_IMPORTS if eager else "", deferred=DEFERRED)
+    out = subprocess.run([sys.executable, "-c", script], env={**os.environ, **env},
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def wait_for(url, began, proc, timeout=120.0):
+    """Seconds from ``began`` until ``url`` answers 200, polling every 10 ms; None on timeout."""
+    while time.perf_counter() - began < timeout:
+        if proc.poll() is not None:
+            return None
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return time.perf_counter() - began
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.01)
+    return None
+
+
+def timed(call):
+    started = time.perf_counter()
+    response = call()
+    return time.perf_counter() - started, response
+
+
+def cold_start(env, warmup, user, logins):
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    began = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "api_server.py", "--host", "127.0.0.1", "--port", str(port)],
+        env={**os.environ, **env, "WARMUP": "1" if warmup else "0"},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        row = {"live": wait_for(f"{base}/api/health", began, proc)}
+        row["ready"] = wait_for(f"{base}/api/ready", began, proc)
+        if row["ready"] is None:
+            return row, False
+        with httpx.Client(base_url=base, timeout=120) as http:
+            row["g0"], _ = timed(lambda: http.get("/api/register/g0"))
+            g0, Y = user["public_signals"]
+            row["register"], _ = timed(lambda: http.post("/api/register", json={"hr_id": "valid_alice", "Y": Y, "g0": g0}))
+            body = {"hr_id": "valid_alice", "proof": user["proof"], "public_signals": user["public_signals"]}
+            row["first_login"], first = timed(lambda: http.post("/api/login", json=body))
+            steady = [timed(lambda: http.post("/api/login", json=body)) for _ in range(logins)]
+        row["steady_login"] = statistics.median(seconds for seconds, _ in steady)
+        ok = first.status_code == 200 and all(response.status_code == 200 for _, response in steady)
+        return row, ok
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--logins", type=int, default=5)
+    parser.add_argument("--verifier", choices=("native", "fake"), default="native")
+    parser.add_argument("--pool-size", type=int, default=1)
+    parser.add_argument("--fake-latency-ms", type=float, default=0.0)
+    parser.add_argument("--max-first-ratio", type=float, default=2.0)
+    args = parser.parse_args()
+    # server_env's fake worker options, fixed for this benchmark.
+    args.fake_jitter_ms, args.fake_fail_rate, args.fake_verdict = 0.0, 0.0, "native"
+
+    cases = {case["name"]: case for case in json.loads(FIXTURES.read_text(encoding="utf-8"))}
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        env = server_env(args, tmp)
+
+        print(f"import api_server, median of {args.runs} fresh interpreters")
+        for label, eager in (("deferred (as shipped)", False), ("heavy modules up front", True)):
+            results = [time_import(env, eager) for _ in range(args.runs)]
+            print(f"  {label:<26}{statistics.median(r['seconds'] for r in results) * 1e3:9.1f} ms")
+            if not eager and results[0]["loaded"]:
+                print(f"  loaded on import: {', '.join(results[0]['loaded'])}")
+                ok = False
+
+        print(f"\npython api_server.py ({args.verifier} verifier), ms from process start / per request")
+        columns = ("live", "ready", "g0", "register", "first_login", "steady_login")
+        print(f"{'':<12}" + "".join(f"{name:>14}" for name in columns))
+        for warmup in (True, False):
+            rows = []
+            for _ in range(args.runs):
+                row, passed = cold_start(env, warmup, cases["valid_alice"], args.logins)
+                ok &= passed
+                rows.append(row)
+            if not all(row["ready"] is not None for row in rows):
+                print(f"WARMUP={int(warmup)}: server did not get ready")
+                ok = False
+                continue
+            medians = {name: statistics.median(row[name] for row in rows) for name in columns}
+            print(f"{f'WARMUP={int(warmup)}':<12}" + "".join(f"{medians[name] * 1e3:14.1f}" for name in columns))
+            if warmup:
+                ok &= medians["first_login"] <= args.max_first_ratio * medians["steady_login"]
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
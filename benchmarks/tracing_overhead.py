@@ -0,0 +1,204 @@
+"""
+Cost of the tracing hooks and the sampling profiler.
+
+Three layers are timed with tracing disabled, compared against the same code
+without the hooks, and then with tracing enabled:
+
+- METRICS.timer() as a context manager, against the pre-tracing timer body;
+- TraceMiddleware around a one-route FastAPI app, against calling the app
+  directly over ASGI;
+- Server.authenticate_user on its cheapest path (unknown user), which runs
+  the login checks under a timer, against the pre-tracing timer body.
+
+Each figure is the best of --repeat runs.  It then profiles a CPU-bound
+thread for one second and reports how many stacks were captured and how
+much the thread slowed down meanwhile.
+
+Exits non-zero if tracing-disabled overhead exceeds --max-overhead (per call,
+relative to the unhooked baseline) in any layer, or the profiler finds
+nothing.
+
+    python -m benchmarks.tracing_overhead [--number N] [--repeat R] [--max-overhead F]
+"""
+
+import argparse
+import asyncio
+import sys
+import threading
+import time
+import timeit
+
+from metrics import METRICS, Metrics, _NULL_TIMER, _Timer
+from profiling import SamplingProfiler
+from tracing import TRACER, TraceMiddleware
+
+
+def untraced_timer(self, stage):
+    """Metrics.timer as it was before tracing hooked into it."""
+    if not self.enabled:
+        return _NULL_TIMER
+    return _Timer(self.histogram(stage))
+
+
+def bench_timer():
+    def body():
+        with METRICS.timer("bench"):
+            pass
+    return body
+
+
+def bench_middleware(number):
+    """A one-route FastAPI app driven over ASGI, with no sockets involved."""
+    from fastapi import FastAPI
+
+    app = FastAPI()
+
+    @app.get("/bench")
+    async def bench():
+        return {"ok": True}
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/bench", "raw_path": b"/bench", "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"bench")], "server": ("bench", 80), "client": ("127.0.0.1", 1),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    wrapped = TraceMiddleware(app)
+    loop = asyncio.new_event_loop()
+
+    def run(target):
+        async def many():
+            for _ in range(number):
+                await target(dict(scope), receive, send)
+        return lambda: loop.run_until_complete(many())
+
+    return run(app), run(wrapped), loop
+
+
+def bench_login():
+    from zkp_protocol import Server
+
+    server = Server(verify_backend="native")
+    proof = {"pi_a": ["1", "2", "1"], "pi_b": [["1", "2"], ["3", "4"], ["1", "0"]], "pi_c": ["1", "2", "1"]}
+    signals = ["1", "2"]
+
+    def body():
+        server.authenticate_user("nobody", proof, signals)
+    return body, server
+
+
+def measure(name, variants, number, repeat):
+    """
+    variants: (label, setup, callable, calls per invocation), baseline first.
+    The variants take turns within each repeat so drift hits them all alike;
+    each keeps its best per-call time in ns.
+    """
+    best = [float("inf")] * len(variants)
+    for _ in range(repeat):
+        for i, (_, setup, body, calls) in enumerate(variants):
+            setup()
+            best[i] = min(best[i], timeit.timeit(body, number=number) / number / calls * 1e9)
+    results = [(label, ns) for (label, *_), ns in zip(variants, best)]
+    baseline = results[0][1]
+    print(f"\n{name}")
+    for label, ns in results:
+        print(f"  {label:<22}{ns:10.1f} ns/call  {ns / baseline - 1:+8.1%}")
+    return results[1][1] / baseline - 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--max-overhead", type=float, default=0.05)
+    args = parser.parse_args()
+    number, repeat = args.number, args.repeat
+    hooked_timer = Metrics.timer
+
+    def untraced():
+        TRACER.disable()
+        Metrics.timer = untraced_timer
+
+    def disabled():
+        Metrics.timer = hooked_timer
+        TRACER.disable()
+
+    def enabled():
+        Metrics.timer = hooked_timer
+        TRACER.clear()
+        TRACER.enable()
+
+    overheads = {}
+    try:
+        body = bench_timer()
+        overheads["timer"] = measure("METRICS.timer()", [
+            ("without hooks", untraced, body, 1),
+            ("tracing disabled", disabled, body, 1),
+            ("tracing enabled", enabled, body, 1),
+        ], number, repeat)
+
+        requests = max(number // 100, 1)
+        direct, wrapped, loop = bench_middleware(requests)
+        overheads["middleware"] = measure("FastAPI request through TraceMiddleware", [
+            ("app called directly", disabled, direct, requests),
+            ("tracing disabled", disabled, wrapped, requests),
+            ("tracing enabled", enabled, wrapped, requests),
+        ], 1, repeat)
+        loop.close()
+
+        body, server = bench_login()
+        login_number = max(number // 10, 1)
+        overheads["login"] = measure("Server.authenticate_user (unknown user)", [
+            ("without hooks", untraced, body, 1),
+            ("tracing disabled", disabled, body, 1),
+            ("tracing enabled", enabled, body, 1),
+        ], login_number, repeat)
+        server.close()
+    finally:
+        Metrics.timer = hooked_timer
+        TRACER.disable()
+        TRACER.clear()
+
+    work = {"count": 0, "stop": False}
+
+    def spin():
+        while not work["stop"]:
+            sum(i * i for i in range(200))
+            work["count"] += 1
+
+    thread = threading.Thread(target=spin, name="bench-spin")
+    thread.start()
+    time.sleep(0.5)
+    before = work["count"]
+    time.sleep(1.0)
+    idle_rate = work["count"] - before
+    profiler = SamplingProfiler()
+    before = work["count"]
+    counts = profiler.profile(1.0)
+    profiled_rate = work["count"] - before
+    work["stop"] = True
+    thread.join()
+    spin_samples = sum(c for stack, c in counts.items() if stack.startswith("bench-spin;"))
+    print(f"\nprofiler: {profiler.last_samples} passes, {sum(counts.values())} stacks "
+          f"({len(counts)} distinct, {spin_samples} in the busy thread); "
+          f"busy thread ran at {profiled_rate / max(idle_rate, 1):.0%} of its unprofiled speed")
+
+    ok = spin_samples > 0
+    for layer, overhead in overheads.items():
+        if overhead > args.max_overhead:
+            print(f"FAIL: {layer} overhead with tracing disabled is {overhead:+.1%} "
+                  f"(limit {args.max_overhead:.0%})")
+            ok = False
+    if not spin_samples:
+        print("FAIL: the profiler captured no stacks from the busy thread")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Registration and lookup throughput of the user stores.
+
+For MemoryUserStore and SQLiteUserStore (WAL, in a temporary directory):
+
+- bulk registrations/s: add_many in batches of --batch users, up to --users;
+- single registrations/s: add() from --threads threads at once, which the
+  SQLite store group-commits;
+- cached lookups/s: get() for users in the store's LRU;
+- uncached lookups/s: get() for random users from a fresh store over the
+  same database, so every read goes to SQLite.
+
+Each store must return what was registered; the benchmark exits non-zero
+otherwise.
+
+    python -m benchmarks.user_store [--users 1000000] [--batch 10000]
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from user_store import MemoryUserStore, SQLiteUserStore, UserRecord
+
+
+def make_records(count, rng):
+    return [(f"user{i:08d}", UserRecord(rng.getrandbits(253), rng.getrandbits(253))) for i in range(count)]
+
+
+def timed(label, count, func):
+    start = time.perf_counter()
+    result = func()
+    rate = count / (time.perf_counter() - start)
+    print(f"  {label:<26}{rate:14,.0f} /s")
+    return result
+
+
+def bulk_register(store, records, batch):
+    for i in range(0, len(records), batch):
+        store.add_many(records[i:i + batch])
+
+
+def threaded_register(store, records, threads):
+    chunks = [records[i::threads] for i in range(threads)]
+
+    def work(chunk):
+        for hr_id, record in chunk:
+            store.add(hr_id, record)
+
+    workers = [threading.Thread(target=work, args=(chunk,)) for chunk in chunks]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+def lookups(store, ids):
+    get = store.get
+    for hr_id in ids:
+        get(hr_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--batch", type=int, default=10_000)
+    parser.add_argument("--singles", type=int, default=20_000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--lookups", type=int, default=200_000)
+    parser.add_argument("--cache-size", type=int, default=100_000)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    records = make_records(args.users + args.singles, rng)
+    bulk, singles = records[:args.users], records[args.users:]
+    hot = [hr_id for hr_id, _ in rng.sample(bulk, min(args.cache_size, len(bulk)) // 2)]
+    cold = [bulk[rng.randrange(len(bulk))][0] for _ in range(args.lookups)]
+    ok = True
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp) / "users.db"
+        stores = [
+            ("memory", MemoryUserStore),
+            ("sqlite", lambda: SQLiteUserStore(db, cache_size=args.cache_size)),
+        ]
+        for name, factory in stores:
+            print(f"{name} ({args.users:,} users)")
+            store = factory()
+            timed("bulk registrations", len(bulk), lambda: bulk_register(store, bulk, args.batch))
+            timed(f"single adds x{args.threads} threads", len(singles),
+                  lambda: threaded_register(store, singles, args.threads))
+            lookups(store, hot)  # load the LRU
+            cycles = max(1, args.lookups // max(1, len(hot)))
+            timed("cached lookups", cycles * len(hot), lambda: [lookups(store, hot) for _ in range(cycles)])
+            if name == "sqlite":
+                store.close()
+                store = factory()  # empty cache over the same database
+            timed("uncached lookups", len(cold), lambda: lookups(store, cold))
+
+            sample = rng.sample(records, 1000)
+            same = all(store.get(hr_id) == record for hr_id, record in sample)
+            same &= len(store) == len(records) and not store.add(*bulk[0])
+            print(f"  round trip intact: {same}")
+            ok &= same
+            store.close()
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Cross-check and time the Groth16 verify backends.
+
+Runs every saved proof in ``fixtures/auth_proofs.json`` (valid and tampered)
+through the native verifier and, when the snarkjs CLI is installed, through
+snarkjs too.  The whole set is also run through
+verify_proofs_batch to exercise bisection, and batch throughput is reported
+for a few batch sizes.  Exits non-zero if any verdict disagrees with the expected one
+or the two backends disagree with each other.
+
+    python -m benchmarks.verify_backends [--iterations N]
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import zksnark_utils
+from zksnark_utils import ZkSnarkDependencyError, verify_proof, verify_proofs_batch
+
+FIXTURES = Path(__file__).parent / "fixtures" / "auth_proofs.json"
+
+
+def load_cases():
+    return json.loads(FIXTURES.read_text(encoding="utf-8"))
+
+
+def snarkjs_available() -> bool:
+    try:
+        zksnark_utils._check_artifacts()
+    except ZkSnarkDependencyError:
+        return False
+    return True
+
+
+def cross_check(cases, backends) -> bool:
+    ok = True
+    print(f"{'case':<22}{'expected':>10}" + "".join(f"{b:>10}" for b in backends))
+    for case in cases:
+        verdicts = [verify_proof(case["proof"], case["public_signals"], backend=b) for b in backends]
+        row_ok = all(v == case["expected"] for v in verdicts)
+        ok &= row_ok
+        print(
+            f"{case['name']:<22}{str(case['expected']):>10}"
+            + "".join(f"{str(v):>10}" for v in verdicts)
+            + ("" if row_ok else "   <-- MISMATCH")
+        )
+    return ok
+
+
+def time_backend(case, backend, iterations):
+    # First call pays key loading / precomputation; report it separately.
+    start = time.perf_counter()
+    verify_proof(case["proof"], case["public_signals"], backend=backend)
+    first = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        verify_proof(case["proof"], case["public_signals"], backend=backend)
+    steady = (time.perf_counter() - start) / iterations
+    return first, steady
+
+
+def time_batch(cases, size):
+    valid = [case for case in cases if case["expected"]]
+    batch = [valid[i % len(valid)] for i in range(size)]
+    proofs = [case["proof"] for case in batch]
+    signals = [case["public_signals"] for case in batch]
+    start = time.perf_counter()
+    verdicts = verify_proofs_batch(proofs, signals, backend="native")
+    elapsed = time.perf_counter() - start
+    assert all(verdicts), "batch of valid proofs was rejected"
+    return elapsed / size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--batch-sizes", type=int, nargs="*", default=[1, 8, 32, 128])
+    args = parser.parse_args()
+
+    backends = ["native"]
+    if snarkjs_available():
+        backends.append("snarkjs")
+    else:
+        print("[INFO] snarkjs not available; cross-checking native verifier against expected verdicts only")
+
+    cases = load_cases()
+    ok = cross_check(cases, backends)
+
+    verdicts = verify_proofs_batch(
+        [case["proof"] for case in cases], [case["public_signals"] for case in cases], backend="native"
+    )
+    batch_ok = verdicts == [case["expected"] for case in cases]
+    ok &= batch_ok
+    print(f"{'native batch (bisect)':<32}{'ok' if batch_ok else 'MISMATCH'}")
+
+    print()
+    valid = next(case for case in cases if case["expected"])
+    for backend in backends:
+        iterations = args.iterations if backend == "native" else max(1, args.iterations // 4)
+        first, steady = time_backend(valid, backend, iterations)
+        print(
+            f"{backend:<8} first call {first * 1000:8.1f} ms   "
+            f"steady {steady * 1000:8.1f} ms/verify   {1 / steady:8.1f} verify/s"
+        )
+
+    print()
+    for size in args.batch_sizes:
+        per_proof = time_batch(cases, size)
+        print(f"native batch of {size:<4} {per_proof * 1000:8.1f} ms/verify   {1 / per_proof:8.1f} verify/s")
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
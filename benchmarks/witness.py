@@ -0,0 +1,85 @@
+"""
+Benchmark native witness generation and check .wtns compatibility with snarkjs.
+
+Computes witnesses for random (g0, password) pairs with r1cs_witness and
+reports witnesses/s, with and without .wtns encoding.  When the snarkjs CLI
+is available, a few inputs are also run through ``snarkjs wtns calculate``
+and the files are compared byte for byte.
+
+    python -m benchmarks.witness [--count N]
+"""
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import zksnark_utils
+from hash_utils import compute_commitment, hash_password_to_field
+from r1cs_witness import encode_wtns
+from benchmarks.verify_backends import snarkjs_available
+
+
+def make_inputs(count, seed=1):
+    rng = random.Random(seed)
+    inputs = []
+    for i in range(count):
+        g0 = rng.randrange(1000, 10**6)
+        x = hash_password_to_field(f"password-{i}")
+        inputs.append({"g0": str(g0), "Y": str(compute_commitment(g0, x)), "X": str(x)})
+    return inputs
+
+
+def compare_with_snarkjs(inputs) -> bool:
+    ok = True
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        for i, payload in enumerate(inputs):
+            input_json = temp_path / f"input{i}.json"
+            wtns = temp_path / f"witness{i}.wtns"
+            input_json.write_text(json.dumps(payload), encoding="utf-8")
+            start = time.perf_counter()
+            zksnark_utils._run_snarkjs([
+                zksnark_utils.SNARKJS_CMD, "wtns", "calculate",
+                str(zksnark_utils.WASM_PATH), str(input_json), str(wtns),
+            ])
+            elapsed = time.perf_counter() - start
+            same = wtns.read_bytes() == encode_wtns(zksnark_utils.calculate_witness(payload))
+            ok &= same
+            print(f"snarkjs wtns calculate {elapsed * 1000:8.1f} ms   byte-identical: {same}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=20000)
+    args = parser.parse_args()
+
+    inputs = make_inputs(args.count)
+    zksnark_utils.calculate_witness(inputs[0])  # parse the circuit files up front
+
+    start = time.perf_counter()
+    for payload in inputs:
+        zksnark_utils.calculate_witness(payload)
+    elapsed = time.perf_counter() - start
+    print(f"native witness         {args.count / elapsed:10.0f} witnesses/s")
+
+    start = time.perf_counter()
+    for payload in inputs:
+        encode_wtns(zksnark_utils.calculate_witness(payload))
+    elapsed = time.perf_counter() - start
+    print(f"native witness + .wtns {args.count / elapsed:10.0f} witnesses/s")
+
+    ok = True
+    if snarkjs_available():
+        ok = compare_with_snarkjs(inputs[:3])
+    else:
+        print("[INFO] snarkjs not available; skipping byte comparison")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
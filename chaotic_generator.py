@@ -1,59 +1,325 @@
 import numpy as np
 import hashlib
+import io
+import os
+
+from metrics import METRICS
+from chaotic_integrators import (
+    A, B, C, D, E, F, G, H, INTEGRATORS, RK4Workspace, hyperchaotic_ode, make_integrator,
+)
+
+# The byte stream integrates STREAM_BATCH_SIZE trajectories together and
+# conditions each pass of STREAM_STEPS steps through SHAKE-256, squeezing out
+# STREAM_BYTES_PER_STATE bytes per 48-byte trajectory state.
+STREAM_BATCH_SIZE = 1024
+STREAM_STEPS = 4
+STREAM_BYTES_PER_STATE = 16
+
+# Trajectories of this system eventually run off to infinity; one whose
+# state grows past this bound is re-seeded from a hash of its last state.
+DIVERGENCE_LIMIT = 1e6
+
+
+def _seed_state(material: bytes) -> np.ndarray:
+    """Six initial conditions in [0, 1) derived from SHA-256(material)."""
+    words = np.frombuffer(hashlib.sha256(material).digest(), dtype="<u4")[:6]
+    return words.astype(np.float64) / 2.0**32
+
+
+def _floats_to_hex(values) -> list:
+    return [float(v).hex() for v in np.ravel(values)]
+
+
+def _floats_from_hex(values, shape=None) -> np.ndarray:
+    array = np.array([float.fromhex(v) for v in values], dtype=np.float64)
+    return array.reshape(shape) if shape is not None else array
+
+
+class ChaoticBatch:
+    """
+    K independent trajectories of the hyperchaotic system, integrated together.
+
+    The state lives in a (6, K) array so each variable is a contiguous row;
+    ``states`` exposes it as (K, 6).  RK4 runs entirely in preallocated work
+    buffers, and every stage performs the same floating-point operations in
+    the same order as ChaoticGenerator.iterate, so a one-trajectory batch
+    reproduces the scalar generator bit for bit.
+    """
+
+    def __init__(self, initial_states, dt=0.01):
+        states = np.array(initial_states, dtype=np.float64, ndmin=2)
+        if states.ndim != 2 or states.shape[1] != 6:
+            raise ValueError("initial_states must have shape (K, 6)")
+        self._y = np.ascontiguousarray(states.T)
+        self.dt = dt
+        self._work = RK4Workspace(self._y)
+        self.reseeds = 0
+        self.passes = 0
+
+    def __len__(self):
+        return self._y.shape[1]
+
+    @property
+    def states(self):
+        return self._y.T
+
+    def iterate(self, steps=100):
+        self._work.iterate(steps, self.dt)
+
+    def _reseed_diverged(self, previous, steps):
+        with np.errstate(invalid="ignore"):
+            bad = ~np.isfinite(self._y).all(axis=0) | (np.abs(self._y).max(axis=0) > DIVERGENCE_LIMIT)
+        if not bad.any():
+            return
+        columns = np.flatnonzero(bad)
+        seeds = [_seed_state(previous[:, i].tobytes() + int(i).to_bytes(4, "little")) for i in columns]
+        # Columns are independent, so one batch re-integrates them all at once.
+        replacement = ChaoticBatch(seeds, self.dt)
+        replacement.iterate(steps)
+        self._y[:, columns] = replacement._y
+        self.reseeds += len(columns)
+
+    def advance(self, steps):
+        """iterate(), then re-seed any trajectory that diverged."""
+        with METRICS.timer("chaotic_batch_pass"):
+            previous = self._y.copy()
+            with np.errstate(over="ignore", invalid="ignore"):
+                self.iterate(steps)
+            self._reseed_diverged(previous, steps)
+        self.passes += 1
+
+    def get_random_values(self, min_val=1000, max_val=9999, steps=50):
+        """Advance every trajectory ``steps`` steps and return one value per trajectory."""
+        self.advance(steps)
+        scaled = np.abs(self._y[0]) * 1000000
+        return scaled.astype(np.int64) % (max_val - min_val + 1) + min_val
 
 
 class ChaoticGenerator:
-    def __init__(self, initial_conditions=None):
+    """
+    ``integrator`` selects how the single trajectory is stepped: a name from
+    chaotic_integrators.INTEGRATORS ("scalar", "rk4", "reference", "rk45")
+    or an object with an ``advance(state, steps, dt)`` method.  The three RK4
+    engines produce identical values at different speeds: "scalar" is the
+    fastest for one trajectory and "rk4" the slowest, at about half the
+    speed of "reference".  "rk45" follows the true solution more closely and
+    therefore produces a different sequence.
+
+    ``seed`` (bytes) is mixed into the byte stream.  When neither it nor
+    ``initial_conditions`` is given, each instance draws a fresh one from
+    os.urandom, so its stream differs from every other instance's.
+    """
+
+    def __init__(self, initial_conditions=None, batch_size=64, integrator="scalar", dt=0.01, seed=None):
+        if seed is None:
+            seed = os.urandom(32) if initial_conditions is None else b""
         if initial_conditions is None:
             initial_conditions = [0.1, 0.2, 0.3, 0.4, 0.5, 0.6]
         self.state = np.array(initial_conditions, dtype=np.float64)
-        self.dt = 0.01
-        
+        self.dt = dt
+        self.integrator = make_integrator(integrator)
+        # Trajectories in the batched engine behind get_chaotic_sequence.
+        self.batch_size = batch_size
+        self._batch = None
+        # Values left over from the last batched pass, and the range they were drawn for.
+        self._pending = []
+        self._pending_range = None
+        # Byte stream state: its own trajectories, a key, a block counter and
+        # the unread tail of the last block.
+        self._stream_seed = bytes(seed)
+        self._stream_batch = None
+        self._stream_key = None
+        self._stream_counter = 0
+        self._stream_tail = memoryview(b"")
+
     def _hyperchaotic_ode(self, state):
-        x1, x2, x3, x4, x5, x6 = state
-        a, b, c, d, e, f = 10.0, 8.0/3.0, 28.0, -1.0, 2.0, 5.0
-        g, h = 0.1, 0.1
-        
-        dx1 = a * (x2 - x1) + x4
-        dx2 = b * x1 - x1 * x3 + x5
-        dx3 = x1 * x2 - c * x3 + x6
-        dx4 = d * x1 + e * x2
-        dx5 = f * x2 + g * x3
-        dx6 = h * x1 + x3
-        
-        return np.array([dx1, dx2, dx3, dx4, dx5, dx6])
-    
+        return hyperchaotic_ode(state)
+
     def iterate(self, steps=100):
-        for _ in range(steps):
-            k1 = self._hyperchaotic_ode(self.state)
-            k2 = self._hyperchaotic_ode(self.state + 0.5 * self.dt * k1)
-            k3 = self._hyperchaotic_ode(self.state + 0.5 * self.dt * k2)
-            k4 = self._hyperchaotic_ode(self.state + self.dt * k3)
-            
-            self.state = self.state + (self.dt / 6.0) * (k1 + 2*k2 + 2*k3 + k4)
-    
+        self.state = self.integrator.advance(self.state, steps, self.dt)
+
     def get_random_value(self, min_val=1000, max_val=9999):
-        self.iterate(steps=50)
+        # Integrators may update the state array in place, so keep a copy.
+        with METRICS.timer("chaotic_value"):
+            previous = self.state.tobytes()
+            with np.errstate(over="ignore", invalid="ignore"):
+                self.iterate(steps=50)
+                diverged = not np.all(np.isfinite(self.state)) or np.max(np.abs(self.state)) > DIVERGENCE_LIMIT
+            if diverged:
+                self.state = _seed_state(previous)
+                self.iterate(steps=50)
         chaotic_value = abs(self.state[0]) * 1000000
         normalized = int(chaotic_value) % (max_val - min_val + 1) + min_val
         return normalized
-    
-    def get_chaotic_sequence(self, count=10, min_val=1000, max_val=9999):
-        sequence = []
-        for _ in range(count):
-            sequence.append(self.get_random_value(min_val, max_val))
-        return sequence
-    
+
+    def _make_batch(self, size=None, domain=b""):
+        # Well-separated starting points derived from the current state, then
+        # a warm-up so every trajectory is on the attractor before it is used.
+        material = domain + self.state.tobytes()
+        seeds = np.array([
+            _seed_state(material + i.to_bytes(4, "little")) for i in range(size or self.batch_size)
+        ])
+        batch = ChaoticBatch(seeds, self.dt)
+        batch.iterate(100)
+        return batch
+
+    def get_chaotic_sequence(self, count=10, min_val=1000, max_val=9999, batched=True):
+        """
+        Return ``count`` values in [min_val, max_val].
+
+        By default the values come from ``batch_size`` trajectories advanced
+        together (one vectorized RK4 pass yields batch_size values);
+        ``batched=False`` draws them one by one with get_random_value.
+        """
+        if not batched:
+            return [self.get_random_value(min_val, max_val) for _ in range(count)]
+        if self._batch is None:
+            self._batch = self._make_batch()
+        if self._pending_range != (min_val, max_val):
+            self._pending = []
+            self._pending_range = (min_val, max_val)
+        while len(self._pending) < count:
+            self._pending.extend(self._batch.get_random_values(min_val, max_val).tolist())
+        values = self._pending[:count]
+        del self._pending[:count]
+        return values
+
+    def _stream_block(self):
+        """
+        One conditioned block: advance the stream trajectories STREAM_STEPS
+        steps and squeeze STREAM_BYTES_PER_STATE bytes per trajectory out of
+        SHAKE-256 over the key, the block counter and the raw states.
+        """
+        if self._stream_batch is None:
+            self._stream_batch = self._make_batch(STREAM_BATCH_SIZE, b"stream" + self._stream_seed)
+            self._stream_key = hashlib.sha256(b"chaotic-stream" + self._stream_seed + self.state.tobytes()).digest()
+        batch = self._stream_batch
+        batch.advance(STREAM_STEPS)
+        self._stream_counter += 1
+        with METRICS.timer("chaotic_stream_hash"):
+            xof = hashlib.shake_256(self._stream_key)
+            xof.update(self._stream_counter.to_bytes(8, "little"))
+            xof.update(batch._y)  # hashed straight from the array buffer, no copy
+            return xof.digest(len(batch) * STREAM_BYTES_PER_STATE)
+
+    def readinto(self, buffer):
+        """Fill a writable buffer (bytearray, memoryview, NumPy array...) with stream bytes."""
+        out = memoryview(buffer).cast("B")
+        n = len(out)
+        tail = self._stream_tail
+        pos = min(len(tail), n)
+        out[:pos] = tail[:pos]
+        tail = tail[pos:]
+        while pos < n:
+            block = memoryview(self._stream_block())
+            take = min(len(block), n - pos)
+            out[pos:pos + take] = block[:take]
+            pos += take
+            tail = block[take:]
+        self._stream_tail = tail
+        return n
+
+    def random_bytes(self, n):
+        """
+        Return ``n`` bytes from the conditioned chaotic stream.
+
+        A generator built without ``initial_conditions`` or ``seed`` salts
+        the stream with os.urandom(32), so two such generators never repeat
+        each other.  With either argument the stream is reproducible: the
+        same arguments give the same bytes.
+        """
+        buffer = bytearray(n)
+        self.readinto(buffer)
+        return bytes(buffer)
+
+    def iter_bytes(self, chunk_size=1 << 16):
+        """Yield the stream forever in ``chunk_size``-byte chunks."""
+        while True:
+            yield self.random_bytes(chunk_size)
+
+    def byte_stream(self):
+        """The stream as a read-only binary file object."""
+        return ChaoticByteStream(self)
+
+    def checkpoint(self):
+        """
+        JSON-serializable snapshot of the whole generator, floats as exact hex.
+
+        ChaoticGenerator.restore(snapshot) continues every output (single
+        values, batched sequences and the byte stream) exactly where this
+        generator stands.
+        """
+        integrator = getattr(self.integrator, "name", "scalar")
+        data = {
+            "state": _floats_to_hex(self.state),
+            "dt": self.dt,
+            "integrator": integrator if integrator in INTEGRATORS else "scalar",
+            "batch_size": self.batch_size,
+            "seed": self._stream_seed.hex(),
+            "batch": None,
+            "pending": list(self._pending),
+            "pending_range": list(self._pending_range) if self._pending_range else None,
+            "stream": None,
+        }
+        if self._batch is not None:
+            data["batch"] = {
+                "states": _floats_to_hex(self._batch.states),
+                "reseeds": self._batch.reseeds,
+                "passes": self._batch.passes,
+            }
+        if self._stream_batch is not None:
+            data["stream"] = {
+                "states": _floats_to_hex(self._stream_batch.states),
+                "key": self._stream_key.hex(),
+                "counter": self._stream_counter,
+                "tail": bytes(self._stream_tail).hex(),
+            }
+        return data
+
+    @classmethod
+    def restore(cls, data):
+        gen = cls(
+            _floats_from_hex(data["state"]),
+            batch_size=data["batch_size"],
+            integrator=data["integrator"],
+            dt=data["dt"],
+            seed=bytes.fromhex(data.get("seed", "")),
+        )
+        if data["batch"] is not None:
+            gen._batch = ChaoticBatch(_floats_from_hex(data["batch"]["states"], (-1, 6)), gen.dt)
+            gen._batch.reseeds = data["batch"]["reseeds"]
+            gen._batch.passes = data["batch"]["passes"]
+        gen._pending = list(data["pending"])
+        gen._pending_range = tuple(data["pending_range"]) if data["pending_range"] else None
+        if data["stream"] is not None:
+            gen._stream_batch = ChaoticBatch(_floats_from_hex(data["stream"]["states"], (-1, 6)), gen.dt)
+            gen._stream_key = bytes.fromhex(data["stream"]["key"])
+            gen._stream_counter = data["stream"]["counter"]
+            gen._stream_tail = memoryview(bytes.fromhex(data["stream"]["tail"]))
+        return gen
+
     def get_seed_from_state(self):
         state_bytes = self.state.tobytes()
         hash_obj = hashlib.sha256(state_bytes)
         return int(hash_obj.hexdigest(), 16)
 
 
+class ChaoticByteStream(io.RawIOBase):
+    """File-like view of ChaoticGenerator's byte stream; wrap it in io.BufferedReader if needed."""
+
+    def __init__(self, generator):
+        self.generator = generator
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        return self.generator.readinto(buffer)
+
+
 if __name__ == "__main__":
     gen = ChaoticGenerator()
     print("Generating chaotic random values:")
     for i in range(5):
         val = gen.get_random_value()
         print(f"Random value {i+1}: {val}")
-
@@ -0,0 +1,237 @@
+"""
+Sharded chaotic generators with checkpointing.
+
+ShardedChaoticGenerator gives each thread one of ``shards`` ChaoticGenerator
+shards, so concurrent requests only contend on that shard's lock.  Shard i
+starts from initial conditions derived from SHA-256(master seed, epoch, i).
+Shards are independent trajectories rather than slices of a single one:
+an ODE has no cheap way to skip ahead along one trajectory, so slicing would
+mean integrating every value twice.  Because of that a new shard never needs
+to be placed further along anything: it starts at its own seed after one
+warm-up.  All values come from each shard's batched engine (ChaoticBatch).
+
+State is checkpointed atomically (temp file, fsync, rename) every
+``checkpoint_interval`` seconds and at close(), and resumed on start when
+the file matches the master seed.  A checkpoint written by close() is
+resumed exactly.  After a crash, values drawn since the last checkpoint
+may already have been handed out, so every shard moves to a fresh epoch
+instead of replaying them.
+"""
+
+import hashlib
+import itertools
+import json
+import os
+import secrets
+import threading
+import time
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process deployments only
+    fcntl = None
+from typing import Dict, Optional, Tuple
+
+from chaotic_generator import _seed_state, ChaoticGenerator
+
+CHECKPOINT_VERSION = 1
+
+
+def shard_initial_state(master_seed: bytes, epoch: int, index: int):
+    return _seed_state(b"shard" + master_seed + epoch.to_bytes(4, "little") + index.to_bytes(4, "little"))
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    """Replace ``path`` with ``data`` so readers see the old or the new file, never a mix."""
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    try:
+        os.write(fd, data)
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    os.replace(tmp, path)
+    dir_fd = os.open(path.parent, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+def claim_worker_slot(path: Path, max_slots: int = 64) -> Tuple[int, Optional[int]]:
+    """
+    Claim the lowest free worker slot for checkpoint ``path`` and return
+    (slot, fd).  The slot is held by an flock on ``<path>.slot<n>.lock`` until
+    fd is closed or the process exits, so concurrent worker processes never
+    share a checkpoint file, and a restarted worker takes over its old slot.
+    Without flock everything is slot 0.
+    """
+    if fcntl is None:
+        return 0, None
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    for slot in range(max_slots):
+        fd = os.open(path.with_name(f"{path.name}.slot{slot}.lock"), os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            continue
+        return slot, fd
+    raise RuntimeError(f"all {max_slots} worker slots for {path} are taken")
+
+
+def worker_checkpoint_path(path: Path, slot: int) -> Path:
+    path = Path(path)
+    return path if slot == 0 else path.with_name(f"{path.name}.{slot}")
+
+
+class _Shard:
+    __slots__ = ("index", "generator", "lock")
+
+    def __init__(self, index: int, generator: ChaoticGenerator):
+        self.index = index
+        self.generator = generator
+        self.lock = threading.Lock()
+
+
+class ShardedChaoticGenerator:
+    def __init__(
+        self,
+        master_seed: bytes = None,
+        shards: int = 4,
+        checkpoint_path=None,
+        checkpoint_interval: float = 30.0,
+        shard_offset: int = 0,
+        batch_size: int = 64,
+    ):
+        if shards < 1:
+            raise ValueError("shards must be at least 1")
+        self.checkpoint_path = Path(checkpoint_path) if checkpoint_path else None
+        self.checkpoint_interval = checkpoint_interval
+        self.shard_offset = shard_offset
+        self.batch_size = batch_size
+        self.epoch = 0
+        self.resumed = None  # "clean", "crash" or None for a fresh start
+        self.checkpoints_written = 0
+        self.last_checkpoint = None
+
+        saved = self._load() if self.checkpoint_path else None
+        if master_seed is None:
+            master_seed = bytes.fromhex(saved["master_seed"]) if saved else secrets.token_bytes(32)
+        self.master_seed = master_seed
+        if saved and saved["master_seed"] != master_seed.hex():
+            saved = None  # a checkpoint for another seed is not ours to resume
+
+        restored = {}
+        if saved:
+            self.epoch = saved["epoch"]
+            if saved["clean"]:
+                self.resumed = "clean"
+                restored = {int(i): state for i, state in saved["shards"].items()}
+            else:
+                self.resumed = "crash"
+                self.epoch += 1
+        self._shards = [
+            _Shard(index, ChaoticGenerator.restore(restored[index]) if index in restored
+                   else self._new_generator(index))
+            for index in range(shard_offset, shard_offset + shards)
+        ]
+
+        self._assign = itertools.count()
+        self._local = threading.local()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._write_lock = threading.Lock()
+        if self.checkpoint_path:
+            # From here on the saved state is in use: a crash must not replay it.
+            self.checkpoint(clean=False)
+
+    def _new_generator(self, index: int) -> ChaoticGenerator:
+        gen = ChaoticGenerator(shard_initial_state(self.master_seed, self.epoch, index), self.batch_size)
+        # Build the batch up front so snapshot() can report its pass count.
+        gen._batch = gen._make_batch()
+        return gen
+
+    def _load(self) -> Optional[Dict]:
+        try:
+            data = json.loads(self.checkpoint_path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+        if data.get("version") != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported chaotic checkpoint version in {self.checkpoint_path}")
+        return data
+
+    @property
+    def shards(self) -> int:
+        return len(self._shards)
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._shards[next(self._assign) % len(self._shards)]
+            self._local.shard = shard
+        return shard
+
+    def get_chaotic_sequence(self, count=10, min_val=1000, max_val=9999):
+        shard = self._shard()
+        with shard.lock:
+            return shard.generator.get_chaotic_sequence(count, min_val, max_val)
+
+    def get_random_value(self, min_val=1000, max_val=9999):
+        return self.get_chaotic_sequence(1, min_val, max_val)[0]
+
+    def checkpoint(self, clean: bool = False) -> None:
+        """Write every shard's state; ``clean`` marks it safe to resume exactly."""
+        if self.checkpoint_path is None:
+            return
+        shards = {}
+        for shard in self._shards:
+            with shard.lock:
+                shards[str(shard.index)] = shard.generator.checkpoint()
+        data = {
+            "version": CHECKPOINT_VERSION,
+            "master_seed": self.master_seed.hex(),
+            "epoch": self.epoch,
+            "clean": clean,
+            "written_at": time.time(),
+            "shards": shards,
+        }
+        with self._write_lock:
+            write_atomic(self.checkpoint_path, json.dumps(data).encode("utf-8"))
+            self.checkpoints_written += 1
+            self.last_checkpoint = data["written_at"]
+
+    def start(self) -> "ShardedChaoticGenerator":
+        """Start checkpointing every ``checkpoint_interval`` seconds."""
+        if self.checkpoint_path and self._thread is None and self.checkpoint_interval > 0:
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name="chaotic-checkpoint", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.checkpoint_interval):
+            self.checkpoint(clean=False)
+
+    def close(self) -> None:
+        """Stop the timer and write a final, clean checkpoint."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.checkpoint(clean=True)
+
+    def snapshot(self) -> Dict:
+        return {
+            "shards": self.shards,
+            "epoch": self.epoch,
+            "resumed": self.resumed,
+            "master_seed_id": hashlib.sha256(self.master_seed).hexdigest()[:16],
+            "positions": {shard.index: shard.generator._batch.passes for shard in self._shards},
+            "checkpoint_path": str(self.checkpoint_path) if self.checkpoint_path else None,
+            "checkpoints_written": self.checkpoints_written,
+            "last_checkpoint": self.last_checkpoint,
+        }
@@ -0,0 +1,128 @@
+"""
+Client-side memo of password-derived secrets, one per (hr_id, g0).
+
+A client that logs the same user in again derives the same witness X from
+the password every time and checks it against the stored commitment Y.
+DerivationCache keeps X for a statement once that check has passed, so a
+re-auth skips the derivation and the check.
+
+Entries live in memory only and are bounded by ``max_entries`` (LRU) and
+``ttl`` seconds from insertion.  X and the password tag are held in
+bytearrays that are overwritten with zeros when an entry is evicted,
+expires or is cleared (Y is public and kept as an int).  That
+wipes the cache's copy only: ints already handed to callers are immutable
+and stay until the garbage collector frees them.
+
+The password is not kept.  Each entry stores a BLAKE2b tag of it, keyed with
+a random per-cache key, and a lookup only hits when the password given
+produces the same tag, so a wrong password is a miss, never a cached X.
+"""
+
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+FIELD_BYTES = 32
+
+
+def _zeroize(buffer: bytearray) -> None:
+    buffer[:] = bytes(len(buffer))
+
+
+class _Entry:
+    __slots__ = ("tag", "secret_x", "commitment", "expires")
+
+    def __init__(self, tag: bytes, secret_x: int, commitment: int, expires: float):
+        self.tag = bytearray(tag)
+        self.secret_x = bytearray(secret_x.to_bytes(FIELD_BYTES, "big"))
+        self.commitment = commitment  # public, so a plain int
+        self.expires = expires
+
+    def wipe(self) -> None:
+        _zeroize(self.tag)
+        _zeroize(self.secret_x)
+
+
+class DerivationCache:
+    def __init__(self, max_entries: int = 256, ttl: float = 300.0):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        if ttl <= 0:
+            raise ValueError("ttl must be positive")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._key = secrets.token_bytes(32)
+        self._entries: "OrderedDict[Tuple[str, int], _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _tag(self, password: str) -> bytes:
+        return hashlib.blake2b(password.encode("utf-8"), key=self._key, digest_size=16).digest()
+
+    def _drop(self, key) -> None:
+        self._entries.pop(key).wipe()
+
+    def get(self, hr_id: str, g0: int, commitment: int, password: str) -> Optional[int]:
+        """Cached X for this user, statement and password, or None."""
+        tag = self._tag(password)
+        key = (hr_id, g0)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() >= entry.expires:
+                self._drop(key)
+                self.expirations += 1
+                entry = None
+            if (
+                entry is None
+                or not hmac.compare_digest(entry.tag, tag)
+                or entry.commitment != commitment
+            ):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return int.from_bytes(entry.secret_x, "big")
+
+    def put(self, hr_id: str, g0: int, commitment: int, password: str, secret_x: int) -> None:
+        """Remember X; only call once X has been checked against ``commitment``."""
+        entry = _Entry(self._tag(password), secret_x, commitment, time.monotonic() + self.ttl)
+        key = (hr_id, g0)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = entry
+            now = time.monotonic()
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                if now >= self._entries[oldest].expires:
+                    self.expirations += 1
+                else:
+                    self.evictions += 1
+                self._drop(oldest)
+
+    def clear(self) -> None:
+        with self._lock:
+            for entry in self._entries.values():
+                entry.wipe()
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
@@ -0,0 +1,136 @@
+"""
+Precomputed g0 values for registration.
+
+A Reservoir keeps a bounded ring buffer of values that a
+background thread produces ahead of demand.  When a draw leaves fewer than
+``low_watermark`` values, the thread is woken and generates batches until
+the buffer holds ``high_watermark``.  Draws are O(1) under a lock and never
+integrate the ODE themselves; an empty reservoir returns None so the caller
+can fall back to generating synchronously.  Nothing here is specific to
+g0: Server keeps g0 field elements in one, rsa_utils.KeyPool RSA keys.
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Generic, List, Optional, TypeVar
+
+from metrics import METRICS
+
+T = TypeVar("T")
+
+
+class Reservoir(Generic[T]):
+    def __init__(
+        self,
+        generate: Callable[[int], List[T]],
+        capacity: int = 1024,
+        low_watermark: int = None,
+        high_watermark: int = None,
+        batch_size: int = 64,
+        name: str = "g0-reservoir",
+    ):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.generate = generate
+        self.capacity = capacity
+        self.low_watermark = capacity // 4 if low_watermark is None else low_watermark
+        self.high_watermark = capacity if high_watermark is None else high_watermark
+        # low == high refills after every draw.
+        if not 0 <= self.low_watermark <= self.high_watermark <= capacity:
+            raise ValueError("Expected 0 <= low_watermark <= high_watermark <= capacity")
+        self.batch_size = batch_size
+        self.name = name
+
+        self._buffer: List[Optional[T]] = [None] * capacity
+        self._head = 0
+        self._size = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.draws = 0
+        self.misses = 0
+        self.produced = 0
+        self.refill_seconds = 0.0
+        self.refill_errors = 0
+        self.last_error: Optional[str] = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def start(self) -> "Reservoir[T]":
+        if self._thread is None:
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+            self._wake.set()
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def draw(self) -> Optional[T]:
+        """Return the oldest precomputed value, or None if the reservoir is empty."""
+        with self._lock:
+            self.draws += 1
+            if self._size == 0:
+                self.misses += 1
+                value = None
+            else:
+                value = self._buffer[self._head]
+                self._buffer[self._head] = None
+                self._head = (self._head + 1) % self.capacity
+                self._size -= 1
+            low = self._size < self.low_watermark
+        if low:
+            self._wake.set()
+        return value
+
+    def _push(self, values: List[T]) -> int:
+        with self._lock:
+            room = min(len(values), self.capacity - self._size)
+            tail = (self._head + self._size) % self.capacity
+            for value in values[:room]:
+                self._buffer[tail] = value
+                tail = (tail + 1) % self.capacity
+            self._size += room
+            return room
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wake.wait()
+            self._wake.clear()
+            while not self._stopped.is_set() and self._size < self.high_watermark:
+                wanted = min(self.batch_size, self.high_watermark - self._size)
+                started = time.perf_counter()
+                try:
+                    values = self.generate(wanted)
+                except Exception as exc:  # keep the thread alive; draws fall back meanwhile
+                    self.refill_errors += 1
+                    self.last_error = str(exc)
+                    self._stopped.wait(1.0)
+                    break
+                self.refill_seconds += time.perf_counter() - started
+                pushed = self._push(values)
+                self.produced += pushed
+                METRICS.inc("zkp_reservoir_produced_total", pushed, reservoir=self.name)
+
+    def snapshot(self) -> Dict:
+        return {
+            "capacity": self.capacity,
+            "fill": self._size,
+            "fill_ratio": round(self._size / self.capacity, 3),
+            "low_watermark": self.low_watermark,
+            "high_watermark": self.high_watermark,
+            "draws": self.draws,
+            "misses": self.misses,
+            "produced": self.produced,
+            "refill_rate_per_s": round(self.produced / self.refill_seconds, 1) if self.refill_seconds else 0.0,
+            "refill_errors": self.refill_errors,
+            "running": self._thread is not None and self._thread.is_alive(),
+        }
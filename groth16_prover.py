@@ -0,0 +1,303 @@
+"""
+In-process Groth16 prover for snarkjs proving keys over BN254.
+
+The .zkey is parsed once into affine points; each proof then costs three
+NTT round trips to compute the quotient polynomial H and five Pippenger
+multi-scalar multiplications (A, B1 and C/H in G1, B in G2).  The proof
+layout follows ``snarkjs groth16 prove`` so the result can be handed to
+``verify_proof`` with either backend.
+"""
+
+import secrets
+import struct
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from bn254 import (
+    CURVE_ORDER,
+    FIELD_MODULUS,
+    g1_add,
+    g1_msm,
+    g1_mul,
+    g1_neg,
+    g2_add,
+    g2_msm,
+    g2_mul,
+)
+from groth16_verifier import InvalidProofFormat, parse_g1, parse_g2
+from r1cs_witness import _read_sections
+
+
+class InvalidProvingKey(ValueError):
+    """Raised when a .zkey file is not a Groth16 BN254 proving key."""
+
+
+_N8 = 32
+# snarkjs stores base-field coordinates as x * 2^256 mod q (Montgomery form)
+# and coefficients as c * 2^512 mod r (Montgomery form, multiplied by R once more).
+_FQ_MONT_INV = pow(pow(2, 256, FIELD_MODULUS), -1, FIELD_MODULUS)
+_FR_COEF_INV = pow(pow(2, 512, CURVE_ORDER), -1, CURVE_ORDER)
+
+
+def _fq(buf: bytes, offset: int) -> int:
+    return int.from_bytes(buf[offset:offset + _N8], "little") * _FQ_MONT_INV % FIELD_MODULUS
+
+
+def _g1(buf: bytes, offset: int) -> Optional[tuple]:
+    x, y = _fq(buf, offset), _fq(buf, offset + _N8)
+    return None if x == 0 and y == 0 else (x, y)
+
+
+def _g2(buf: bytes, offset: int) -> Optional[tuple]:
+    x = (_fq(buf, offset), _fq(buf, offset + _N8))
+    y = (_fq(buf, offset + 2 * _N8), _fq(buf, offset + 3 * _N8))
+    return None if x == (0, 0) and y == (0, 0) else (x, y)
+
+
+def _g1_points(buf: bytes, count: int) -> List[Optional[tuple]]:
+    return [_g1(buf, 2 * _N8 * i) for i in range(count)]
+
+
+def _g2_points(buf: bytes, count: int) -> List[Optional[tuple]]:
+    return [_g2(buf, 4 * _N8 * i) for i in range(count)]
+
+
+# ---------------------------------------------------------------------------
+# Number-theoretic transform over the scalar field
+# ---------------------------------------------------------------------------
+
+def _root_of_unity(log_n: int) -> int:
+    # 5 generates the multiplicative group of Fr; snarkjs derives its roots the same way.
+    return pow(5, (CURVE_ORDER - 1) >> log_n, CURVE_ORDER)
+
+
+def _ntt(values: List[int], omega: int) -> List[int]:
+    """Iterative radix-2 Cooley-Tukey transform; len(values) must be a power of two."""
+    r = CURVE_ORDER
+    n = len(values)
+    out = list(values)
+    j = 0
+    for i in range(1, n):
+        bit = n >> 1
+        while j & bit:
+            j ^= bit
+            bit >>= 1
+        j |= bit
+        if i < j:
+            out[i], out[j] = out[j], out[i]
+    length = 2
+    while length <= n:
+        w_len = pow(omega, n // length, r)
+        half = length // 2
+        twiddles = [1] * half
+        for k in range(1, half):
+            twiddles[k] = twiddles[k - 1] * w_len % r
+        for start in range(0, n, length):
+            for k in range(half):
+                u = out[start + k]
+                v = out[start + k + half] * twiddles[k] % r
+                out[start + k] = (u + v) % r
+                out[start + k + half] = (u - v) % r
+        length <<= 1
+    return out
+
+
+def _intt(values: List[int], omega: int) -> List[int]:
+    r = CURVE_ORDER
+    n_inv = pow(len(values), -1, r)
+    return [v * n_inv % r for v in _ntt(values, pow(omega, -1, r))]
+
+
+class ProvingKey:
+    """Groth16 parameters decoded from a snarkjs .zkey (format version 1)."""
+
+    def __init__(self, data: bytes):
+        try:
+            sections = _read_sections(data, b"zkey")
+        except ValueError as exc:
+            raise InvalidProvingKey(str(exc)) from exc
+        if struct.unpack_from("<I", sections[1], 0)[0] != 1:
+            raise InvalidProvingKey("Only Groth16 proving keys are supported")
+
+        header = sections[2]
+        n8q = struct.unpack_from("<I", header, 0)[0]
+        q = int.from_bytes(header[4:4 + n8q], "little")
+        offset = 4 + n8q
+        n8r = struct.unpack_from("<I", header, offset)[0]
+        r = int.from_bytes(header[offset + 4:offset + 4 + n8r], "little")
+        if (n8q, q, n8r, r) != (_N8, FIELD_MODULUS, _N8, CURVE_ORDER):
+            raise InvalidProvingKey("Proving key is not over the BN254 curve")
+        offset += 4 + n8r
+        self.n_vars, self.n_public, self.domain_size = struct.unpack_from("<III", header, offset)
+        offset += 12
+        self.alpha1 = _g1(header, offset)
+        self.beta1 = _g1(header, offset + 64)
+        self.beta2 = _g2(header, offset + 128)
+        self.gamma2 = _g2(header, offset + 256)
+        self.delta1 = _g1(header, offset + 384)
+        self.delta2 = _g2(header, offset + 448)
+
+        self.log_domain = self.domain_size.bit_length() - 1
+        if 1 << self.log_domain != self.domain_size:
+            raise InvalidProvingKey(f"Domain size {self.domain_size} is not a power of two")
+
+        # Coefficients of the A and B constraint matrices as (matrix, row, signal, value).
+        coefs = sections[4]
+        n_coefs = struct.unpack_from("<I", coefs, 0)[0]
+        self.coefs: List[Tuple[int, int, int, int]] = []
+        for i in range(n_coefs):
+            entry = 4 + i * (12 + _N8)
+            matrix, row, signal = struct.unpack_from("<III", coefs, entry)
+            value = int.from_bytes(coefs[entry + 12:entry + 12 + _N8], "little") * _FR_COEF_INV % CURVE_ORDER
+            self.coefs.append((matrix, row, signal, value))
+
+        self.points_a = _g1_points(sections[5], self.n_vars)
+        self.points_b1 = _g1_points(sections[6], self.n_vars)
+        self.points_b2 = _g2_points(sections[7], self.n_vars)
+        self.points_c = _g1_points(sections[8], self.n_vars - self.n_public - 1)
+        self.points_h = _g1_points(sections[9], self.domain_size)
+
+    @classmethod
+    def from_file(cls, path) -> "ProvingKey":
+        return cls(Path(path).read_bytes())
+
+
+class Groth16Prover:
+    """Produces snarkjs-compatible Groth16 proofs from full witnesses."""
+
+    def __init__(self, key: ProvingKey):
+        self.key = key
+        self._omega = _root_of_unity(key.log_domain)
+        # Shift onto the odd coset w^(2i+1), where the vanishing polynomial is -2.
+        self._coset_shift = _root_of_unity(key.log_domain + 1)
+        shifts = [1] * key.domain_size
+        for i in range(1, key.domain_size):
+            shifts[i] = shifts[i - 1] * self._coset_shift % CURVE_ORDER
+        self._shift_powers = shifts
+
+    @classmethod
+    def from_file(cls, path) -> "Groth16Prover":
+        return cls(ProvingKey.from_file(path))
+
+    def _evaluations(self, witness: Sequence[int]) -> Tuple[List[int], List[int]]:
+        r = CURVE_ORDER
+        a = [0] * self.key.domain_size
+        b = [0] * self.key.domain_size
+        for matrix, row, signal, value in self.key.coefs:
+            target = a if matrix == 0 else b
+            target[row] = (target[row] + value * witness[signal]) % r
+        return a, b
+
+    def _to_odd_coset(self, values: List[int]) -> List[int]:
+        r = CURVE_ORDER
+        coefficients = _intt(values, self._omega)
+        shifted = [c * s % r for c, s in zip(coefficients, self._shift_powers)]
+        return _ntt(shifted, self._omega)
+
+    def quotient(self, witness: Sequence[int]) -> List[int]:
+        """Evaluations of (A*B - C) on the odd coset, the scalars for the H points."""
+        r = CURVE_ORDER
+        a, b = self._evaluations(witness)
+        c = [x * y % r for x, y in zip(a, b)]
+        a_odd = self._to_odd_coset(a)
+        b_odd = self._to_odd_coset(b)
+        c_odd = self._to_odd_coset(c)
+        return [(x * y - z) % r for x, y, z in zip(a_odd, b_odd, c_odd)]
+
+    def prove(
+        self, witness: Sequence[int], r: Optional[int] = None, s: Optional[int] = None
+    ) -> Tuple[Dict, List[str]]:
+        """
+        Return (proof, public_signals) for a full witness (wire 0 is 1).
+
+        ``r`` and ``s`` are the blinding scalars; they are drawn at random
+        unless given, which is only useful for reproducible benchmarks.
+        """
+        key = self.key
+        if len(witness) != key.n_vars:
+            raise ValueError(f"Witness has {len(witness)} wires, proving key expects {key.n_vars}")
+        witness = [w % CURVE_ORDER for w in witness]
+        r = secrets.randbelow(CURVE_ORDER) if r is None else r % CURVE_ORDER
+        s = secrets.randbelow(CURVE_ORDER) if s is None else s % CURVE_ORDER
+
+        h = self.quotient(witness)
+        private = witness[key.n_public + 1:]
+
+        pi_a = g1_add(g1_add(g1_msm(key.points_a, witness), key.alpha1), g1_mul(key.delta1, r))
+        pi_b = g2_add(g2_add(g2_msm(key.points_b2, witness), key.beta2), g2_mul(key.delta2, s))
+        pi_b1 = g1_add(g1_add(g1_msm(key.points_b1, witness), key.beta1), g1_mul(key.delta1, s))
+        pi_c = g1_msm(key.points_c + key.points_h + [pi_a, pi_b1], private + h + [s, r])
+        pi_c = g1_add(pi_c, g1_neg(g1_mul(key.delta1, r * s)))
+        if pi_a is None or pi_b is None:
+            raise ValueError("Degenerate proof (point at infinity); retry with new blinding")
+
+        proof = {
+            "pi_a": _g1_json(pi_a),
+            "pi_b": _g2_json(pi_b),
+            "pi_c": _g1_json(pi_c),
+            "protocol": "groth16",
+            "curve": "bn128",
+        }
+        public_signals = [str(v) for v in witness[1:1 + key.n_public]]
+        return proof, public_signals
+
+
+def _g1_json(pt: Optional[tuple]) -> List[str]:
+    if pt is None:
+        return ["0", "1", "0"]
+    return [str(pt[0]), str(pt[1]), "1"]
+
+
+def _g2_json(pt: tuple) -> List[List[str]]:
+    return [
+        [str(pt[0][0]), str(pt[0][1])],
+        [str(pt[1][0]), str(pt[1][1])],
+        ["1", "0"],
+    ]
+
+
+def rerandomize_proof(
+    proof: Dict, delta2: tuple, r1: Optional[int] = None, r2: Optional[int] = None
+) -> Dict:
+    """
+    Turn a valid Groth16 proof into a fresh, unlinkable proof of the same statement.
+
+    (A, B, C) -> (A / r1, r1 * B + r1 * r2 * delta2, C + r2 * A) leaves the
+    verification equation unchanged and is distributed like a newly
+    generated proof.  Costs two G1 multiplications and a two-point G2 MSM.
+    """
+    try:
+        a = parse_g1(proof["pi_a"])
+        b = parse_g2(proof["pi_b"])
+        c = parse_g1(proof["pi_c"])
+    except (KeyError, TypeError) as exc:
+        raise InvalidProofFormat("Proof is missing pi_a, pi_b or pi_c") from exc
+    if a is None or b is None:
+        raise InvalidProofFormat("Cannot re-randomize a proof with A or B at infinity")
+    r1 = secrets.randbelow(CURVE_ORDER - 1) + 1 if r1 is None else r1 % CURVE_ORDER
+    r2 = secrets.randbelow(CURVE_ORDER) if r2 is None else r2 % CURVE_ORDER
+    if r1 == 0:
+        raise ValueError("r1 must be non-zero")
+
+    new_a = g1_mul(a, pow(r1, -1, CURVE_ORDER))
+    new_b = g2_msm([b, delta2], [r1, r1 * r2])
+    new_c = g1_add(c, g1_mul(a, r2))
+    return dict(proof, pi_a=_g1_json(new_a), pi_b=_g2_json(new_b), pi_c=_g1_json(new_c))
+
+
+_PROVER_CACHE: Dict[str, Groth16Prover] = {}
+
+
+def get_prover(path) -> Groth16Prover:
+    """Return the prover for a .zkey file, parsing it only once."""
+    key = str(path)
+    prover = _PROVER_CACHE.get(key)
+    if prover is None:
+        prover = Groth16Prover.from_file(path)
+        _PROVER_CACHE[key] = prover
+    return prover
+
+
+def forget_prover(path) -> None:
+    """Drop the cached prover for ``path`` so the next get_prover reloads it."""
+    _PROVER_CACHE.pop(str(path), None)
@@ -1,20 +1,26 @@
 import hashlib
+import hmac
+import json
 
 SNARK_FIELD_MODULUS = 21888242871839275222246405745257275088548364400416034343698204186575808495617
 
 
-def hash_string(text, algorithm='sha256'):
+def _hasher(text, algorithm):
     if algorithm == 'sha256':
-        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+        return hashlib.sha256(text.encode('utf-8'))
     elif algorithm == 'md5':
-        return hashlib.md5(text.encode('utf-8')).hexdigest()
+        return hashlib.md5(text.encode('utf-8'))
     else:
         raise ValueError(f"Unsupported hash algorithm: {algorithm}")
 
 
+def hash_string(text, algorithm='sha256'):
+    return _hasher(text, algorithm).hexdigest()
+
+
 def hash_to_int(text, algorithm='sha256', mod=None):
-    hash_hex = hash_string(text, algorithm)
-    hash_int = int(hash_hex, 16)
+    # Same value as int(hexdigest, 16), without the hex round trip.
+    hash_int = int.from_bytes(_hasher(text, algorithm).digest(), "big")
     if mod:
         return hash_int % mod
     return hash_int
@@ -34,17 +40,28 @@ def compute_commitment(g0: int, secret_x: int, modulus: int = SNARK_FIELD_MODULU
     return (int(g0) % modulus) * (int(secret_x) % modulus) % modulus
 
 
+def proof_binding(secret_x: int, challenge: str, proof: dict) -> str:
+    """
+    HMAC-SHA256 tag tying a proof to a server challenge, keyed by the witness X.
+
+    The tag gives no replay protection and is not an authentication factor.
+    X = Y * g0^-1 follows from the public (g0, Y), so whoever captures a
+    proof can request a challenge of their own and compute a valid tag for
+    it (re-randomizing the malleable Groth16 proof first, if needed).  Only
+    the proof itself shows knowledge of the password; stopping replays would
+    need the challenge inside the circuit's public inputs.
+    """
+    key = (int(secret_x) % SNARK_FIELD_MODULUS).to_bytes(32, "big")
+    message = challenge.encode("utf-8") + b"\n" + json.dumps(
+        proof, sort_keys=True, separators=(",", ":")
+    ).encode("utf-8")
+    return hmac.new(key, message, hashlib.sha256).hexdigest()
+
+
 def fast_exponentiation(base, exponent, modulus):
-    if modulus == 1:
-        return 0
-    result = 1
-    base = base % modulus
-    while exponent > 0:
-        if exponent % 2 == 1:
-            result = (result * base) % modulus
-        exponent = exponent >> 1
-        base = (base * base) % modulus
-    return result
+    # Three-argument pow is the same square-and-multiply, in C.  Negative
+    # exponents keep the old result of 1 rather than meaning an inverse.
+    return pow(base, max(exponent, 0), modulus)
 
 
 def combine_hash(*values):
@@ -1,6 +1,11 @@
 from zkp_protocol import Server, Client
 from getpass import getpass
+import argparse
+import json
+import logging
+import os
 import sys
+from pathlib import Path
 
 
 def print_header():
@@ -74,12 +79,13 @@ def login_user(server, client):
         return
     
     # Retrieve g0 for this user from server
-    if hr_id not in server.users:
+    user_data = server.get_user_data(hr_id)
+    if user_data is None:
         print(f"[ERROR] User '{hr_id}' not found. Please register first.")
         return
     
-    client.g0 = server.users[hr_id]['g0']
-    client.commitment = server.users[hr_id]['Y']
+    client.g0 = user_data['g0']
+    client.commitment = user_data['Y']
     
     print("\nProcessing authentication...")
     print("[*] Generating zkSNARK proof (requires circom/snarkjs artifacts)...")
@@ -137,7 +143,74 @@ def main():
             input("Press Enter to continue...")
 
 
+def import_users(args):
+    from user_store import open_store
+    from user_transfer import RegistrationImporter, iter_file_lines
+
+    # With the shared index on, the running servers' mmap index sees the
+    # imported users straight away instead of falling back to SQLite.
+    server = Server(store=open_store(
+        args.db, shared_index=os.environ.get("USER_INDEX", "1" if os.name == "posix" else "0") == "1",
+    ))
+    importer = RegistrationImporter(server, args.chunk_size)
+    source = sys.stdin.buffer if args.file == "-" else open(args.file, "rb")
+    try:
+        for error in importer.run(iter_file_lines(source)):
+            print(json.dumps(error))
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+        server.close()
+    summary = importer.summary()
+    print(json.dumps({"summary": summary}), file=sys.stderr)
+    return 0 if summary["invalid"] + summary["failed"] == 0 else 1
+
+
+def export_users(args):
+    from user_store import open_store
+    from user_transfer import export_line, export_pages
+
+    store = open_store(args.db)
+    out = sys.stdout.buffer if args.file == "-" else open(args.file, "wb")
+    try:
+        for page in export_pages(store, args.cursor, args.limit):
+            out.write(b"".join(export_line(hr_id, record) for hr_id, record in page))
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+        store.close()
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Passwordless zkSNARK authentication. Without a command, runs the interactive menu."
+    )
+    commands = parser.add_subparsers(dest="command")
+    # The same default as api_server: build/users.db next to this file.
+    default_db = os.environ.get("USER_DB", str(Path(__file__).resolve().parent / "build" / "users.db"))
+    db = {"default": default_db, "help": "user database (default: USER_DB)"}
+
+    importing = commands.add_parser("import", help="register users from an NDJSON file of {hr_id, Y, g0}")
+    importing.add_argument("file", help="NDJSON file, or - for stdin")
+    importing.add_argument("--db", **db)
+    importing.add_argument("--chunk-size", type=int, default=1000, help="lines per transaction")
+    importing.set_defaults(run=import_users)
+
+    exporting = commands.add_parser("export", help="write registered users as NDJSON")
+    exporting.add_argument("file", nargs="?", default="-", help="output file (default: stdout)")
+    exporting.add_argument("--db", **db)
+    exporting.add_argument("--cursor", help="start after this hr_id")
+    exporting.add_argument("--limit", type=int)
+    exporting.set_defaults(run=export_users)
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "WARNING").upper())
+    args = parse_args()
+    if args.command:
+        sys.exit(args.run(args))
     try:
         main()
     except KeyboardInterrupt:
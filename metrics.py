@@ -0,0 +1,257 @@
+"""
+In-process metrics: per-stage latency histograms and outcome counters,
+rendered in the Prometheus text exposition format for /api/metrics.
+
+Stage timings go into HDR-style log-linear histograms: values are integer
+nanoseconds, exact below 2 * SUB_BUCKETS and otherwise bucketed with
+SUB_BUCKETS buckets per power of two, so every recorded value is within
+1 / SUB_BUCKETS (about 1.6%) of its bucket.  Recording is a bit_length, a
+shift and an increment, whatever the range, and quantiles (p50 ... p99.9)
+come from the same counts.  The exposition reports cumulative counts at the
+fixed EXPOSED_BUCKETS boundaries plus those quantiles.
+
+METRICS is the process-wide registry.  With METRICS=0 in the environment
+timers are a shared no-op object and counters return immediately.
+Timers also become trace spans while tracing.TRACER is enabled.
+"""
+
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+
+from tracing import TRACER
+
+SUB_BUCKET_BITS = 6
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+# Values past ~18 minutes land in the last bucket.
+MAX_VALUE_BITS = 40
+BUCKET_COUNT = (MAX_VALUE_BITS - SUB_BUCKET_BITS + 1) * SUB_BUCKETS
+
+EXPOSED_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+EXPOSED_QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+STAGE_FAMILY = "zkp_stage_duration_seconds"
+COUNTER_HELP = {
+    "zkp_login_outcomes_total": "Login attempts by outcome.",
+    "zkp_proof_generation_total": "Proof generation attempts by outcome.",
+    "zkp_reservoir_produced_total": "Values added to each background reservoir by its refill thread.",
+    "zkp_verify_outcomes_total": "Proof verifications by verdict.",
+    "zkp_verify_rejected_total": "Verifications rejected with 503 because the queue was full.",
+}
+
+
+def bucket_index(value: int) -> int:
+    if value < 2 * SUB_BUCKETS:
+        return max(value, 0)
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    index = shift * SUB_BUCKETS + (value >> shift)
+    return index if index < BUCKET_COUNT else BUCKET_COUNT - 1
+
+
+def bucket_upper(index: int) -> int:
+    """Largest value that lands in bucket ``index``."""
+    if index < 2 * SUB_BUCKETS:
+        return index
+    shift = index // SUB_BUCKETS - 1
+    top = index - shift * SUB_BUCKETS
+    return ((top + 1) << shift) - 1
+
+
+class Histogram:
+    __slots__ = ("_counts", "_lock", "count", "sum", "max")
+
+    def __init__(self):
+        self._counts = [0] * BUCKET_COUNT
+        self._lock = threading.Lock()
+        self.count = 0
+        self.sum = 0
+        self.max = 0
+
+    def record(self, value_ns: int) -> None:
+        index = bucket_index(value_ns)
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.sum += value_ns
+            if value_ns > self.max:
+                self.max = value_ns
+
+    def _nonzero(self) -> List[Tuple[int, int]]:
+        with self._lock:
+            return [(bucket_upper(i), c) for i, c in enumerate(self._counts) if c]
+
+    def quantiles(self, qs) -> List[int]:
+        """Upper bound, in ns, of the bucket holding each q-quantile (0 if empty)."""
+        buckets = self._nonzero()
+        total = sum(c for _, c in buckets)
+        out = []
+        for q in qs:
+            if not total:
+                out.append(0)
+                continue
+            rank = max(1, int(q * total + 0.5))
+            seen = 0
+            for upper, c in buckets:
+                seen += c
+                if seen >= rank:
+                    out.append(min(upper, self.max))
+                    break
+        return out
+
+    def quantile(self, q: float) -> int:
+        return self.quantiles([q])[0]
+
+    def cumulative(self, bounds_ns) -> List[int]:
+        """Number of values <= each bound (bucket resolution)."""
+        buckets = self._nonzero()
+        out = []
+        i = seen = 0
+        for bound in bounds_ns:
+            while i < len(buckets) and buckets[i][0] <= bound:
+                seen += buckets[i][1]
+                i += 1
+            out.append(seen)
+        return out
+
+
+class _Timer:
+    __slots__ = ("_histogram", "_start")
+
+    def __init__(self, histogram: Histogram):
+        self._histogram = histogram
+
+    def __enter__(self):
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self._histogram.record(time.perf_counter_ns() - self._start)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def _format_float(value: float) -> str:
+    return repr(float(value))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(pairs) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class Metrics:
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._histograms: Dict[str, Histogram] = {}
+        self._counters: Dict[Tuple[str, Tuple], int] = {}
+        self._gauges: Dict[str, Tuple[str, Callable[[], float]]] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, stage: str) -> Histogram:
+        histogram = self._histograms.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(stage, Histogram())
+        return histogram
+
+    def timer(self, stage: str):
+        """
+        Context manager that records its body's duration under ``stage``.
+
+        While tracing.TRACER is enabled it is also a trace span named ``stage``.
+        """
+        if TRACER.enabled:
+            return TRACER.span(stage, self.histogram(stage) if self.enabled else None)
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self.histogram(stage))
+
+    def observe(self, stage: str, seconds: float) -> None:
+        if self.enabled:
+            self.histogram(stage).record(int(seconds * 1e9))
+
+    def inc(self, family: str, amount: int = 1, **labels) -> None:
+        if not self.enabled:
+            return
+        key = (family, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def gauge(self, name: str, help_text: str, read: Callable[[], float]) -> None:
+        """Register a gauge whose value is read at scrape time."""
+        self._gauges[name] = (help_text, read)
+
+    def counter_value(self, family: str, **labels) -> int:
+        return self._counters.get((family, tuple(sorted(labels.items()))), 0)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+        bounds_ns = [int(b * 1e9) for b in EXPOSED_BUCKETS]
+
+        lines.append(f"# HELP {STAGE_FAMILY} Time spent in each stage of proving, verifying and g0 generation.")
+        lines.append(f"# TYPE {STAGE_FAMILY} histogram")
+        for stage, histogram in histograms:
+            for bound, seen in zip(EXPOSED_BUCKETS, histogram.cumulative(bounds_ns)):
+                lines.append(f"{STAGE_FAMILY}_bucket{_labels([('stage', stage), ('le', bound)])} {seen}")
+            lines.append(f"{STAGE_FAMILY}_bucket{_labels([('stage', stage), ('le', '+Inf')])} {histogram.count}")
+            lines.append(f"{STAGE_FAMILY}_sum{_labels([('stage', stage)])} {_format_float(histogram.sum / 1e9)}")
+            lines.append(f"{STAGE_FAMILY}_count{_labels([('stage', stage)])} {histogram.count}")
+
+        family = "zkp_stage_duration_quantile_seconds"
+        lines.append(f"# HELP {family} Stage latency quantiles from the HDR histograms.")
+        lines.append(f"# TYPE {family} gauge")
+        for stage, histogram in histograms:
+            for q, value in zip(EXPOSED_QUANTILES, histogram.quantiles(EXPOSED_QUANTILES)):
+                lines.append(f"{family}{_labels([('stage', stage), ('quantile', q)])} {_format_float(value / 1e9)}")
+            lines.append(f"{family}{_labels([('stage', stage), ('quantile', 'max')])} "
+                         f"{_format_float(histogram.max / 1e9)}")
+
+        seen_families = set()
+        for (family, labels), value in counters:
+            if family not in seen_families:
+                seen_families.add(family)
+                lines.append(f"# HELP {family} {COUNTER_HELP.get(family, family)}")
+                lines.append(f"# TYPE {family} counter")
+            lines.append(f"{family}{_labels(labels)} {value}")
+
+        for name, (help_text, read) in sorted(self._gauges.items()):
+            try:
+                value = float(read())
+            except Exception:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {_format_float(value)}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Metrics(enabled=os.environ.get("METRICS", "1") != "0")
@@ -0,0 +1,328 @@
+"""
+Shared-memory user index: an mmap-backed open-addressing hash table.
+
+Maps hr_id to fixed-width (g0, Y) records in one file that every worker
+process maps.  Layout:
+
+    header, 64 bytes: magic, version, slot size, capacity, count, retired,
+        16-byte stamp of the SQLite database it mirrors
+    slots, capacity * 112 bytes:
+        tag u64 | crc32 u32 | pad u32 | key digest (32) | g0 (32) | Y (32)
+
+Keys are BLAKE2b-256 digests of the hr_id, so ids of any length fit.  The
+tag is the first 8 bytes of the digest with the top bit set (0 marks an
+empty slot), and probing is linear from ``tag & (capacity - 1)``.
+
+Writers take turns under an exclusive flock on ``<path>.lock``.  A writer
+fills the slot body first and stores the tag last, so a reader that finds
+a tag finds the record behind it; the CRC catches a torn read anyway and
+the reader retries.  A published slot only changes when add_many finds it
+disagrees with SQLite, which the CRC covers the same way, so readers take
+no lock at all.  Past MAX_LOAD the writer rebuilds the
+table at twice the capacity in a new file, renames it over the old one and
+sets the old file's retired flag; readers that see the flag re-open the
+path.  A reader can miss a record added during that window, so callers
+must treat a miss as "look elsewhere" (SharedUserStore falls back to
+SQLite), never as "no such user".
+
+SharedUserStore keeps SQLite's instance id in the stamp and truncates the
+index when it no longer matches, so an index outliving a reset or replaced
+database never serves users that database does not have.
+"""
+
+import contextlib
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import zlib
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, so no cross-process writer lock
+    fcntl = None
+
+from user_store import SQLiteUserStore, UserRecord
+
+MAGIC = b"ZKUIDX\0\0"
+VERSION = 1
+HEADER = struct.Struct("<8sIIQQQ")
+HEADER_SIZE = 64
+SLOT = struct.Struct("<QII32s32s32s")
+SLOT_SIZE = SLOT.size
+BODY_OFFSET = 8  # the tag is the first field; everything after it is the body
+MAX_LOAD = 0.7
+_READ_RETRIES = 16
+_TOP_BIT = 1 << 63
+_COUNT_OFFSET = 24
+_RETIRED_OFFSET = 32
+_STAMP_OFFSET = 40
+_STAMP_SIZE = 16
+
+
+def key_digest(hr_id: str) -> Tuple[bytes, int]:
+    digest = hashlib.blake2b(hr_id.encode("utf-8"), digest_size=32).digest()
+    return digest, int.from_bytes(digest[:8], "little") | _TOP_BIT
+
+
+def _crc(digest: bytes, g0: bytes, y: bytes) -> int:
+    return zlib.crc32(y, zlib.crc32(g0, zlib.crc32(digest)))
+
+
+class IndexUnavailable(RuntimeError):
+    pass
+
+
+class MmapUserIndex:
+    def __init__(self, path, capacity: int = 1 << 16):
+        if fcntl is None:
+            raise IndexUnavailable("the shared user index needs POSIX flock")
+        if capacity & (capacity - 1):
+            raise ValueError("capacity must be a power of two")
+        self.path = Path(path)
+        self.initial_capacity = capacity
+        self._thread_lock = threading.Lock()
+        self._lock_fd = os.open(f"{self.path}.lock", os.O_RDWR | os.O_CREAT, 0o600)
+        self._map = None
+        self.reopens = 0
+        with self._writer():
+            if not self.path.exists():
+                self._create(self.path, capacity)
+        self._open()
+
+    # -- file handling -----------------------------------------------------
+
+    @staticmethod
+    def _create(path: Path, capacity: int, stamp: bytes = b"") -> None:
+        tmp = path.with_name(path.name + ".new")
+        header = HEADER.pack(MAGIC, VERSION, SLOT_SIZE, capacity, 0, 0) + stamp.ljust(_STAMP_SIZE, b"\0")
+        with open(tmp, "wb") as fh:
+            fh.write(header.ljust(HEADER_SIZE, b"\0"))
+            fh.truncate(HEADER_SIZE + capacity * SLOT_SIZE)  # sparse: untouched slots cost no disk
+        os.replace(tmp, path)
+
+    def _open(self) -> None:
+        with open(self.path, "r+b") as fh:
+            new_map = mmap.mmap(fh.fileno(), 0)
+        magic, version, slot_size, capacity, _, _ = HEADER.unpack_from(new_map, 0)
+        if magic != MAGIC or version != VERSION or slot_size != SLOT_SIZE:
+            new_map.close()
+            raise IndexUnavailable(f"{self.path} is not a version {VERSION} user index")
+        old, self._map = self._map, new_map
+        self.capacity = capacity
+        self._mask = capacity - 1
+        if old is not None:
+            # Lookups running on other threads may still hold the old map;
+            # leave it to the garbage collector instead of closing it under them.
+            self.reopens += 1
+
+    def _current(self) -> mmap.mmap:
+        m = self._map
+        if struct.unpack_from("<Q", m, _RETIRED_OFFSET)[0]:
+            with self._thread_lock:
+                if self._map is m:
+                    self._open()
+            m = self._map
+        return m
+
+    @contextlib.contextmanager
+    def _writer(self):
+        # flock is per open file, so threads of this process also need a mutex.
+        with self._thread_lock:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    # -- reads ------------------------------------------------------------
+
+    def _find(self, m, capacity, digest, tag) -> Tuple[int, Optional[UserRecord]]:
+        """(slot, record) for a hit, (first empty slot, None) for a miss."""
+        mask = capacity - 1
+        slot = tag & mask
+        for _ in range(capacity):
+            offset = HEADER_SIZE + slot * SLOT_SIZE
+            stored = struct.unpack_from("<Q", m, offset)[0]
+            if stored == 0:
+                return slot, None
+            if stored == tag:
+                for _ in range(_READ_RETRIES):
+                    _, crc, _, key, g0, y = SLOT.unpack_from(m, offset)
+                    if crc == _crc(key, g0, y):
+                        break
+                else:
+                    raise IndexUnavailable(f"corrupt slot {slot} in {self.path}")
+                if key == digest:
+                    return slot, UserRecord(int.from_bytes(g0, "big"), int.from_bytes(y, "big"))
+            slot = (slot + 1) & mask
+        return -1, None
+
+    def get(self, hr_id: str) -> Optional[UserRecord]:
+        m = self._current()
+        digest, tag = key_digest(hr_id)
+        capacity = struct.unpack_from("<Q", m, 16)[0]
+        return self._find(m, capacity, digest, tag)[1]
+
+    def __len__(self) -> int:
+        return struct.unpack_from("<Q", self._current(), _COUNT_OFFSET)[0]
+
+    @property
+    def stamp(self) -> bytes:
+        m = self._current()
+        return bytes(m[_STAMP_OFFSET:_STAMP_OFFSET + _STAMP_SIZE])
+
+    # -- writes -----------------------------------------------------------
+
+    def _insert(self, m, capacity, digest, tag, g0: bytes, y: bytes) -> bool:
+        """True if the key is new; an existing entry with another record is overwritten."""
+        slot, found = self._find(m, capacity, digest, tag)
+        if found is not None and found.g0.to_bytes(32, "big") == g0 and found.Y.to_bytes(32, "big") == y:
+            return False
+        if slot < 0:
+            raise IndexUnavailable("user index is full")
+        offset = HEADER_SIZE + slot * SLOT_SIZE
+        body = SLOT.pack(0, _crc(digest, g0, y), 0, digest, g0, y)[BODY_OFFSET:]
+        m[offset + BODY_OFFSET:offset + SLOT_SIZE] = body
+        if found is not None:
+            return False  # same tag; readers mid-copy see a bad CRC and retry
+        struct.pack_into("<Q", m, offset, tag)  # publish
+        return True
+
+    def add_many(self, items: Iterable[Tuple[str, UserRecord]]) -> List[bool]:
+        items = list(items)
+        results = []
+        with self._writer():
+            # Another process may have grown the table since we last looked.
+            if struct.unpack_from("<Q", self._map, _RETIRED_OFFSET)[0]:
+                self._open()
+            m = self._map
+            count = struct.unpack_from("<Q", m, _COUNT_OFFSET)[0]
+            for hr_id, record in items:
+                if (count + 1) > self.capacity * MAX_LOAD:
+                    self._grow()
+                    m = self._map
+                digest, tag = key_digest(hr_id)
+                added = self._insert(
+                    m, self.capacity, digest, tag,
+                    record.g0.to_bytes(32, "big"), record.Y.to_bytes(32, "big"),
+                )
+                if added:
+                    count += 1
+                    struct.pack_into("<Q", m, _COUNT_OFFSET, count)
+                results.append(added)
+        return results
+
+    def add(self, hr_id: str, record: UserRecord) -> bool:
+        return self.add_many([(hr_id, record)])[0]
+
+    def reset(self, stamp: bytes) -> None:
+        """Replace the table with an empty one stamped ``stamp``; readers re-open it."""
+        with self._writer():
+            old = self._map
+            self._create(self.path, self.initial_capacity, stamp)
+            struct.pack_into("<Q", old, _RETIRED_OFFSET, 1)
+            self._open()
+
+    def _grow(self) -> None:
+        old = self._map
+        capacity = self.capacity * 2
+        tmp = self.path.with_name(self.path.name + ".grow")
+        self._create(tmp, capacity, bytes(old[_STAMP_OFFSET:_STAMP_OFFSET + _STAMP_SIZE]))
+        with open(tmp, "r+b") as fh:
+            new = mmap.mmap(fh.fileno(), 0)
+        count = 0
+        for slot in range(self.capacity):
+            offset = HEADER_SIZE + slot * SLOT_SIZE
+            tag, _, _, key, g0, y = SLOT.unpack_from(old, offset)
+            if tag:
+                self._insert(new, capacity, key, tag, g0, y)
+                count += 1
+        struct.pack_into("<Q", new, _COUNT_OFFSET, count)
+        new.flush()
+        new.close()
+        os.replace(tmp, self.path)
+        struct.pack_into("<Q", old, _RETIRED_OFFSET, 1)
+        self._open()
+
+    def close(self) -> None:
+        os.close(self._lock_fd)
+
+    def snapshot(self) -> dict:
+        return {
+            "path": str(self.path),
+            "capacity": self.capacity,
+            "entries": len(self),
+            "load": round(len(self) / self.capacity, 3),
+            "reopens": self.reopens,
+        }
+
+
+class SharedUserStore(SQLiteUserStore):
+    """
+    SQLiteUserStore whose lookups go through a MmapUserIndex shared by all
+    worker processes.  SQLite stays the source of truth: registrations
+    commit there first, then go into the index, and an index miss falls
+    back to SQLite.  Reads never take the writer lock: records found that
+    way are queued (up to ``backfill_limit``) and written to the index with
+    the next registration.
+    """
+
+    def __init__(self, path, index_path=None, cache_size: int = 0, backfill_limit: int = 10_000):
+        super().__init__(path, cache_size=cache_size)
+        self.index = MmapUserIndex(index_path or f"{path}.idx")
+        self.index_hits = 0
+        self.backfill_limit = backfill_limit
+        self._backfill = {}
+        self._backfill_lock = threading.Lock()
+        # Users are never deleted, so an index of another database, or one
+        # with more entries than SQLite (restored from an older copy), is stale.
+        if self.index.stamp != self.instance_id or len(self.index) > len(self):
+            self.index.reset(self.instance_id)
+        if len(self.index) < len(self):
+            self.rebuild_index()
+
+    def rebuild_index(self, batch: int = 10_000) -> None:
+        """Copy every SQLite record into the index (after a crash or on first use)."""
+        after = None
+        while True:
+            page = super().records(batch, after)
+            if not page:
+                return
+            self.index.add_many(page)
+            after = page[-1][0]
+
+    def add_many(self, items):
+        items = list(items)
+        results = super().add_many(items)
+        with self._backfill_lock:
+            backfill, self._backfill = self._backfill, {}
+        self.index.add_many([item for item, added in zip(items, results) if added] + list(backfill.items()))
+        return results
+
+    def get(self, hr_id):
+        record = self.index.get(hr_id)
+        if record is not None:
+            self.index_hits += 1
+            return record
+        record = super().get(hr_id)
+        if record is not None:
+            with self._backfill_lock:
+                if len(self._backfill) < self.backfill_limit:
+                    self._backfill[hr_id] = record
+        return record
+
+    def close(self):
+        super().close()
+        self.index.close()
+
+    def snapshot(self):
+        data = super().snapshot()
+        data["backend"] = "sqlite+mmap"
+        data["index"] = self.index.snapshot()
+        data["index_hits"] = self.index_hits
+        data["index_backfill_queued"] = len(self._backfill)
+        return data
@@ -0,0 +1,147 @@
+"""
+On-demand sampling profiler for a running server.
+
+SamplingProfiler.profile(seconds) reads every other thread's stack through
+sys._current_frames() each ``interval`` seconds and counts identical stacks.
+Nothing is hooked into the interpreter, so the profiler costs nothing until
+a capture runs, and during one the sampled threads only pay for the GIL
+handoffs.  Only one capture runs at a time per profiler.
+
+Stacks come back as a Counter keyed by "thread;module:func;...;module:func"
+(root first), which collapsed() prints in the folded format read by
+flamegraph.pl and speedscope, and flamegraph_svg() renders as a standalone
+icicle graph.
+"""
+
+import hashlib
+import sys
+import threading
+import time
+from collections import Counter
+from html import escape
+from typing import Dict, List, Optional
+
+DEFAULT_INTERVAL = 0.005
+MAX_SECONDS = 60.0
+MAX_DEPTH = 128
+
+
+class ProfilerBusy(RuntimeError):
+    """Another capture is already running on this profiler."""
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float = DEFAULT_INTERVAL, max_depth: int = MAX_DEPTH):
+        self.interval = interval
+        self.max_depth = max_depth
+        self._busy = threading.Lock()
+        self.last_samples = 0
+
+    @property
+    def running(self) -> bool:
+        return self._busy.locked()
+
+    def _sample(self, counts: Counter, own: int) -> None:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            stack.append(names.get(ident, f"thread-{ident}"))
+            counts[";".join(reversed(stack))] += 1
+
+    def profile(self, seconds: float, interval: Optional[float] = None) -> Counter:
+        """Sample all other threads for ``seconds`` (capped at MAX_SECONDS); blocks the caller."""
+        if not 0 < seconds <= MAX_SECONDS:
+            raise ValueError(f"seconds must be in (0, {MAX_SECONDS:g}]")
+        interval = self.interval if interval is None else interval
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        if not self._busy.acquire(blocking=False):
+            raise ProfilerBusy("A profile is already being captured")
+        try:
+            counts: Counter = Counter()
+            own = threading.get_ident()
+            samples = 0
+            deadline = time.perf_counter() + seconds
+            while time.perf_counter() < deadline:
+                self._sample(counts, own)
+                samples += 1
+                time.sleep(interval)
+            self.last_samples = samples
+            return counts
+        finally:
+            self._busy.release()
+
+
+PROFILER = SamplingProfiler()
+
+
+def collapsed(counts: Dict[str, int]) -> str:
+    """Folded stacks, one "frame;frame;frame count" line per distinct stack."""
+    return "".join(f"{stack} {count}\n" for stack, count in sorted(counts.items()))
+
+
+def _tree(counts: Dict[str, int]) -> Dict:
+    root = {"name": "all", "value": 0, "children": {}}
+    for stack, count in counts.items():
+        root["value"] += count
+        node = root
+        for frame in stack.split(";"):
+            node = node["children"].setdefault(frame, {"name": frame, "value": 0, "children": {}})
+            node["value"] += count
+    return root
+
+
+def _color(name: str) -> str:
+    h = hashlib.blake2b(name.encode("utf-8"), digest_size=2).digest()
+    return f"rgb({205 + h[0] % 50},{80 + h[1] % 120},55)"
+
+
+def flamegraph_svg(counts: Dict[str, int], title: str = "Profile", width: int = 1200) -> str:
+    """A self-contained SVG icicle graph (root on top) of the sampled stacks."""
+    row, font = 16, 11
+    root = _tree(counts)
+    total = root["value"] or 1
+    rects: List[str] = []
+    depth_max = 0
+
+    def layout(node, x: float, depth: int) -> None:
+        nonlocal depth_max
+        w = node["value"] / total * width
+        if w < 0.3:
+            return
+        depth_max = max(depth_max, depth)
+        y = 24 + depth * row
+        label = f"{node['name']} ({node['value']} samples, {node['value'] / total:.1%})"
+        text = node["name"] if w > 7 * font * 0.6 else ""
+        if text and len(text) * font * 0.6 > w - 4:
+            text = text[: max(int((w - 4) / (font * 0.6)) - 2, 1)] + ".."
+        rects.append(
+            f'<g><title>{escape(label)}</title>'
+            f'<rect x="{x:.2f}" y="{y}" width="{w:.2f}" height="{row - 1}" fill="{_color(node["name"])}"/>'
+            f'<text x="{x + 3:.2f}" y="{y + row - 4}">{escape(text)}</text></g>'
+        )
+        offset = x
+        for child in sorted(node["children"].values(), key=lambda n: n["name"]):
+            layout(child, offset, depth + 1)
+            offset += child["value"] / total * width
+
+    layout(root, 0.0, 0)
+    height = 24 + (depth_max + 1) * row + 8
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'font-family="monospace" font-size="{font}">'
+        f'<text x="4" y="16" font-size="13">{escape(title)} ({root["value"]} samples)</text>'
+        + "".join(rects)
+        + "</svg>\n"
+    )
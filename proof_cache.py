@@ -0,0 +1,73 @@
+"""
+Client-side cache of Groth16 proofs, one per statement.
+
+A returning user proves the same statement (g0, Y) every time, so the first
+proof is kept and later logins send a re-randomized copy of it (see
+groth16_prover.rerandomize_proof) instead of running witness generation
+and proving again.  Entries are keyed by a SHA-256 digest of the public
+signals and evicted least-recently-used once ``max_entries`` is reached.
+"""
+
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+
+def statement_key(public_signals: List[str]) -> str:
+    """Digest identifying a statement by its public signals."""
+    return hashlib.sha256("\n".join(str(s) for s in public_signals).encode("utf-8")).hexdigest()
+
+
+class ProofCache:
+    def __init__(self, max_entries: int = 64):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, public_signals: List[str]) -> Optional[Dict]:
+        """Return a copy of the cached proof for these signals, or None."""
+        key = statement_key(public_signals)
+        with self._lock:
+            proof = self._entries.get(key)
+            if proof is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(proof)
+
+    def put(self, public_signals: List[str], proof: Dict) -> None:
+        key = statement_key(public_signals)
+        with self._lock:
+            self._entries[key] = copy.deepcopy(proof)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def evict(self, public_signals: List[str]) -> bool:
+        with self._lock:
+            return self._entries.pop(statement_key(public_signals), None) is not None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,273 @@
+"""
+Native witness generation from circom's binary .r1cs and .sym outputs.
+
+Replaces ``snarkjs wtns calculate`` (and the Node process it needs) for
+simple quadratic constraint systems such as circuits/auth.circom: every
+non-input signal must be determined by some constraint A * B = C in which it
+is the only unknown and appears linearly.  The order in which constraints
+solve signals is planned once per circuit, so computing a witness is just
+a handful of field operations, and every constraint is checked before the
+witness is returned.
+
+The .wtns encoding matches what snarkjs/circom write, so the output can be
+fed straight to ``snarkjs groth16 prove``.
+"""
+
+import struct
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from hash_utils import SNARK_FIELD_MODULUS
+
+# A linear combination is a tuple of (wire, coefficient) pairs.
+LinearCombination = Tuple[Tuple[int, int], ...]
+
+
+class WitnessError(ValueError):
+    """Raised for unsolvable circuits, bad inputs or unsatisfied constraints."""
+
+
+def _read_sections(data: bytes, magic: bytes) -> Dict[int, bytes]:
+    if data[:4] != magic:
+        raise WitnessError(f"Not a {magic.decode()} file")
+    _version, n_sections = struct.unpack_from("<II", data, 4)
+    offset = 12
+    sections = {}
+    for _ in range(n_sections):
+        section_type, size = struct.unpack_from("<IQ", data, offset)
+        offset += 12
+        sections[section_type] = data[offset:offset + size]
+        offset += size
+    return sections
+
+
+class R1CS:
+    """Parsed contents of a circom .r1cs file (format version 1)."""
+
+    def __init__(self, data: bytes):
+        sections = _read_sections(data, b"r1cs")
+        header = sections[1]
+        self.n8 = struct.unpack_from("<I", header, 0)[0]
+        self.prime = int.from_bytes(header[4:4 + self.n8], "little")
+        offset = 4 + self.n8
+        (
+            self.n_wires,
+            self.n_pub_out,
+            self.n_pub_in,
+            self.n_prv_in,
+            self.n_labels,
+            n_constraints,
+        ) = struct.unpack_from("<IIIIQI", header, offset)
+
+        self.constraints: List[Tuple[LinearCombination, LinearCombination, LinearCombination]] = []
+        body = sections[2]
+        offset = 0
+        term_size = 4 + self.n8
+        for _ in range(n_constraints):
+            constraint = []
+            for _ in range(3):
+                n_terms = struct.unpack_from("<I", body, offset)[0]
+                offset += 4
+                terms = []
+                for _ in range(n_terms):
+                    wire = struct.unpack_from("<I", body, offset)[0]
+                    coef = int.from_bytes(body[offset + 4:offset + term_size], "little")
+                    terms.append((wire, coef))
+                    offset += term_size
+                constraint.append(tuple(terms))
+            self.constraints.append(tuple(constraint))
+
+        wire_map = sections.get(3, b"")
+        self.wire_to_label = [
+            struct.unpack_from("<Q", wire_map, 8 * i)[0] for i in range(len(wire_map) // 8)
+        ]
+
+    @classmethod
+    def from_file(cls, path) -> "R1CS":
+        return cls(Path(path).read_bytes())
+
+    @property
+    def n_inputs(self) -> int:
+        return self.n_pub_in + self.n_prv_in
+
+    @property
+    def input_wires(self) -> range:
+        first = 1 + self.n_pub_out
+        return range(first, first + self.n_inputs)
+
+
+def load_symbols(path, n_wires: int) -> Dict[str, int]:
+    """
+    Map signal names (e.g. ``main.g0``) to wire indices from a .sym file.
+
+    Entries whose wire was optimized away (-1) or that point past the end of
+    the witness (a .sym left over from an older compile) are skipped.
+    """
+    symbols = {}
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        parts = line.strip().split(",", 3)
+        if len(parts) != 4:
+            continue
+        wire = int(parts[1])
+        if 0 <= wire < n_wires:
+            symbols[parts[3]] = wire
+    return symbols
+
+
+def _flatten_input(name: str, value, out: Dict[str, int]):
+    if isinstance(value, (list, tuple)):
+        for i, item in enumerate(value):
+            _flatten_input(f"{name}[{i}]", item, out)
+    else:
+        out[name] = int(value)
+
+
+def _eval(lc: LinearCombination, witness: List[Optional[int]], p: int) -> int:
+    return sum(coef * witness[wire] for wire, coef in lc) % p
+
+
+def _unknowns(lc: LinearCombination, known) -> List[int]:
+    return [wire for wire, _ in lc if wire not in known]
+
+
+class WitnessCalculator:
+    """Computes full witnesses for one circuit from named input signals."""
+
+    def __init__(self, r1cs: R1CS, symbols: Dict[str, int], prefix: str = "main."):
+        if r1cs.prime != SNARK_FIELD_MODULUS:
+            raise WitnessError("Circuit prime does not match SNARK_FIELD_MODULUS")
+        self.r1cs = r1cs
+        self.prime = r1cs.prime
+        self.inputs = {
+            name[len(prefix):]: wire
+            for name, wire in symbols.items()
+            if name.startswith(prefix) and wire in r1cs.input_wires
+        }
+        if len(self.inputs) != r1cs.n_inputs:
+            raise WitnessError(
+                f"Symbol file names {len(self.inputs)} input signals, circuit has {r1cs.n_inputs}"
+            )
+        self.plan = self._plan()
+
+    @classmethod
+    def from_files(cls, r1cs_path, sym_path) -> "WitnessCalculator":
+        r1cs = R1CS.from_file(r1cs_path)
+        return cls(r1cs, load_symbols(sym_path, r1cs.n_wires))
+
+    def _plan(self) -> List[Tuple[int, int, str]]:
+        """
+        Order constraints so each one solves exactly one new wire.
+
+        Returns (constraint index, wire, position) steps, where position says
+        whether the unknown sits in A, B or C.
+        """
+        known = {0, *self.r1cs.input_wires}
+        plan = []
+        remaining = list(range(len(self.r1cs.constraints)))
+        progress = True
+        while progress and len(known) < self.r1cs.n_wires:
+            progress = False
+            for idx in list(remaining):
+                a, b, c = self.r1cs.constraints[idx]
+                missing = {
+                    "A": _unknowns(a, known),
+                    "B": _unknowns(b, known),
+                    "C": _unknowns(c, known),
+                }
+                wires = {w for ws in missing.values() for w in ws}
+                if len(wires) != 1:
+                    continue
+                wire = wires.pop()
+                positions = [pos for pos, ws in missing.items() if ws]
+                if len(positions) != 1 or len(missing[positions[0]]) != 1:
+                    continue  # appears quadratically or on both sides
+                plan.append((idx, wire, positions[0]))
+                known.add(wire)
+                remaining.remove(idx)
+                progress = True
+        if len(known) < self.r1cs.n_wires:
+            unsolved = sorted(set(range(self.r1cs.n_wires)) - known)
+            raise WitnessError(f"Cannot solve wires {unsolved} with linear steps")
+        return plan
+
+    def calculate(self, inputs: Dict) -> List[int]:
+        """Return the full witness (wire 0 is the constant 1) for named inputs."""
+        p = self.prime
+        flat: Dict[str, int] = {}
+        for name, value in inputs.items():
+            _flatten_input(name, value, flat)
+        unknown = set(flat) - set(self.inputs)
+        if unknown:
+            raise WitnessError(f"Unknown input signals: {sorted(unknown)}")
+        missing = set(self.inputs) - set(flat)
+        if missing:
+            raise WitnessError(f"Missing input signals: {sorted(missing)}")
+
+        witness: List[Optional[int]] = [None] * self.r1cs.n_wires
+        witness[0] = 1
+        for name, wire in self.inputs.items():
+            witness[wire] = flat[name] % p
+
+        for idx, wire, position in self.plan:
+            a, b, c = self.r1cs.constraints[idx]
+            lcs = {"A": a, "B": b, "C": c}
+            target = lcs[position]
+            coef = next(k for w, k in target if w == wire)
+            rest = sum(k * witness[w] for w, k in target if w != wire) % p
+            if position == "C":
+                value = (_eval(a, witness, p) * _eval(b, witness, p) - rest) % p
+            else:
+                other = _eval(b if position == "A" else a, witness, p)
+                if other == 0:
+                    raise WitnessError(f"Constraint {idx} does not determine wire {wire} (factor is 0)")
+                value = (_eval(c, witness, p) * pow(other, -1, p) - rest) % p
+            witness[wire] = value * pow(coef, -1, p) % p
+
+        self.check(witness)
+        return witness
+
+    def check(self, witness: List[int]) -> None:
+        """Raise WitnessError unless every constraint A * B = C holds."""
+        p = self.prime
+        for idx, (a, b, c) in enumerate(self.r1cs.constraints):
+            if _eval(a, witness, p) * _eval(b, witness, p) % p != _eval(c, witness, p):
+                raise WitnessError(f"Constraint {idx} is not satisfied by the inputs")
+
+    def public_signals(self, witness: List[int]) -> List[str]:
+        """Public outputs followed by public inputs, as snarkjs lists them."""
+        count = self.r1cs.n_pub_out + self.r1cs.n_pub_in
+        return [str(v) for v in witness[1:1 + count]]
+
+
+def encode_wtns(witness: List[int], prime: int = SNARK_FIELD_MODULUS, n8: int = 32) -> bytes:
+    """Serialize a witness in the snarkjs .wtns (version 2) binary format."""
+    header = struct.pack("<I", n8) + prime.to_bytes(n8, "little") + struct.pack("<I", len(witness))
+    body = b"".join(value.to_bytes(n8, "little") for value in witness)
+    return b"".join([
+        b"wtns",
+        struct.pack("<II", 2, 2),
+        struct.pack("<IQ", 1, len(header)),
+        header,
+        struct.pack("<IQ", 2, len(body)),
+        body,
+    ])
+
+
+def decode_wtns(data: bytes) -> List[int]:
+    sections = _read_sections(data, b"wtns")
+    n8 = struct.unpack_from("<I", sections[1], 0)[0]
+    body = sections[2]
+    return [int.from_bytes(body[i:i + n8], "little") for i in range(0, len(body), n8)]
+
+
+_CALCULATOR_CACHE: Dict[Tuple[str, str], WitnessCalculator] = {}
+
+
+def get_witness_calculator(r1cs_path, sym_path) -> WitnessCalculator:
+    """Return the calculator for a circuit, parsing its files only once."""
+    key = (str(r1cs_path), str(sym_path))
+    calculator = _CALCULATOR_CACHE.get(key)
+    if calculator is None:
+        calculator = WitnessCalculator.from_files(r1cs_path, sym_path)
+        _CALCULATOR_CACHE[key] = calculator
+    return calculator
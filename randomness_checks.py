@@ -0,0 +1,59 @@
+"""
+Basic statistical checks for byte streams, vectorized with NumPy.
+
+These are the frequency (monobit) and runs tests from NIST SP 800-22 and a
+chi-square test on byte frequencies.  They catch gross bias or structure,
+not cryptographic weakness.  Each check returns a dict with the statistic,
+the p-value and ``passed`` (p-value at or above ``alpha``).
+"""
+
+import math
+from typing import Dict, List
+
+import numpy as np
+
+ALPHA = 0.01
+
+
+def _bits(data) -> np.ndarray:
+    return np.unpackbits(np.frombuffer(data, dtype=np.uint8))
+
+
+def _chi2_sf(x: float, dof: int) -> float:
+    """Upper tail of the chi-square distribution (Wilson-Hilferty approximation)."""
+    z = ((x / dof) ** (1 / 3) - (1 - 2 / (9 * dof))) / math.sqrt(2 / (9 * dof))
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def monobit(data, alpha: float = ALPHA) -> Dict:
+    bits = _bits(data)
+    n = bits.size
+    s = 2 * int(np.count_nonzero(bits)) - n
+    statistic = abs(s) / math.sqrt(n)
+    p_value = math.erfc(statistic / math.sqrt(2))
+    return {"test": "monobit", "statistic": statistic, "p_value": p_value, "passed": p_value >= alpha}
+
+
+def runs(data, alpha: float = ALPHA) -> Dict:
+    bits = _bits(data)
+    n = bits.size
+    pi = np.count_nonzero(bits) / n
+    if abs(pi - 0.5) >= 2 / math.sqrt(n):
+        # The runs test presupposes the monobit test passed.
+        return {"test": "runs", "statistic": None, "p_value": 0.0, "passed": False}
+    v = 1 + int(np.count_nonzero(bits[1:] != bits[:-1]))
+    spread = 2 * math.sqrt(2 * n) * pi * (1 - pi)
+    p_value = math.erfc(abs(v - 2 * n * pi * (1 - pi)) / spread)
+    return {"test": "runs", "statistic": v, "p_value": p_value, "passed": p_value >= alpha}
+
+
+def chi_square(data, alpha: float = ALPHA) -> Dict:
+    counts = np.bincount(np.frombuffer(data, dtype=np.uint8), minlength=256)
+    expected = counts.sum() / 256
+    statistic = float(((counts - expected) ** 2).sum() / expected)
+    p_value = _chi2_sf(statistic, 255)
+    return {"test": "chi_square", "statistic": statistic, "p_value": p_value, "passed": p_value >= alpha}
+
+
+def run_all(data, alpha: float = ALPHA) -> List[Dict]:
+    return [check(data, alpha) for check in (monobit, runs, chi_square)]
@@ -1,87 +1,232 @@
+"""
+RSA key pairs for the secure channel.
+
+Generating a 2048-bit key takes hundreds of milliseconds, so keys can be
+saved and loaded (PEM or DER, optionally encrypted with a passphrase) or
+drawn from a KeyPool that a background thread keeps topped up.  The raw
+private operation uses the CRT form with the key's own p, q, dP, dQ and
+qInv, and encrypt_numbers/decrypt_numbers spread a batch over a shared
+thread pool of RSA_THREADS threads.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
 from cryptography.hazmat.primitives.asymmetric import rsa, padding
 from cryptography.hazmat.primitives import hashes, serialization
 from cryptography.hazmat.backends import default_backend
+from g0_reservoir import Reservoir
 import os
+import threading
+
+RSA_THREADS = int(os.environ.get("RSA_THREADS", str(os.cpu_count() or 4)))
+
+_OAEP = padding.OAEP(
+    mgf=padding.MGF1(algorithm=hashes.SHA256()),
+    algorithm=hashes.SHA256(),
+    label=None
+)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _thread_pool():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=RSA_THREADS, thread_name_prefix="rsa")
+    return _executor
+
+
+def _map_chunked(func, items, workers):
+    """func over items on the RSA thread pool, a few chunks per thread, results in order."""
+    items = list(items)
+    workers = workers or RSA_THREADS
+    if workers <= 1 or len(items) < 2:
+        return [func(item) for item in items]
+    size = max(1, -(-len(items) // (workers * 4)))
+    chunks = [items[i:i + size] for i in range(0, len(items), size)]
+    results = []
+    for chunk in _thread_pool().map(lambda chunk: [func(item) for item in chunk], chunks):
+        results.extend(chunk)
+    return results
 
 
 class RSAKeyPair:
-    def __init__(self, key_size=2048):
-        self.private_key = rsa.generate_private_key(
-            public_exponent=65537,
-            key_size=key_size,
-            backend=default_backend()
-        )
+    def __init__(self, key_size=2048, private_key=None):
+        # Pass ``private_key`` to wrap an existing key instead of generating one.
+        if private_key is None:
+            private_key = rsa.generate_private_key(
+                public_exponent=65537,
+                key_size=key_size,
+                backend=default_backend()
+            )
+        self.private_key = private_key
         self.public_key = self.private_key.public_key()
-    
+        self._private_numbers = None
+        self._modulus_bytes = (self.private_key.key_size + 7) // 8
+
+    @classmethod
+    def from_bytes(cls, data, passphrase=None, validate=True):
+        """
+        Load a PKCS#8 or traditional private key, PEM or DER.
+
+        The consistency check of the key's numbers costs about as much as
+        generating one; ``validate=False`` skips it for keys this process
+        wrote itself (never for keys from elsewhere).
+        """
+        password = passphrase.encode("utf-8") if isinstance(passphrase, str) else passphrase
+        load = (
+            serialization.load_pem_private_key
+            if data.lstrip().startswith(b"-----BEGIN")
+            else serialization.load_der_private_key
+        )
+        key = load(data, password=password, backend=default_backend(), unsafe_skip_rsa_key_validation=not validate)
+        if not isinstance(key, rsa.RSAPrivateKey):
+            raise ValueError("Not an RSA private key")
+        return cls(private_key=key)
+
+    @classmethod
+    def load(cls, path, passphrase=None, validate=True):
+        with open(path, "rb") as fh:
+            return cls.from_bytes(fh.read(), passphrase, validate)
+
+    def to_bytes(self, encoding="PEM", passphrase=None):
+        """PKCS#8 private key as PEM or DER, encrypted when a passphrase is given."""
+        if encoding not in ("PEM", "DER"):
+            raise ValueError(f"Unknown encoding '{encoding}', expected 'PEM' or 'DER'")
+        if passphrase:
+            password = passphrase.encode("utf-8") if isinstance(passphrase, str) else passphrase
+            encryption = serialization.BestAvailableEncryption(password)
+        else:
+            encryption = serialization.NoEncryption()
+        return self.private_key.private_bytes(
+            encoding=getattr(serialization.Encoding, encoding),
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=encryption
+        )
+
+    def save(self, path, encoding="PEM", passphrase=None):
+        """Write the private key, readable by the owner only; replaces ``path`` atomically."""
+        data = self.to_bytes(encoding, passphrase)
+        tmp = f"{path}.tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp, path)
+
+    def public_bytes(self, encoding="PEM"):
+        return self.public_key.public_bytes(
+            encoding=getattr(serialization.Encoding, encoding),
+            format=serialization.PublicFormat.SubjectPublicKeyInfo
+        )
+
     def get_public_key_numbers(self):
         public_numbers = self.public_key.public_numbers()
         return public_numbers.n, public_numbers.e
-    
+
+    def _numbers(self):
+        if self._private_numbers is None:
+            self._private_numbers = self.private_key.private_numbers()
+        return self._private_numbers
+
     def get_private_key_numbers(self):
-        private_numbers = self.private_key.private_numbers()
+        private_numbers = self._numbers()
         return private_numbers.d, private_numbers.public_numbers.n
-    
+
+    def private_exponentiation(self, value):
+        """value^d mod n, computed mod p and mod q and recombined (CRT)."""
+        return rsa_crt_exponentiation(value, self._numbers())
+
     def encrypt(self, message_bytes):
-        ciphertext = self.public_key.encrypt(
-            message_bytes,
-            padding.OAEP(
-                mgf=padding.MGF1(algorithm=hashes.SHA256()),
-                algorithm=hashes.SHA256(),
-                label=None
-            )
-        )
-        return ciphertext
-    
+        return self.public_key.encrypt(message_bytes, _OAEP)
+
     def decrypt(self, ciphertext):
-        plaintext = self.private_key.decrypt(
-            ciphertext,
-            padding.OAEP(
-                mgf=padding.MGF1(algorithm=hashes.SHA256()),
-                algorithm=hashes.SHA256(),
-                label=None
-            )
-        )
-        return plaintext
-    
+        return self.private_key.decrypt(ciphertext, _OAEP)
+
     def encrypt_number(self, number):
         message_bytes = number.to_bytes((number.bit_length() + 7) // 8, 'big')
         ciphertext = self.encrypt(message_bytes)
         return int.from_bytes(ciphertext, 'big')
-    
+
     def decrypt_number(self, ciphertext_int):
-        ciphertext_bytes = ciphertext_int.to_bytes((ciphertext_int.bit_length() + 7) // 8, 'big')
+        # Ciphertexts are always modulus-sized; a leading zero byte must stay.
+        ciphertext_bytes = ciphertext_int.to_bytes(self._modulus_bytes, 'big')
         plaintext_bytes = self.decrypt(ciphertext_bytes)
         return int.from_bytes(plaintext_bytes, 'big')
 
+    def encrypt_numbers(self, numbers, workers=None):
+        """encrypt_number for each value, on the RSA thread pool."""
+        return _map_chunked(self.encrypt_number, numbers, workers)
+
+    def decrypt_numbers(self, ciphertexts, workers=None):
+        """decrypt_number for each value, on the RSA thread pool."""
+        return _map_chunked(self.decrypt_number, ciphertexts, workers)
+
+
+class KeyPool:
+    """
+    Up to ``size`` pre-generated key pairs; every get() wakes a background
+    thread that generates replacements.  get() never waits for the thread:
+    an empty pool generates the key on the spot.
+    """
+
+    def __init__(self, size=4, key_size=2048):
+        self.key_size = key_size
+        self._reservoir = Reservoir(
+            self._generate, capacity=size, low_watermark=size, batch_size=1, name="rsa-key-pool"
+        )
+
+    def _generate(self, count):
+        return [RSAKeyPair(self.key_size) for _ in range(count)]
+
+    def __len__(self):
+        return len(self._reservoir)
+
+    def start(self):
+        self._reservoir.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        self._reservoir.stop(timeout)
+
+    def get(self):
+        keypair = self._reservoir.draw()
+        return keypair if keypair is not None else RSAKeyPair(self.key_size)
+
+    def snapshot(self):
+        return {"key_size": self.key_size, **self._reservoir.snapshot()}
+
 
 def rsa_modular_exponentiation(base, exponent, modulus):
-    result = 1
-    base = base % modulus
-    while exponent > 0:
-        if exponent % 2 == 1:
-            result = (result * base) % modulus
-        exponent = exponent >> 1
-        base = (base * base) % modulus
-    return result
+    return pow(base, exponent, modulus)
+
+
+def rsa_crt_exponentiation(base, private_numbers):
+    """base^d mod n from RSAPrivateNumbers: two half-size exponentiations and Garner's recombination."""
+    p, q = private_numbers.p, private_numbers.q
+    m1 = pow(base % p, private_numbers.dmp1, p)
+    m2 = pow(base % q, private_numbers.dmq1, q)
+    h = private_numbers.iqmp * (m1 - m2) % p
+    return m2 + h * q
 
 
 if __name__ == "__main__":
     keypair = RSAKeyPair()
     n, e = keypair.get_public_key_numbers()
     d, _ = keypair.get_private_key_numbers()
-    
+
     print(f"RSA Key Pair Generated:")
     print(f"n (modulus): {n}")
     print(f"e (public exponent): {e}")
     print(f"d (private exponent): {d}")
-    
+
     test_message = 12345
     encrypted = keypair.encrypt_number(test_message)
     decrypted = keypair.decrypt_number(encrypted)
-    
+
     print(f"\nTest encryption/decryption:")
     print(f"Original: {test_message}")
     print(f"Encrypted: {encrypted}")
     print(f"Decrypted: {decrypted}")
     print(f"Match: {test_message == decrypted}")
-
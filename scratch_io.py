@@ -0,0 +1,167 @@
+"""
+Scratch space for handing payloads to the snarkjs CLI.
+
+snarkjs only takes file paths, so every spawn-per-call prove/verify needs
+somewhere to put input.json, witness.wtns, proof.json and public.json.
+Three modes are available:
+
+- ``disk``: a fresh ``tempfile.TemporaryDirectory`` per call (the original
+  behaviour).
+- ``shm``: one directory under ``/dev/shm`` (tmpfs) per thread, reused
+  across calls.
+- ``memfd``: one anonymous in-memory file per slot and thread
+  (``os.memfd_create``), reused across calls.  The child process inherits
+  the descriptors and opens them as ``/dev/fd/N``, so nothing touches a
+  filesystem at all.
+
+Whatever the mode, the payload bytes snarkjs sees are the same.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Sequence, Tuple
+
+SCRATCH_MODES = ("disk", "shm", "memfd")
+SHM_ROOT = Path("/dev/shm")
+
+
+def mode_supported(mode: str) -> bool:
+    if mode == "disk":
+        return True
+    if mode == "shm":
+        return SHM_ROOT.is_dir() and os.access(SHM_ROOT, os.W_OK)
+    if mode == "memfd":
+        return hasattr(os, "memfd_create") and Path("/dev/fd").is_dir()
+    raise ValueError(f"Unknown scratch mode '{mode}', expected one of {SCRATCH_MODES}")
+
+
+def resolve_mode(mode: str) -> str:
+    """Return ``mode`` if this platform supports it, else the closest one that it does."""
+    for candidate in SCRATCH_MODES[SCRATCH_MODES.index(mode)::-1]:
+        if mode_supported(candidate):
+            return candidate
+    return "disk"
+
+
+class DirScratch:
+    """Named slots backed by files in a directory."""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+
+    def path(self, name: str) -> str:
+        return str(self.directory / name)
+
+    def write(self, name: str, data: bytes) -> None:
+        (self.directory / name).write_bytes(data)
+
+    def read(self, name: str) -> bytes:
+        return (self.directory / name).read_bytes()
+
+    def clear(self, name: str) -> None:
+        try:
+            (self.directory / name).unlink()
+        except FileNotFoundError:
+            pass
+
+    def pass_fds(self) -> Tuple[int, ...]:
+        return ()
+
+
+class MemfdScratch:
+    """Named slots backed by memfds; the child opens them as /dev/fd/N."""
+
+    def __init__(self):
+        self._fds: Dict[str, int] = {}
+        self._finalizer = weakref.finalize(self, _close_fds, self._fds)
+
+    def _fd(self, name: str) -> int:
+        fd = self._fds.get(name)
+        if fd is None:
+            fd = os.memfd_create(f"zksnark-{name}", 0)
+            self._fds[name] = fd
+        return fd
+
+    def path(self, name: str) -> str:
+        return f"/dev/fd/{self._fd(name)}"
+
+    def write(self, name: str, data: bytes) -> None:
+        fd = self._fd(name)
+        view = memoryview(data)
+        offset = 0
+        while offset < len(view):
+            offset += os.pwrite(fd, view[offset:], offset)
+        # Overwrite in place and trim the tail, so pages from earlier calls are reused.
+        os.ftruncate(fd, len(view))
+
+    def read(self, name: str) -> bytes:
+        fd = self._fd(name)
+        size = os.fstat(fd).st_size
+        chunks = []
+        offset = 0
+        while offset < size:
+            chunk = os.pread(fd, size - offset, offset)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            offset += len(chunk)
+        return b"".join(chunks)
+
+    def clear(self, name: str) -> None:
+        # Truncate rather than close so the buffer is reused by the next call.
+        os.ftruncate(self._fd(name), 0)
+
+    def pass_fds(self) -> Tuple[int, ...]:
+        return tuple(self._fds.values())
+
+    def close(self) -> None:
+        self._finalizer()
+
+
+def _close_fds(fds: Dict[str, int]) -> None:
+    for fd in fds.values():
+        try:
+            os.close(fd)
+        except OSError:
+            pass
+    fds.clear()
+
+
+_local = threading.local()
+
+
+def _thread_scratch(mode: str):
+    """The calling thread's reusable scratch for ``mode`` (created on first use)."""
+    scratch = getattr(_local, mode, None)
+    if scratch is None:
+        if mode == "memfd":
+            scratch = MemfdScratch()
+        else:
+            directory = tempfile.mkdtemp(prefix="zksnark-", dir=str(SHM_ROOT))
+            scratch = DirScratch(Path(directory))
+            weakref.finalize(scratch, shutil.rmtree, directory, True)
+        setattr(_local, mode, scratch)
+    return scratch
+
+
+@contextmanager
+def scratch_space(mode: str, outputs: Sequence[str] = ()) -> Iterator:
+    """
+    Yield a scratch object with ``path``/``write``/``read``/``pass_fds``.
+
+    Reused scratch has the ``outputs`` slots emptied on entry, so files from
+    a previous call can never be mistaken for this call's output.
+    """
+    if mode == "disk":
+        with tempfile.TemporaryDirectory() as temp_dir:
+            yield DirScratch(Path(temp_dir))
+        return
+    scratch = _thread_scratch(mode)
+    for name in outputs:
+        scratch.clear(name)
+    yield scratch
@@ -0,0 +1,77 @@
+#!/usr/bin/env node
+// Long-lived snarkjs worker used by snarkjs_pool.py.
+//
+// Usage: node snarkjs_worker.js <circuit.wasm> <proving_key.zkey> <verification_key.json>
+//
+// Loads the artifacts once, prints {"ready": true}, then answers one JSON
+// request per stdin line with one JSON response per stdout line. snarkjs is
+// resolved with require(); set NODE_PATH="$(npm root -g)" for a global install
+// or SNARKJS_MODULE to an explicit path.
+
+const fs = require("fs");
+const readline = require("readline");
+
+// Keep stdout reserved for protocol messages.
+console.log = console.error;
+console.info = console.error;
+
+const snarkjs = require(process.env.SNARKJS_MODULE || "snarkjs");
+
+function send(message) {
+    process.stdout.write(JSON.stringify(message) + "\n");
+}
+
+async function main() {
+    const [wasmPath, zkeyPath, vkeyPath] = process.argv.slice(2);
+    if (!wasmPath || !zkeyPath || !vkeyPath) {
+        console.error("usage: snarkjs_worker.js <wasm> <zkey> <vkey>");
+        process.exit(2);
+    }
+
+    const wasm = { type: "mem", data: new Uint8Array(fs.readFileSync(wasmPath)) };
+    const zkey = { type: "mem", data: new Uint8Array(fs.readFileSync(zkeyPath)) };
+    const vkey = JSON.parse(fs.readFileSync(vkeyPath, "utf8"));
+
+    send({ ready: true });
+
+    const rl = readline.createInterface({ input: process.stdin, terminal: false });
+    for await (const line of rl) {
+        if (!line.trim()) continue;
+        let request;
+        try {
+            request = JSON.parse(line);
+        } catch (err) {
+            send({ id: null, ok: false, error: "invalid JSON request" });
+            continue;
+        }
+
+        try {
+            let result;
+            if (request.op === "prove") {
+                const { proof, publicSignals } = await snarkjs.groth16.fullProve(request.input, wasm, zkey);
+                result = { proof, public_signals: publicSignals };
+            } else if (request.op === "verify") {
+                const valid = await snarkjs.groth16.verify(vkey, request.public_signals, request.proof);
+                result = { valid };
+            } else if (request.op === "ping") {
+                result = { pong: true };
+            } else {
+                throw new Error(`unknown op '${request.op}'`);
+            }
+            send({ id: request.id, ok: true, result });
+        } catch (err) {
+            send({ id: request.id, ok: false, error: String((err && err.message) || err) });
+        }
+    }
+
+    // Release ffjavascript worker threads so the process can exit promptly.
+    if (globalThis.curve_bn128) {
+        await globalThis.curve_bn128.terminate();
+    }
+    process.exit(0);
+}
+
+main().catch((err) => {
+    console.error(err && err.stack ? err.stack : String(err));
+    process.exit(1);
+});
@@ -0,0 +1,291 @@
+"""
+Pool of long-lived snarkjs worker processes.
+
+Each worker (``scripts/snarkjs_worker.js`` by default) loads the circuit
+artifacts once and then serves jobs over a JSON-lines protocol:
+
+    -> {"ready": true}                                  once artifacts are loaded
+    <- {"id": 1, "op": "prove", "input": {...}}
+    -> {"id": 1, "ok": true, "result": {"proof": ..., "public_signals": [...]}}
+    <- {"id": 2, "op": "verify", "proof": {...}, "public_signals": [...]}
+    -> {"id": 2, "ok": true, "result": {"valid": true}}
+    <- {"id": 3, "op": "ping"}
+    -> {"id": 3, "ok": true, "result": {"pong": true}}
+
+Failed jobs answer ``{"id": n, "ok": false, "error": "..."}``.  Any program
+that speaks this protocol can stand in for the Node worker.
+"""
+
+import collections
+import itertools
+import json
+import queue
+import subprocess
+import threading
+from typing import Dict, List, Optional
+
+
+class WorkerPoolError(RuntimeError):
+    """Base class for worker pool failures."""
+
+
+class WorkerTimeout(WorkerPoolError):
+    """A worker did not answer within the job timeout; it has been killed."""
+
+
+class WorkerCrashed(WorkerPoolError):
+    """A worker exited or closed its stdout unexpectedly."""
+
+
+class WorkerJobError(WorkerPoolError):
+    """The worker ran the job but reported an error (e.g. an unsatisfied witness)."""
+
+
+class SnarkjsWorker:
+    """One worker process plus the threads draining its stdout and stderr."""
+
+    def __init__(self, command: List[str], startup_timeout: float = 30.0):
+        self.command = command
+        self._ids = itertools.count(1)
+        self._responses: "queue.Queue[Optional[Dict]]" = queue.Queue()
+        self._stderr_tail = collections.deque(maxlen=20)
+        try:
+            self.process = subprocess.Popen(
+                command,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                bufsize=1,
+            )
+        except OSError as exc:
+            raise WorkerCrashed(f"Could not start worker {command}: {exc}") from exc
+        threading.Thread(target=self._read_stdout, daemon=True).start()
+        threading.Thread(target=self._read_stderr, daemon=True).start()
+
+        message = self._next_message(startup_timeout)
+        if not message.get("ready"):
+            self.kill()
+            raise WorkerCrashed(f"Worker sent unexpected greeting: {message!r}")
+
+    def _read_stdout(self):
+        for line in self.process.stdout:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                self._responses.put(json.loads(line))
+            except json.JSONDecodeError:
+                self._stderr_tail.append(f"(stdout) {line}")
+        self._responses.put(None)
+
+    def _read_stderr(self):
+        for line in self.process.stderr:
+            self._stderr_tail.append(line.rstrip())
+
+    def _next_message(self, timeout: float) -> Dict:
+        try:
+            message = self._responses.get(timeout=timeout)
+        except queue.Empty:
+            self.kill()
+            raise WorkerTimeout(f"Worker did not respond within {timeout:.1f}s")
+        if message is None:
+            self.kill()
+            raise WorkerCrashed(f"Worker exited unexpectedly: {self.stderr_tail()}")
+        return message
+
+    def stderr_tail(self) -> str:
+        return " | ".join(self._stderr_tail) or "(no stderr output)"
+
+    def is_alive(self) -> bool:
+        return self.process.poll() is None
+
+    def call(self, op: str, payload: Dict = None, timeout: float = 30.0) -> Dict:
+        job_id = next(self._ids)
+        request = dict(payload or {}, id=job_id, op=op)
+        try:
+            self.process.stdin.write(json.dumps(request) + "\n")
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError, ValueError) as exc:
+            self.kill()
+            raise WorkerCrashed(f"Worker stdin closed: {self.stderr_tail()}") from exc
+
+        while True:
+            message = self._next_message(timeout)
+            if message.get("id") == job_id:
+                break
+        if not message.get("ok"):
+            raise WorkerJobError(message.get("error") or "unknown worker error")
+        return message.get("result") or {}
+
+    def kill(self):
+        if self.process.poll() is None:
+            self.process.kill()
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            pass
+        for stream in (self.process.stdin, self.process.stdout, self.process.stderr):
+            try:
+                stream.close()
+            except (OSError, ValueError):
+                pass
+
+    def close(self, timeout: float = 2.0):
+        """Ask the worker to exit by closing stdin, killing it if it lingers."""
+        try:
+            self.process.stdin.close()
+        except (OSError, ValueError):
+            pass
+        try:
+            self.process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            pass
+        self.kill()
+
+
+class SnarkjsWorkerPool:
+    """
+    Fixed-size pool of SnarkjsWorker processes.
+
+    Workers are checked out one job at a time.  A worker that crashes is
+    replaced lazily the next time its slot is used, a crashed job is retried
+    once on a fresh worker, and a worker that exceeds the job timeout is
+    killed and replaced.
+    """
+
+    def __init__(
+        self,
+        command: List[str],
+        size: int = 2,
+        job_timeout: float = 30.0,
+        startup_timeout: float = 30.0,
+        acquire_timeout: float = 60.0,
+    ):
+        if size < 1:
+            raise ValueError("Worker pool size must be at least 1")
+        self.command = list(command)
+        self.size = size
+        self.job_timeout = job_timeout
+        self.startup_timeout = startup_timeout
+        self.acquire_timeout = acquire_timeout
+        self._idle: "queue.Queue[Optional[SnarkjsWorker]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self.stats = {"jobs": 0, "job_errors": 0, "timeouts": 0, "crashes": 0, "restarts": 0}
+
+        workers = []
+        try:
+            for _ in range(size):
+                workers.append(SnarkjsWorker(self.command, startup_timeout))
+        except WorkerPoolError:
+            for worker in workers:
+                worker.kill()
+            raise
+        for worker in workers:
+            self._idle.put(worker)
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _ensure_alive(self, worker: Optional[SnarkjsWorker]) -> SnarkjsWorker:
+        if worker is not None and worker.is_alive():
+            return worker
+        if worker is not None:
+            worker.kill()
+        self._count("restarts")
+        return SnarkjsWorker(self.command, self.startup_timeout)
+
+    def _acquire(self) -> Optional[SnarkjsWorker]:
+        if self._closed:
+            raise WorkerPoolError("Worker pool is shut down")
+        try:
+            return self._idle.get(timeout=self.acquire_timeout)
+        except queue.Empty:
+            raise WorkerTimeout(f"No worker became available within {self.acquire_timeout:.1f}s")
+
+    def _release(self, worker: Optional[SnarkjsWorker]):
+        if self._closed:
+            if worker is not None:
+                worker.close()
+            return
+        self._idle.put(worker)
+
+    def submit(self, op: str, payload: Dict = None, timeout: float = None) -> Dict:
+        """Run one job and return its result dict."""
+        timeout = self.job_timeout if timeout is None else timeout
+        worker = self._acquire()
+        try:
+            for attempt in range(2):
+                try:
+                    worker = self._ensure_alive(worker)
+                    result = worker.call(op, payload, timeout)
+                    self._count("jobs")
+                    return result
+                except WorkerJobError:
+                    self._count("job_errors")
+                    raise
+                except WorkerTimeout:
+                    self._count("timeouts")
+                    raise
+                except WorkerCrashed:
+                    self._count("crashes")
+                    if attempt == 1:
+                        raise
+        finally:
+            # Dead workers go back too; their slot restarts on next checkout.
+            self._release(worker)
+
+    def prove(self, input_payload: Dict, timeout: float = None):
+        result = self.submit("prove", {"input": input_payload}, timeout)
+        return result["proof"], result["public_signals"]
+
+    def verify(self, proof: Dict, public_signals: List[str], timeout: float = None) -> bool:
+        result = self.submit("verify", {"proof": proof, "public_signals": public_signals}, timeout)
+        return bool(result.get("valid"))
+
+    def health_check(self, timeout: float = 5.0) -> Dict:
+        """Ping every idle worker, restarting any that fail; returns a status summary."""
+        healthy = 0
+        checked = []
+        while True:
+            try:
+                checked.append(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            for i, worker in enumerate(checked):
+                try:
+                    worker = self._ensure_alive(worker)
+                    worker.call("ping", timeout=timeout)
+                    healthy += 1
+                except WorkerPoolError:
+                    if worker is not None:
+                        worker.kill()
+                    try:
+                        worker = self._ensure_alive(None)
+                        healthy += 1
+                    except WorkerPoolError:
+                        worker = None
+                checked[i] = worker
+        finally:
+            for worker in checked:
+                self._release(worker)
+        return {
+            "size": self.size,
+            "checked": len(checked),
+            "healthy": healthy,
+            "busy": self.size - len(checked),
+            **self.stats,
+        }
+
+    def shutdown(self):
+        self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if worker is not None:
+                worker.close()
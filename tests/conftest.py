@@ -0,0 +1,22 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+# The modules live at the repository root rather than in an installed package.
+sys.path.insert(0, str(ROOT))
+
+FIXTURES = ROOT / "benchmarks" / "fixtures"
+
+
+@pytest.fixture(scope="session")
+def fixtures_dir():
+    return FIXTURES
+
+
+@pytest.fixture(scope="session")
+def proof_cases():
+    """Saved proofs (valid and tampered) with the verdicts snarkjs gave them."""
+    return json.loads((FIXTURES / "auth_proofs.json").read_text(encoding="utf-8"))
@@ -0,0 +1,28 @@
+import json
+
+import pytest
+
+from chaotic_generator import ChaoticGenerator
+from chaotic_integrators import INTEGRATORS
+
+RK4_ENGINES = [name for name in INTEGRATORS if name != "rk45"]
+
+
+@pytest.fixture(scope="module")
+def reference(fixtures_dir):
+    # Recorded from the original ChaoticGenerator.iterate.
+    return json.loads((fixtures_dir / "chaotic_rk4_reference.json").read_text())
+
+
+@pytest.mark.parametrize("name", RK4_ENGINES)
+def test_rk4_engines_reproduce_the_original_values(name, reference):
+    gen = ChaoticGenerator(integrator=name)
+    values = [gen.get_random_value() for _ in range(len(reference["get_random_value"]))]
+    assert values == reference["get_random_value"]
+
+
+@pytest.mark.parametrize("name", RK4_ENGINES)
+def test_rk4_engines_reproduce_the_original_state(name, reference):
+    gen = ChaoticGenerator(integrator=name)
+    gen.iterate(1000)
+    assert [float(v).hex() for v in gen.state] == reference["state_after_1000_steps"]
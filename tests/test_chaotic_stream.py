@@ -0,0 +1,34 @@
+import json
+
+import pytest
+
+import randomness_checks
+from chaotic_generator import ChaoticGenerator
+
+# A fixed seed keeps the statistical checks reproducible instead of failing
+# on about one run in a hundred per check.
+SEED = b"tests/test_chaotic_stream"
+
+
+@pytest.mark.parametrize("check", [randomness_checks.monobit, randomness_checks.runs, randomness_checks.chi_square])
+def test_stream_passes_randomness_checks(check):
+    result = check(ChaoticGenerator(seed=SEED).random_bytes(1 << 20))
+    assert result["passed"], result
+
+
+def test_default_generators_do_not_repeat_each_other():
+    assert ChaoticGenerator().random_bytes(64) != ChaoticGenerator().random_bytes(64)
+
+
+def test_explicit_seed_is_reproducible():
+    assert ChaoticGenerator(seed=SEED).random_bytes(4096) == ChaoticGenerator(seed=SEED).random_bytes(4096)
+
+
+@pytest.mark.parametrize("seed", [None, SEED])
+@pytest.mark.parametrize("consumed", [0, 5, 16 * 1024 + 3])
+def test_restore_continues_the_stream(seed, consumed):
+    gen = ChaoticGenerator(seed=seed)
+    gen.random_bytes(consumed)
+    snapshot = json.loads(json.dumps(gen.checkpoint()))
+    restored = ChaoticGenerator.restore(snapshot)
+    assert restored.random_bytes(40_000) == gen.random_bytes(40_000)
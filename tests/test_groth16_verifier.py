@@ -0,0 +1,62 @@
+import copy
+import json
+
+import pytest
+
+from bn254 import fp12_from_json
+from groth16_verifier import Groth16Verifier, InvalidProofFormat
+from zksnark_utils import VERIFICATION_KEY_PATH
+
+
+@pytest.fixture(scope="module")
+def vkey():
+    return json.loads(VERIFICATION_KEY_PATH.read_text(encoding="utf-8"))
+
+
+@pytest.fixture(scope="module")
+def verifier(vkey):
+    return Groth16Verifier(vkey)
+
+
+@pytest.fixture
+def valid(proof_cases):
+    return next(case for case in proof_cases if case["name"] == "valid_alice")
+
+
+def test_fixture_verdicts_match_snarkjs(verifier, proof_cases):
+    for case in proof_cases:
+        assert verifier.verify(case["proof"], case["public_signals"]) is case["expected"], case["name"]
+
+
+def test_alphabeta_matches_verification_key(verifier, vkey):
+    assert verifier.alphabeta == fp12_from_json(vkey["vk_alphabeta_12"])
+
+
+def test_wrong_alphabeta_is_rejected(vkey):
+    tampered = copy.deepcopy(vkey)
+    tampered["vk_alphabeta_12"][0][0][0] = str(int(tampered["vk_alphabeta_12"][0][0][0]) + 1)
+    with pytest.raises(InvalidProofFormat):
+        Groth16Verifier(tampered)
+
+
+def test_batch_bisection_isolates_bad_proofs(verifier, proof_cases):
+    verdicts = verifier.verify_batch(
+        [case["proof"] for case in proof_cases], [case["public_signals"] for case in proof_cases]
+    )
+    assert verdicts == [case["expected"] for case in proof_cases]
+
+
+def test_batch_of_valid_proofs(verifier, proof_cases):
+    valid = [case for case in proof_cases if case["expected"]] * 3
+    assert verifier.verify_batch([c["proof"] for c in valid], [c["public_signals"] for c in valid]) == [True] * 6
+
+
+@pytest.mark.parametrize("field, infinity", [
+    ("pi_a", ["0", "1", "0"]),
+    ("pi_b", [["0", "0"], ["1", "0"], ["0", "0"]]),
+    ("pi_c", ["0", "1", "0"]),
+])
+def test_point_at_infinity_is_rejected(verifier, valid, field, infinity):
+    proof = dict(valid["proof"], **{field: infinity})
+    assert verifier.verify(proof, valid["public_signals"]) is False
+    assert verifier.verify_batch([proof, valid["proof"]], [valid["public_signals"]] * 2) == [False, True]
@@ -0,0 +1,84 @@
+import multiprocessing
+
+import pytest
+
+pytest.importorskip("fcntl")
+
+from mmap_index import MmapUserIndex  # noqa: E402
+from user_store import UserRecord  # noqa: E402
+
+WRITERS = 4
+PER_WRITER = 600
+BATCH = 25
+# Small enough that the writers grow (and retire) the table several times.
+CAPACITY = 64
+
+
+def record(writer, i):
+    return UserRecord(writer * 1_000_000 + i + 1, (writer * 7919 + i) ** 3)
+
+
+def hr_id(writer, i):
+    return f"writer{writer}-user{i}"
+
+
+def write(path, writer):
+    index = MmapUserIndex(path, capacity=CAPACITY)
+    for start in range(0, PER_WRITER, BATCH):
+        index.add_many((hr_id(writer, i), record(writer, i)) for i in range(start, start + BATCH))
+    index.close()
+
+
+def read(path, stop, wrong):
+    # Reads race the writers, including their grows; a hit must always be
+    # the right record (CRC-checked), a miss is allowed while they run.
+    index = MmapUserIndex(path, capacity=CAPACITY)
+    while True:
+        done = stop.is_set()  # one more full pass after the writers finish
+        for writer in range(WRITERS):
+            for i in range(0, PER_WRITER, 7):
+                found = index.get(hr_id(writer, i))
+                if found is not None and found != record(writer, i):
+                    wrong.value += 1
+        if done:
+            break
+    index.close()
+
+
+def test_concurrent_writers_keep_every_record(tmp_path):
+    path = tmp_path / "users.idx"
+    MmapUserIndex(path, capacity=CAPACITY).close()
+    ctx = multiprocessing.get_context("fork")
+    stop, wrong = ctx.Event(), ctx.Value("i", 0)
+    reader = ctx.Process(target=read, args=(path, stop, wrong))
+    reader.start()
+    writers = [ctx.Process(target=write, args=(path, n)) for n in range(WRITERS)]
+    for proc in writers:
+        proc.start()
+    for proc in writers:
+        proc.join(120)
+    stop.set()
+    reader.join(120)
+
+    assert [proc.exitcode for proc in writers] == [0] * WRITERS
+    assert reader.exitcode == 0
+    assert wrong.value == 0
+
+    index = MmapUserIndex(path, capacity=CAPACITY)
+    assert len(index) == WRITERS * PER_WRITER
+    assert index.capacity > CAPACITY
+    for writer in range(WRITERS):
+        for i in range(PER_WRITER):
+            assert index.get(hr_id(writer, i)) == record(writer, i)
+    index.close()
+
+
+def test_add_many_reports_only_new_keys(tmp_path):
+    index = MmapUserIndex(tmp_path / "users.idx", capacity=CAPACITY)
+    assert index.add_many([("a", UserRecord(1, 2)), ("b", UserRecord(3, 4))]) == [True, True]
+    assert index.add_many([("a", UserRecord(1, 2)), ("c", UserRecord(5, 6))]) == [False, True]
+    # An entry that disagrees with SQLite is overwritten in place.
+    assert index.add("a", UserRecord(7, 8)) is False
+    assert index.get("a") == UserRecord(7, 8)
+    assert len(index) == 3
+    index.close()
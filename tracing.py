@@ -0,0 +1,145 @@
+"""
+Per-request trace spans kept in a bounded in-memory ring buffer.
+
+Every ``METRICS.timer(stage)`` in zkp_protocol, zksnark_utils and
+chaotic_generator doubles as a span while tracing is on, so spans need no
+instrumentation of their own.  TraceMiddleware opens a root span per HTTP
+request, and children find their parent through a ContextVar, which
+follows the request into run_in_threadpool and the VerificationScheduler's
+thread executor.
+
+Tracing starts off.  While it is off, METRICS.timer pays one attribute
+check and TraceMiddleware one more before calling the app, nothing else.
+Turn it on at runtime with TRACER.enable() (the admin API does).  Finished
+spans go into a deque of ``capacity`` entries, so the oldest ones are
+dropped first.
+"""
+
+import itertools
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+DEFAULT_CAPACITY = 10_000
+
+# (trace_id, span_id) of the innermost open span in this context.
+_current: ContextVar = ContextVar("zkp_trace_span", default=None)
+# perf_counter_ns gives durations; this turns its readings into wall-clock time.
+_WALL_OFFSET_NS = time.time_ns() - time.perf_counter_ns()
+
+
+class Span:
+    __slots__ = ("_tracer", "_histogram", "name", "trace_id", "span_id", "parent_id", "_start", "_token")
+
+    def __init__(self, tracer: "Tracer", name: str, histogram=None):
+        self._tracer = tracer
+        self._histogram = histogram
+        self.name = name
+
+    def __enter__(self):
+        parent = _current.get()
+        ids = self._tracer._ids
+        if parent is None:
+            self.trace_id = next(ids)
+            self.parent_id = None
+        else:
+            self.trace_id, self.parent_id = parent
+        self.span_id = next(ids)
+        self._token = _current.set((self.trace_id, self.span_id))
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter_ns() - self._start
+        _current.reset(self._token)
+        if self._histogram is not None:
+            self._histogram.record(duration)
+        self._tracer._spans.append((
+            self.trace_id, self.span_id, self.parent_id, self.name, self._start, duration,
+            threading.current_thread().name, exc_type.__name__ if exc_type else None,
+        ))
+        return False
+
+
+class Tracer:
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.enabled = False
+        self._spans: deque = deque(maxlen=capacity)
+        self._ids = itertools.count(1)
+
+    @property
+    def capacity(self) -> int:
+        return self._spans.maxlen
+
+    def enable(self, capacity: Optional[int] = None) -> None:
+        if capacity is not None and capacity != self._spans.maxlen:
+            if capacity < 1:
+                raise ValueError("capacity must be at least 1")
+            self._spans = deque(self._spans, maxlen=capacity)
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def clear(self) -> None:
+        self._spans.clear()
+
+    def span(self, name: str, histogram=None) -> Span:
+        """A span; use only while enabled (METRICS.timer does the check)."""
+        return Span(self, name, histogram)
+
+    def spans(self) -> List[Dict]:
+        return [
+            {
+                "trace_id": trace_id,
+                "span_id": span_id,
+                "parent_id": parent_id,
+                "name": name,
+                "start_unix_ns": start + _WALL_OFFSET_NS,
+                "duration_ms": duration / 1e6,
+                "thread": thread,
+                "error": error,
+            }
+            for trace_id, span_id, parent_id, name, start, duration, thread, error in list(self._spans)
+        ]
+
+    def traces(self, limit: int = 50) -> List[Dict]:
+        """The ``limit`` most recent traces, newest first, each with its spans in start order."""
+        grouped: Dict[int, List[Dict]] = {}
+        for span in self.spans():
+            grouped.setdefault(span["trace_id"], []).append(span)
+        recent = sorted(grouped, reverse=True)[:limit]
+        out = []
+        for trace_id in recent:
+            spans = sorted(grouped[trace_id], key=lambda s: s["start_unix_ns"])
+            root = next((s for s in spans if s["parent_id"] is None), None)
+            out.append({
+                "trace_id": trace_id,
+                "name": root["name"] if root else spans[0]["name"],
+                "duration_ms": root["duration_ms"] if root else None,
+                "complete": root is not None,
+                "spans": spans,
+            })
+        return out
+
+    def snapshot(self) -> Dict:
+        return {"enabled": self.enabled, "capacity": self.capacity, "buffered_spans": len(self._spans)}
+
+
+TRACER = Tracer()
+
+
+class TraceMiddleware:
+    """ASGI middleware opening a root span per HTTP request while tracing is on."""
+
+    def __init__(self, app, tracer: Tracer = TRACER):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope, receive, send):
+        if not self.tracer.enabled or scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        with self.tracer.span(f"{scope['method']} {scope['path']}"):
+            await self.app(scope, receive, send)
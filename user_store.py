@@ -0,0 +1,312 @@
+"""
+Storage for registered users' (g0, Y) commitments.
+
+UserStore is the interface Server talks to; MemoryUserStore keeps the
+original in-process dict, SQLiteUserStore persists to a SQLite database in
+WAL mode so several worker processes can share it and registrations survive
+a restart.
+
+Records are immutable once registered, which keeps caching simple: the
+SQLite store serves repeat lookups from an LRU of UserRecord objects and
+never has to invalidate them.  Concurrent registrations are group-committed:
+whichever writer finds the queue non-empty commits everything queued so far
+in one transaction, and every waiter gets its own result.
+"""
+
+import heapq
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+from hash_utils import reduce_to_field
+
+FIELD_BYTES = 32
+
+
+class UserRecord:
+    """A user's g0 and commitment Y, stored as one 64-byte blob."""
+
+    __slots__ = ("g0", "Y")
+
+    def __init__(self, g0: int, Y: int):
+        self.g0 = g0
+        self.Y = Y
+
+    def pack(self) -> bytes:
+        return self.g0.to_bytes(FIELD_BYTES, "big") + self.Y.to_bytes(FIELD_BYTES, "big")
+
+    @classmethod
+    def unpack(cls, blob: bytes) -> "UserRecord":
+        return cls(int.from_bytes(blob[:FIELD_BYTES], "big"), int.from_bytes(blob[FIELD_BYTES:], "big"))
+
+    @classmethod
+    def from_values(cls, g0, Y) -> "UserRecord":
+        """Build a record from any ints, reduced into the SNARK field."""
+        return cls(reduce_to_field(g0), reduce_to_field(Y))
+
+    def as_dict(self) -> dict:
+        return {"g0": self.g0, "Y": self.Y}
+
+    def __eq__(self, other):
+        return isinstance(other, UserRecord) and (self.g0, self.Y) == (other.g0, other.Y)
+
+    def __repr__(self):
+        return f"UserRecord(g0={self.g0}, Y={self.Y})"
+
+
+class UserStore(ABC):
+    """Interface: add/add_many register, get/contains look up, ids/count list."""
+
+    def add(self, hr_id: str, record: UserRecord) -> bool:
+        """Register ``hr_id``; False if it already exists."""
+        return self.add_many([(hr_id, record)])[0]
+
+    @abstractmethod
+    def add_many(self, items: Iterable[Tuple[str, UserRecord]]) -> List[bool]:
+        """Register each (hr_id, record); True for each one that was new."""
+
+    @abstractmethod
+    def get(self, hr_id: str) -> Optional[UserRecord]:
+        """The record for ``hr_id``, or None."""
+
+    def __contains__(self, hr_id: str) -> bool:
+        return self.get(hr_id) is not None
+
+    @abstractmethod
+    def ids(self, limit: int = None, after: str = None) -> List[str]:
+        """hr_ids in sorted order, starting after ``after``."""
+
+    def records(self, limit: int, after: str = None) -> List[Tuple[str, UserRecord]]:
+        """Up to ``limit`` (hr_id, record) pairs in hr_id order after ``after``, for paging."""
+        return [(hr_id, self.get(hr_id)) for hr_id in self.ids(limit, after)]
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Number of registered users."""
+
+    def close(self) -> None:
+        pass
+
+    def snapshot(self) -> dict:
+        return {"backend": type(self).__name__, "users": len(self)}
+
+
+class MemoryUserStore(UserStore):
+    def __init__(self):
+        self._records = {}
+        self._lock = threading.Lock()
+
+    def add_many(self, items):
+        results = []
+        with self._lock:
+            for hr_id, record in items:
+                if hr_id in self._records:
+                    results.append(False)
+                else:
+                    self._records[hr_id] = record
+                    results.append(True)
+        return results
+
+    def get(self, hr_id):
+        return self._records.get(hr_id)
+
+    def ids(self, limit=None, after=None):
+        keys = (k for k in self._records if after is None or k > after)
+        # A page only needs the smallest ``limit`` keys, not a full sort.
+        return heapq.nsmallest(limit, keys) if limit is not None else sorted(keys)
+
+    def __len__(self):
+        return len(self._records)
+
+
+class _PendingWrite:
+    __slots__ = ("items", "results", "error", "done")
+
+    def __init__(self, items):
+        self.items = items
+        self.results = None
+        self.error = None
+        self.done = False
+
+
+class SQLiteUserStore(UserStore):
+    # Constant SQL text, so sqlite3's statement cache prepares each one once.
+    _INSERT = "INSERT OR IGNORE INTO users (hr_id, record) VALUES (?, ?)"
+    _SELECT = "SELECT record FROM users WHERE hr_id = ?"
+    _COUNT = "SELECT COUNT(*) FROM users"
+    _IDS = "SELECT hr_id FROM users WHERE hr_id > ? ORDER BY hr_id LIMIT ?"
+    _RECORDS = "SELECT hr_id, record FROM users WHERE hr_id > ? ORDER BY hr_id LIMIT ?"
+
+    def __init__(self, path, cache_size: int = 100_000, count_interval: float = 5.0):
+        self.path = str(path)
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self.cache_size = cache_size
+        self._local = threading.local()
+        self._cache: "OrderedDict[str, UserRecord]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._queue: List[_PendingWrite] = []
+        self._queue_lock = threading.Lock()
+        self._commit_lock = threading.Lock()
+        self._write_conn = self._connect()
+        self._write_conn.executescript(
+            """
+            PRAGMA journal_mode = WAL;
+            CREATE TABLE IF NOT EXISTS users (
+                hr_id TEXT PRIMARY KEY,
+                record BLOB NOT NULL
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL
+            ) WITHOUT ROWID;
+            INSERT OR IGNORE INTO meta (key, value) VALUES ('instance', randomblob(16));
+            """
+        )
+        # Random per database file, so caches kept outside it (the mmap index)
+        # can tell when the database was replaced.
+        self.instance_id = bytes(
+            self._write_conn.execute("SELECT value FROM meta WHERE key = 'instance'").fetchone()[0]
+        )
+        self.hits = 0
+        self.misses = 0
+        self.commits = 0
+        # len() serves a count kept up to date by this process's commits and
+        # re-read every count_interval seconds to pick up other processes'.
+        self.count_interval = count_interval
+        self._count = None
+        self._counted_at = 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False, cached_statements=16)
+        # WAL with synchronous=NORMAL: commits are atomic and survive a process
+        # crash; only an OS crash can lose the last few.
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA busy_timeout = 5000")
+        return conn
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def _remember(self, hr_id: str, record: UserRecord) -> None:
+        with self._cache_lock:
+            self._cache[hr_id] = record
+            self._cache.move_to_end(hr_id)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def add_many(self, items):
+        items = [(hr_id, record) for hr_id, record in items]
+        pending = _PendingWrite(items)
+        with self._queue_lock:
+            self._queue.append(pending)
+        # Group commit: the first writer to take the commit lock writes every
+        # queued batch in one transaction; later ones usually find theirs done.
+        with self._commit_lock:
+            if not pending.done:
+                with self._queue_lock:
+                    batch, self._queue = self._queue, []
+                self._commit(batch)
+        if pending.error is not None:
+            raise pending.error
+        return pending.results
+
+    def _commit(self, batch: List[_PendingWrite]) -> None:
+        conn = self._write_conn
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for pending in batch:
+                    pending.results = [
+                        conn.execute(self._INSERT, (hr_id, record.pack())).rowcount == 1
+                        for hr_id, record in pending.items
+                    ]
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        except Exception as exc:
+            for pending in batch:
+                pending.results = None
+                pending.error = exc
+        else:
+            self.commits += 1
+            if self._count is not None:
+                self._count += sum(sum(pending.results) for pending in batch)
+            for pending in batch:
+                for (hr_id, record), added in zip(pending.items, pending.results):
+                    if added:
+                        self._remember(hr_id, record)
+        finally:
+            for pending in batch:
+                pending.done = True
+
+    def get(self, hr_id):
+        with self._cache_lock:
+            record = self._cache.get(hr_id)
+            if record is not None:
+                self._cache.move_to_end(hr_id)
+                self.hits += 1
+                return record
+            self.misses += 1
+        row = self._reader().execute(self._SELECT, (hr_id,)).fetchone()
+        if row is None:
+            return None
+        record = UserRecord.unpack(row[0])
+        self._remember(hr_id, record)
+        return record
+
+    def ids(self, limit=None, after=None):
+        rows = self._reader().execute(self._IDS, (after or "", -1 if limit is None else limit))
+        return [row[0] for row in rows]
+
+    def records(self, limit, after=None):
+        rows = self._reader().execute(self._RECORDS, (after or "", limit))
+        return [(hr_id, UserRecord.unpack(blob)) for hr_id, blob in rows]
+
+    def __len__(self):
+        now = time.monotonic()
+        if self._count is None or now - self._counted_at >= self.count_interval:
+            self._count = self._reader().execute(self._COUNT).fetchone()[0]
+            self._counted_at = now
+        return self._count
+
+    def close(self):
+        self._write_conn.close()
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def snapshot(self):
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "users": len(self),
+            "cache_entries": len(self._cache),
+            "cache_size": self.cache_size,
+            "cache_hits": self.hits,
+            "cache_misses": self.misses,
+            "commits": self.commits,
+        }
+
+
+def open_store(url: str = None, shared_index: bool = False) -> UserStore:
+    """
+    ``None``/"" or "memory" for MemoryUserStore, anything else is a SQLite
+    path; ``shared_index`` adds the cross-process mmap index
+    (mmap_index.SharedUserStore).
+    """
+    if not url or url == "memory":
+        return MemoryUserStore()
+    if shared_index:
+        from mmap_index import SharedUserStore
+
+        return SharedUserStore(url)
+    return SQLiteUserStore(url)
@@ -0,0 +1,191 @@
+"""
+Bulk registration from NDJSON and streaming export of commitments.
+
+Import reads one ``{"hr_id": ..., "Y": ..., "g0": ...}`` object per line.
+Lines are validated and reduced into the SNARK field as they arrive and
+registered ``chunk_size`` at a time with Server.register_users, which the
+SQLite store commits as one transaction per chunk.  Every rejected line
+is reported with its line number; nothing else is kept, so memory stays
+bounded by one chunk whatever the size of the input.
+
+Export walks the store in hr_id order with UserStore.records, one page at a
+time, and writes the same line format back out.  The last hr_id of a page
+is the cursor for the next one.
+"""
+
+import json
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from hash_utils import reduce_to_field
+
+CHUNK_SIZE = 1000
+MAX_LINE_BYTES = 64 * 1024
+EXPORT_PAGE_SIZE = 1000
+
+
+class LineSplitter:
+    """
+    Split a byte stream into lines without holding more than one line.
+    A line longer than ``max_line`` comes out as None (and is skipped).
+    """
+
+    def __init__(self, max_line: int = MAX_LINE_BYTES):
+        self.max_line = max_line
+        self._buffer = bytearray()
+        self._overflow = False
+
+    def feed(self, data: bytes) -> List[Optional[bytes]]:
+        lines = []
+        start = 0
+        while True:
+            end = data.find(b"\n", start)
+            if end < 0:
+                break
+            self._buffer += data[start:end]
+            lines.append(None if self._overflow or len(self._buffer) > self.max_line else bytes(self._buffer))
+            self._buffer.clear()
+            self._overflow = False
+            start = end + 1
+        if not self._overflow:
+            self._buffer += data[start:]
+            if len(self._buffer) > self.max_line:
+                self._overflow = True
+                self._buffer.clear()
+        return lines
+
+    def finish(self) -> List[Optional[bytes]]:
+        if self._overflow:
+            return [None]
+        return [bytes(self._buffer)] if self._buffer.strip() else []
+
+
+def parse_registration(line) -> Tuple[str, int, int]:
+    """(hr_id, Y, g0) from one NDJSON line, reduced into the field; ValueError if invalid."""
+    try:
+        data = json.loads(line)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise ValueError(f"invalid JSON: {exc}") from None
+    if not isinstance(data, dict):
+        raise ValueError("expected a JSON object")
+    hr_id = data.get("hr_id")
+    if not isinstance(hr_id, str) or not hr_id:
+        raise ValueError("hr_id must be a non-empty string")
+    values = []
+    for name in ("Y", "g0"):
+        value = data.get(name)
+        # Decimal strings (as the API returns them) or JSON integers, never floats.
+        if isinstance(value, bool) or not isinstance(value, (int, str)):
+            raise ValueError(f"{name} must be an integer or a decimal string")
+        try:
+            values.append(reduce_to_field(value))
+        except ValueError:
+            raise ValueError(f"{name} is not an integer: {value!r}") from None
+    return hr_id, values[0], values[1]
+
+
+class RegistrationImporter:
+    """
+    Feed lines with add_line(); call flush() whenever ``full`` and once at
+    the end.  Both return error events, ``{"line", "hr_id", "error"}``.
+    """
+
+    def __init__(self, server, chunk_size: int = CHUNK_SIZE):
+        self.server = server
+        self.chunk_size = chunk_size
+        self._pending: List[Tuple[int, str, int, int]] = []
+        self.lines = 0
+        self.registered = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.failed = 0
+        self.chunks = 0
+
+    @property
+    def full(self) -> bool:
+        return len(self._pending) >= self.chunk_size
+
+    def add_line(self, line: Optional[bytes]) -> Optional[Dict]:
+        """Parse one line (None for an over-long one); returns an error event if it is invalid."""
+        self.lines += 1
+        if line is None:
+            self.invalid += 1
+            return {"line": self.lines, "hr_id": None, "error": "line too long"}
+        if not line.strip():
+            return None
+        try:
+            hr_id, Y, g0 = parse_registration(line)
+        except ValueError as exc:
+            self.invalid += 1
+            return {"line": self.lines, "hr_id": None, "error": str(exc)}
+        self._pending.append((self.lines, hr_id, Y, g0))
+        return None
+
+    def flush(self) -> List[Dict]:
+        """Register the buffered chunk in one transaction."""
+        pending, self._pending = self._pending, []
+        if not pending:
+            return []
+        self.chunks += 1
+        try:
+            results = self.server.register_users([(hr_id, Y, g0) for _, hr_id, Y, g0 in pending])
+        except Exception as exc:
+            # The chunk's transaction rolled back, so none of its lines were registered.
+            self.failed += len(pending)
+            return [{"line": n, "hr_id": hr_id, "error": f"chunk failed: {exc}"} for n, hr_id, _, _ in pending]
+        errors = []
+        for (n, hr_id, _, _), (success, message) in zip(pending, results):
+            if success:
+                self.registered += 1
+            else:
+                self.duplicates += 1
+                errors.append({"line": n, "hr_id": hr_id, "error": message})
+        return errors
+
+    def run(self, lines: Iterable[Optional[bytes]]) -> Iterator[Dict]:
+        """Import ``lines`` synchronously, yielding error events as they happen."""
+        for line in lines:
+            error = self.add_line(line)
+            if error is not None:
+                yield error
+            if self.full:
+                yield from self.flush()
+        yield from self.flush()
+
+    def summary(self) -> Dict:
+        return {
+            "lines": self.lines,
+            "registered": self.registered,
+            "duplicates": self.duplicates,
+            "invalid": self.invalid,
+            "failed": self.failed,
+            "chunks": self.chunks,
+        }
+
+
+def iter_file_lines(fh, max_line: int = MAX_LINE_BYTES) -> Iterator[Optional[bytes]]:
+    """Lines of a binary file, with the same over-long handling as LineSplitter."""
+    splitter = LineSplitter(max_line)
+    for block in iter(lambda: fh.read(1 << 16), b""):
+        yield from splitter.feed(block)
+    yield from splitter.finish()
+
+
+def export_pages(store, cursor: str = None, limit: int = None,
+                 page_size: int = EXPORT_PAGE_SIZE) -> Iterator[List[Tuple[str, object]]]:
+    """Pages of (hr_id, UserRecord) after ``cursor``, at most ``limit`` records in total."""
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = page_size if remaining is None else min(page_size, remaining)
+        page = store.records(size, cursor)
+        if not page:
+            return
+        yield page
+        cursor = page[-1][0]
+        if remaining is not None:
+            remaining -= len(page)
+        if len(page) < size:
+            return
+
+
+def export_line(hr_id: str, record) -> bytes:
+    return json.dumps({"hr_id": hr_id, "Y": str(record.Y), "g0": str(record.g0)}).encode() + b"\n"
@@ -0,0 +1,118 @@
+"""
+Bounded, event-loop friendly execution of blocking verification work.
+
+The API's async handlers hand verify_proof calls to a VerificationScheduler
+instead of running them inline, so a slow verify (snarkjs spawn or a pure-Python
+pairing) never blocks the uvicorn event loop.  At most ``max_concurrency`` jobs
+run at once; up to ``max_queue`` more wait for a slot, and anything beyond that
+is rejected immediately with QueueFullError so callers can answer 503.
+"""
+
+import asyncio
+import contextvars
+import math
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Dict
+
+from metrics import METRICS
+
+
+class QueueFullError(RuntimeError):
+    """The verification wait queue is full; ``retry_after`` is a hint in seconds."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class VerificationScheduler:
+    def __init__(self, max_concurrency: int = 4, max_queue: int = 64, executor: str = "thread"):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        if max_queue < 0:
+            raise ValueError("max_queue must not be negative")
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.executor_kind = executor
+        self._executor: Executor = self._make_executor(executor, max_concurrency)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+        # All counters are only touched from the event loop thread.
+        self.in_flight = 0
+        self.queued = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.run_avg = 0.0
+
+    @staticmethod
+    def _make_executor(kind: str, workers: int) -> Executor:
+        if kind == "thread":
+            return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="verify")
+        if kind == "process":
+            # Only useful for the CPU-bound native backend; jobs must be picklable.
+            return ProcessPoolExecutor(max_workers=workers)
+        raise ValueError(f"Unknown executor kind '{kind}', expected 'thread' or 'process'")
+
+    def _retry_after(self) -> int:
+        per_job = self.run_avg or 1.0
+        backlog = (self.queued + self.in_flight) / self.max_concurrency
+        return max(1, math.ceil(per_job * backlog))
+
+    async def run(self, func: Callable, *args, **kwargs):
+        """Run ``func(*args, **kwargs)`` in the executor once a slot is free."""
+        if self.in_flight >= self.max_concurrency and self.queued >= self.max_queue:
+            self.rejected += 1
+            METRICS.inc("zkp_verify_rejected_total")
+            raise QueueFullError(
+                f"Verification queue full ({self.queued} waiting)", self._retry_after()
+            )
+
+        self.queued += 1
+        enqueued = time.perf_counter()
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+        waited = time.perf_counter() - enqueued
+        self.wait_total += waited
+        METRICS.observe("verify_queue_wait", waited)
+        self.wait_max = max(self.wait_max, waited)
+
+        self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            call = partial(func, *args, **kwargs)
+            if self.executor_kind == "thread":
+                # Carry the caller's context (the current trace span) into the worker thread.
+                call = partial(contextvars.copy_context().run, call)
+            return await loop.run_in_executor(self._executor, call)
+        finally:
+            elapsed = time.perf_counter() - started
+            # Exponentially weighted so Retry-After follows the current backend speed.
+            self.run_avg = elapsed if self.completed == 0 else 0.9 * self.run_avg + 0.1 * elapsed
+            self.completed += 1
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def snapshot(self) -> Dict:
+        started = self.completed + self.in_flight
+        return {
+            "executor": self.executor_kind,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "wait_ms_avg": round(self.wait_total / started * 1000, 3) if started else 0.0,
+            "wait_ms_max": round(self.wait_max * 1000, 3),
+            "run_ms_avg": round(self.run_avg * 1000, 3),
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
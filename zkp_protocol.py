@@ -1,62 +1,444 @@
-from chaotic_generator import ChaoticGenerator
+import contextlib
+import hmac
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from admission import LoginThrottled, ShardedLRU, proof_digest
+from derivation_cache import DerivationCache
+from metrics import METRICS
 from hash_utils import (
     SNARK_FIELD_MODULUS,
     compute_commitment,
     hash_password_to_field,
+    proof_binding,
     reduce_to_field,
 )
-from zksnark_utils import generate_proof, verify_proof, ZkSnarkDependencyError
+from g0_reservoir import Reservoir
+from proof_cache import ProofCache
+from user_store import MemoryUserStore, UserRecord
+from zksnark_utils import (
+    generate_proof,
+    rerandomize_proof,
+    verify_proof,
+    verify_proofs_batch,
+    warm_up_verifier,
+    ZkSnarkDependencyError,
+)
+
+# Proofs kept per Client for re-randomized repeat logins; 0 disables the cache.
+CLIENT_PROOF_CACHE_SIZE = int(os.environ.get("CLIENT_PROOF_CACHE_SIZE", "64"))
+# Seconds a login challenge stays valid.
+CHALLENGE_TTL = float(os.environ.get("LOGIN_CHALLENGE_TTL", "60"))
+# Outstanding challenges kept per hr_id; issuing one more drops the oldest.
+CHALLENGES_PER_USER = int(os.environ.get("LOGIN_CHALLENGES_PER_USER", "8"))
+# hr_ids with outstanding challenges; past this the least recently used go.
+CHALLENGE_MAX_USERS = int(os.environ.get("LOGIN_CHALLENGE_MAX_USERS", "100000"))
+# Password-derived secrets kept per Client for re-auth (see derivation_cache);
+# 0, the default, derives X on every login.
+CLIENT_DERIVATION_CACHE_SIZE = int(os.environ.get("CLIENT_DERIVATION_CACHE_SIZE", "0"))
+CLIENT_DERIVATION_CACHE_TTL = float(os.environ.get("CLIENT_DERIVATION_CACHE_TTL", "300"))
+
+logger = logging.getLogger(__name__)
+
+# Outcome label (zkp_login_outcomes_total) for each pre-verification rejection;
+# anything else is a challenge-binding failure.
+_REJECTION_OUTCOMES = {
+    "User not found": "user_not_found",
+    "Invalid public signal set": "signal_mismatch",
+    "Public signals do not match stored commitment": "signal_mismatch",
+}
+THROTTLED_MESSAGE = "Too many login attempts"
 
 
 class Server:
-    def __init__(self):
-        self.users = {}
-        self.chaotic_gen = ChaoticGenerator()
+    def __init__(self, verify_backend=None, require_binding=False, g0_reservoir_size=0, chaotic=None, store=None,
+                 invalid_proofs=None, admission=None, lazy=False):
+        # A user_store.UserStore; the default keeps users in memory only.
+        self.users = store if store is not None else MemoryUserStore()
+        # ``chaotic`` may be a ShardedChaoticGenerator, which locks per shard
+        # itself, or a callable that builds one; the default single generator
+        # is shared under one lock.  Either way the generator (and NumPy) is
+        # only loaded when the first g0 is needed.
+        self._chaotic = chaotic
+        self._chaotic_gen = None
+        self._chaotic_lock = threading.Lock() if chaotic is None else contextlib.nullcontext()
+        self._lazy_lock = threading.Lock()
+        # With a reservoir, g0 values are precomputed by a background thread;
+        # 0 keeps generating each one on the request thread.  ``lazy`` leaves
+        # the thread idle until warm_up() or the first draw.
+        self.g0_reservoir = None
+        self._reservoir_started = False
+        if g0_reservoir_size > 0:
+            self.g0_reservoir = Reservoir(self._generate_g0s, capacity=g0_reservoir_size)
+            if not lazy:
+                self._start_reservoir()
+        # None defers to ZKSNARK_VERIFY_BACKEND; see zksnark_utils.verify_proof.
+        self.verify_backend = verify_backend
+        # hr_id -> OrderedDict(challenge -> expiry), oldest first; each
+        # challenge answers one login.  The entry expires with its newest
+        # challenge, so the timing wheel sweeps idle hr_ids without scans.
+        self.challenges = ShardedLRU(CHALLENGE_MAX_USERS)
+        # Binding only checks the protocol is followed; it does not stop a
+        # captured proof being replayed (see hash_utils.proof_binding).
+        self.require_binding = require_binding
+        # Optional admission.InvalidProofCache and admission.LoginAdmission,
+        # consulted after the signal checks and before a proof is verified.
+        self.invalid_proofs = invalid_proofs
+        self.admission = admission
+
+    @property
+    def chaotic_gen(self):
+        if self._chaotic_gen is None:
+            with self._lazy_lock:
+                if self._chaotic_gen is None:
+                    if self._chaotic is None:
+                        from chaotic_generator import ChaoticGenerator
+
+                        self._chaotic_gen = ChaoticGenerator()
+                    elif callable(self._chaotic):
+                        self._chaotic_gen = self._chaotic()
+                    else:
+                        self._chaotic_gen = self._chaotic
+        return self._chaotic_gen
+
+    def _start_reservoir(self):
+        if self.g0_reservoir is not None and not self._reservoir_started:
+            with self._lazy_lock:
+                if not self._reservoir_started:
+                    self.g0_reservoir.start()
+                    self._reservoir_started = True
+
+    def warm_up(self):
+        """
+        Do the one-off work that would otherwise land on the first requests:
+        start the g0 reservoir, build the chaotic generator and compute one
+        g0, then load the verifier and run one verification (see
+        zksnark_utils.warm_up_verifier).  Returns the seconds per step.
+        """
+        started = time.perf_counter()
+        self._start_reservoir()
+        self._generate_g0s(1)
+        timings = {"g0": time.perf_counter() - started}
+        timings.update(warm_up_verifier(self.verify_backend))
+        return timings
+
+    def _generate_g0s(self, count):
+        with self._chaotic_lock:
+            values = self.chaotic_gen.get_chaotic_sequence(count, 1000, 10**6)
+        return [reduce_to_field(v) for v in values]
 
     def get_random_g0(self):
-        random_value = self.chaotic_gen.get_random_value(1000, 10**6)
+        if self.g0_reservoir is not None:
+            self._start_reservoir()
+            g0 = self.g0_reservoir.draw()
+            if g0 is not None:
+                return g0
+            return self._generate_g0s(1)[0]
+        with METRICS.timer("g0_generate"), self._chaotic_lock:
+            random_value = self.chaotic_gen.get_random_value(1000, 10**6)
         return reduce_to_field(random_value)
 
+    def close(self):
+        """Stop background work (the g0 reservoir refill thread), checkpoint the generator, close the store."""
+        if self.g0_reservoir is not None:
+            self.g0_reservoir.stop()
+        if hasattr(self._chaotic_gen, "close"):
+            self._chaotic_gen.close()
+        self.users.close()
+
     def register_user(self, hr_id, Y, g0):
-        if hr_id in self.users:
+        if not self.users.add(hr_id, UserRecord.from_values(g0, Y)):
             return False, "User already exists"
-        self.users[hr_id] = {
-            "Y": reduce_to_field(Y),
-            "g0": reduce_to_field(g0),
-        }
         return True, "User registered successfully"
 
-    def authenticate_user(self, hr_id, proof, public_signals):
-        if hr_id not in self.users:
-            return False, "User not found"
+    def register_users(self, registrations):
+        """Register many (hr_id, Y, g0) tuples in one write; returns one (success, message) each."""
+        added = self.users.add_many(
+            (hr_id, UserRecord.from_values(g0, Y)) for hr_id, Y, g0 in registrations
+        )
+        return [
+            (True, "User registered successfully") if ok else (False, "User already exists")
+            for ok in added
+        ]
 
-        user_data = self.users[hr_id]
-        expected_g0 = str(user_data["g0"])
-        expected_Y = str(user_data["Y"])
+    def get_user_data(self, hr_id):
+        """{"g0": ..., "Y": ...} for a registered user, else None."""
+        record = self.users.get(hr_id)
+        return record.as_dict() if record is not None else None
 
-        if len(public_signals) < 2:
-            return False, "Invalid public signal set"
+    def list_users(self, limit=None, after=None):
+        return self.users.ids(limit, after)
 
-        # DEBUG: Print what we're comparing
-        print(f"[DEBUG] Expected g0: {expected_g0}")
-        print(f"[DEBUG] Received g0: {public_signals[0]}")
-        print(f"[DEBUG] Expected Y:  {expected_Y}")
-        print(f"[DEBUG] Received Y:  {public_signals[1]}")
+    def _check_public_signals(self, hr_id, public_signals):
+        """Return an error message if the signals don't match hr_id's commitment, else None."""
+        record = self.users.get(hr_id)
+        if record is None:
+            return "User not found"
+
+        expected_g0 = str(record.g0)
+        expected_Y = str(record.Y)
+
+        if len(public_signals) < 2:
+            return "Invalid public signal set"
 
         if public_signals[0] != expected_g0 or public_signals[1] != expected_Y:
-            return False, "Public signals do not match stored commitment"
+            logger.debug(
+                "public signals for %s do not match: expected (%s, %s), received (%s, %s)",
+                hr_id, expected_g0, expected_Y, public_signals[0], public_signals[1],
+            )
+            return "Public signals do not match stored commitment"
+        return None
+
+    def issue_challenge(self, hr_id):
+        """
+        Return a fresh single-use challenge for hr_id's next login, or None if unknown.
+
+        Up to CHALLENGES_PER_USER stay outstanding per hr_id, so anyone asking
+        for a challenge in a victim's name cannot displace the victim's own.
+        """
+        if hr_id not in self.users:
+            return None
+        challenge = secrets.token_hex(16)
+        shard = self.challenges.shard(hr_id)
+        now = time.monotonic()
+        with shard.lock:
+            shard.advance(now)
+            pending = shard.get(hr_id, now) or OrderedDict()
+            for issued, expires in list(pending.items()):
+                if now > expires:
+                    del pending[issued]
+            pending[challenge] = now + CHALLENGE_TTL
+            while len(pending) > CHALLENGES_PER_USER:
+                pending.popitem(last=False)
+            shard.put(hr_id, pending, now + CHALLENGE_TTL)
+        return challenge
+
+    def _check_binding(self, hr_id, proof, binding):
+        """
+        Return an error message unless binding answers one of hr_id's
+        outstanding challenges; only the challenge it answers is consumed.
+        """
+        if binding is None:
+            return "Login challenge response required" if self.require_binding else None
+        shard = self.challenges.shard(hr_id)
+        now = time.monotonic()
+        with shard.lock:
+            shard.advance(now)
+            pending = shard.get(hr_id, now)
+            candidates = [c for c, expires in pending.items() if now <= expires] if pending else []
+        if not candidates:
+            return "No valid login challenge"
+        record = self.users.get(hr_id)
+        g0 = record.g0 % SNARK_FIELD_MODULUS
+        if g0 == 0:
+            return "Authentication failed"
+        secret_x = record.Y * pow(g0, -1, SNARK_FIELD_MODULUS) % SNARK_FIELD_MODULUS
+        for challenge in candidates:
+            if hmac.compare_digest(str(binding), proof_binding(secret_x, challenge, proof)):
+                with shard.lock:
+                    # A concurrent login may have used it first.
+                    if pending.pop(challenge, None) is None:
+                        return "No valid login challenge"
+                return None
+        return "Login challenge response does not match"
+
+    def _precheck(self, hr_id, proof, public_signals, binding):
+        """Signal and binding checks before verification; the error message, or None."""
+        with METRICS.timer("login_checks"):
+            error = self._check_public_signals(hr_id, public_signals)
+            if error is None:
+                error = self._check_binding(hr_id, proof, binding)
+        if error is not None:
+            METRICS.inc("zkp_login_outcomes_total", outcome=_REJECTION_OUTCOMES.get(error, "binding_error"))
+        return error
+
+    def _screen(self, hr_id, proof, public_signals, client, charge_client=True):
+        """
+        Replay and rate checks before verification: (error, retry_after, digest).
+
+        error is set for a proof already known to be invalid and for a
+        throttled login (retry_after > 0 only then); digest is the proof's
+        key in the invalid-proof cache, if there is one.  A batch charges
+        its client once itself and passes ``charge_client=False``.
+        """
+        digest = None
+        if self.invalid_proofs is not None:
+            digest = proof_digest(proof, public_signals)
+            if digest in self.invalid_proofs:
+                METRICS.inc("zkp_login_outcomes_total", outcome="invalid_cached")
+                return "Authentication failed", 0.0, digest
+        if self.admission is not None:
+            wait = (charge_client and self.admission.admit_client(client)) or self.admission.admit_user(hr_id, client)
+            if wait:
+                METRICS.inc("zkp_login_outcomes_total", outcome="throttled")
+                return THROTTLED_MESSAGE, wait, digest
+        return None, 0.0, digest
+
+    def _record_failures(self, hr_ids, digests, verdicts, client):
+        # Remember proofs that failed verification and charge them to their
+        # (hr_id, client) bucket.  None is a verifier failure rather than a
+        # verdict, so it is neither cached nor charged.
+        for hr_id, digest, is_valid in zip(hr_ids, digests, verdicts):
+            if is_valid is False:
+                if self.invalid_proofs is not None:
+                    self.invalid_proofs.add(digest)
+                if self.admission is not None:
+                    self.admission.failed(hr_id, client)
+
+    @staticmethod
+    def _count_verdicts(verdicts):
+        valid = sum(1 for v in verdicts if v)
+        METRICS.inc("zkp_login_outcomes_total", valid, outcome="valid")
+        METRICS.inc("zkp_login_outcomes_total", len(verdicts) - valid, outcome="invalid")
+
+    @staticmethod
+    def _count_dependency_error(logins=1):
+        METRICS.inc("zkp_login_outcomes_total", logins, outcome="dependency_error")
+
+    def _admit(self, hr_id, proof, public_signals, binding, client):
+        """All checks before verification: (error, digest); raises LoginThrottled."""
+        error = self._precheck(hr_id, proof, public_signals, binding)
+        if error is not None:
+            return error, None
+        error, retry_after, digest = self._screen(hr_id, proof, public_signals, client)
+        if retry_after:
+            raise LoginThrottled(error, retry_after)
+        return error, digest
 
-        is_valid = verify_proof(proof, public_signals)
+    def authenticate_user(self, hr_id, proof, public_signals, binding=None, client=None):
+        """
+        (success, message) for one login.  ``client`` identifies the caller
+        for per-client rate limits; raises admission.LoginThrottled when a
+        rate limit is hit.
+        """
+        error, digest = self._admit(hr_id, proof, public_signals, binding, client)
+        if error is not None:
+            return False, error
+
+        try:
+            is_valid = verify_proof(proof, public_signals, backend=self.verify_backend)
+        except ZkSnarkDependencyError:
+            self._count_dependency_error()
+            raise
+        self._count_verdicts([is_valid])
+        self._record_failures([hr_id], [digest], [is_valid], client)
+        if is_valid:
+            return True, "Authentication verified"
+        return False, "Authentication failed"
+
+    async def authenticate_user_async(self, hr_id, proof, public_signals, scheduler, binding=None, client=None):
+        """
+        Like authenticate_user, but runs the proof check through a
+        VerificationScheduler so the calling event loop is never blocked.
+        """
+        error, digest = self._admit(hr_id, proof, public_signals, binding, client)
+        if error is not None:
+            return False, error
+
+        try:
+            is_valid = await scheduler.run(verify_proof, proof, public_signals, self.verify_backend)
+        except ZkSnarkDependencyError:
+            self._count_dependency_error()
+            raise
+        self._count_verdicts([is_valid])
+        self._record_failures([hr_id], [digest], [is_valid], client)
         if is_valid:
             return True, "Authentication verified"
         return False, "Authentication failed"
 
+    def _partition_batch(self, logins, client):
+        """
+        Checks for a batch before verification: (results, pending, digests).
+        The batch is one request to the client's bucket, charged when the
+        first login passes the signal checks; raises LoginThrottled if that
+        is refused.  A login whose hr_id is throttled is just rejected.
+        """
+        results = [None] * len(logins)
+        pending, digests = [], []
+        charged = False
+        for i, (hr_id, proof, public_signals, *binding) in enumerate(logins):
+            error = self._precheck(hr_id, proof, public_signals, binding[0] if binding else None)
+            if error is None and not charged and self.admission is not None:
+                charged = True
+                wait = self.admission.admit_client(client)
+                if wait:
+                    METRICS.inc("zkp_login_outcomes_total", len(logins) - i, outcome="throttled")
+                    raise LoginThrottled(THROTTLED_MESSAGE, wait)
+            if error is None:
+                error, _, digest = self._screen(hr_id, proof, public_signals, client, charge_client=False)
+            if error is not None:
+                results[i] = (False, error)
+            else:
+                pending.append(i)
+                digests.append(digest)
+        return results, pending, digests
+
+    def _apply_verdicts(self, logins, client, results, pending, digests, verdicts):
+        self._count_verdicts(verdicts)
+        self._record_failures([logins[i][0] for i in pending], digests, verdicts, client)
+        for i, is_valid in zip(pending, verdicts):
+            results[i] = (True, "Authentication verified") if is_valid else (False, "Authentication failed")
+        return results
+
+    def authenticate_users_batch(self, logins, client=None):
+        """
+        Authenticate many (hr_id, proof, public_signals[, binding]) tuples at once.
+
+        Signal checks run per login; the proofs that pass them are verified
+        together with verify_proofs_batch.  Returns one (success, message)
+        tuple per login, in order; raises admission.LoginThrottled when the
+        client is over its rate limit.
+        """
+        results, pending, digests = self._partition_batch(logins, client)
+        try:
+            verdicts = verify_proofs_batch(
+                [logins[i][1] for i in pending],
+                [logins[i][2] for i in pending],
+                backend=self.verify_backend,
+            )
+        except ZkSnarkDependencyError:
+            self._count_dependency_error(len(pending))
+            raise
+        return self._apply_verdicts(logins, client, results, pending, digests, verdicts)
+
+    async def authenticate_users_batch_async(self, logins, scheduler, client=None):
+        results, pending, digests = self._partition_batch(logins, client)
+        try:
+            verdicts = await scheduler.run(
+                verify_proofs_batch,
+                [logins[i][1] for i in pending],
+                [logins[i][2] for i in pending],
+                self.verify_backend,
+            )
+        except ZkSnarkDependencyError:
+            self._count_dependency_error(len(pending))
+            raise
+        return self._apply_verdicts(logins, client, results, pending, digests, verdicts)
+
 
 class Client:
-    def __init__(self):
-        self.chaotic_gen = ChaoticGenerator()
+    def __init__(self, proof_cache_size=None, derivation_cache_size=None, derivation_cache_ttl=None):
+        self._chaotic_gen = None
         self.g0 = None
         self.commitment = None
+        size = CLIENT_PROOF_CACHE_SIZE if proof_cache_size is None else proof_cache_size
+        self.proof_cache = ProofCache(size) if size > 0 else None
+        size = CLIENT_DERIVATION_CACHE_SIZE if derivation_cache_size is None else derivation_cache_size
+        ttl = CLIENT_DERIVATION_CACHE_TTL if derivation_cache_ttl is None else derivation_cache_ttl
+        self.derivation_cache = DerivationCache(size, ttl) if size > 0 else None
+
+    @property
+    def chaotic_gen(self):
+        # Registering and logging in never use it; built (with NumPy) on first access.
+        if self._chaotic_gen is None:
+            from chaotic_generator import ChaoticGenerator
+
+            self._chaotic_gen = ChaoticGenerator()
+        return self._chaotic_gen
 
     def register(self, hr_id, password, g0):
         self.g0 = reduce_to_field(g0)
@@ -68,32 +450,74 @@ class Client:
             "g0": self.g0,
         }
 
-    def login(self, hr_id, password):
+    def _derive_secret(self, hr_id, password):
+        """(X, whether g0 * X matches the stored commitment), memoized when enabled."""
+        cache = self.derivation_cache
+        if cache is not None:
+            secret_x = cache.get(hr_id, self.g0, self.commitment, password)
+            if secret_x is not None:
+                return secret_x, True
+        secret_x = hash_password_to_field(password)
+        matches = compute_commitment(self.g0, secret_x) == self.commitment
+        if matches and cache is not None:
+            cache.put(hr_id, self.g0, self.commitment, password, secret_x)
+        return secret_x, matches
+
+    def _cached_proof(self, public_signals):
+        """Re-randomize the cached proof for this statement, or return None."""
+        if self.proof_cache is None:
+            return None
+        proof = self.proof_cache.get(public_signals)
+        if proof is None:
+            return None
+        # Imported here rather than at the top so that a Client alone does not load bn254.
+        from groth16_verifier import InvalidProofFormat
+
+        try:
+            return rerandomize_proof(proof)
+        except (ZkSnarkDependencyError, InvalidProofFormat):
+            self.proof_cache.evict(public_signals)
+            return None
+
+    def login(self, hr_id, password, challenge=None):
+        """
+        Build a login payload for hr_id.
+
+        A repeat login for the same statement re-randomizes the cached proof
+        instead of proving again; the password is still checked against the
+        commitment first.  With a server ``challenge`` the payload also
+        carries a ``binding`` tag (see hash_utils.proof_binding).
+        """
         if self.g0 is None:
             raise ValueError("Client must register before login to receive g0")
         if self.commitment is None:
             raise ValueError("Client must register before login to receive commitment")
 
-        secret_x = hash_password_to_field(password)
-        
-        # DEBUG: Print what we're sending to proof generation
-        print(f"[DEBUG CLIENT] g0 to prove: {self.g0}")
-        print(f"[DEBUG CLIENT] X (hashed pw): {secret_x}")
-        print(f"[DEBUG CLIENT] Y (commitment): {self.commitment}")
-        print(f"[DEBUG CLIENT] Expected g0*X: {compute_commitment(self.g0, secret_x)}")
-        
+        secret_x, matches = self._derive_secret(hr_id, password)
+        if not matches:
+            logger.debug("password for %s does not match the commitment; proving anyway", hr_id)
+
         # Use the stored commitment (Y) from registration, not a freshly computed one
         # The zkSNARK circuit will verify that g0 * X == Y
-        try:
-            proof, public_signals = generate_proof(self.g0, secret_x, self.commitment)
-        except ZkSnarkDependencyError as exc:
-            raise RuntimeError(str(exc)) from exc
-
-        print(f"[DEBUG CLIENT] Proof public signals: {public_signals}")
+        public_signals = [str(self.g0), str(self.commitment)]
+        proof = None
+        if matches:
+            proof = self._cached_proof(public_signals)
+        if proof is None:
+            try:
+                proof, public_signals = generate_proof(self.g0, secret_x, self.commitment)
+            except ZkSnarkDependencyError as exc:
+                raise RuntimeError(str(exc)) from exc
+            if self.proof_cache is not None:
+                self.proof_cache.put(public_signals, proof)
+        logger.debug("login payload for %s, public signals %s", hr_id, public_signals)
 
-        return {
+        payload = {
             "hr_id": hr_id,
             "proof": proof,
             "public_signals": public_signals,
         }
+        if challenge is not None:
+            payload["binding"] = proof_binding(secret_x, challenge, proof)
+        return payload
 
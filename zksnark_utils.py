@@ -1,12 +1,24 @@
+import atexit
 import json
+import logging
 import os
+import shlex
 import subprocess
 import sys
-import tempfile
+import threading
+import time
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 import shutil
 
+from artifact_registry import ArtifactRegistry
+from metrics import METRICS
+from r1cs_witness import WitnessError, encode_wtns, get_witness_calculator
+from scratch_io import resolve_mode, scratch_space
+from snarkjs_pool import SnarkjsWorkerPool, WorkerJobError, WorkerPoolError
+
+logger = logging.getLogger(__name__)
+
 # On Windows, just use "snarkjs" and let shell find it
 # On Unix, try to find the full path
 if sys.platform == "win32":
@@ -22,40 +34,108 @@ CIRCUIT_NAME = "auth"
 WASM_PATH = DEFAULT_BUILD_DIR / f"{CIRCUIT_NAME}_js" / f"{CIRCUIT_NAME}.wasm"
 ZKEY_PATH = DEFAULT_KEYS_DIR / f"{CIRCUIT_NAME}_proving_key.zkey"
 VERIFICATION_KEY_PATH = DEFAULT_KEYS_DIR / f"{CIRCUIT_NAME}_verification_key.json"
+R1CS_PATH = DEFAULT_BUILD_DIR / f"{CIRCUIT_NAME}.r1cs"
+SYM_PATH = DEFAULT_BUILD_DIR / f"{CIRCUIT_NAME}.sym"
+
+# "snarkjs" runs `snarkjs wtns calculate` on the wasm; "native" solves the
+# .r1cs in-process (see r1cs_witness.py) and only spawns snarkjs to prove.
+WITNESS_BACKEND = os.environ.get("ZKSNARK_WITNESS_BACKEND", "snarkjs")
+
+# "snarkjs" proves with the CLI (or the worker pool); "native" computes the
+# witness and the proof in-process (r1cs_witness + groth16_prover), with no
+# Node toolchain and no temp files.
+PROVE_BACKENDS = ("snarkjs", "native")
+PROVE_BACKEND = os.environ.get("ZKSNARK_PROVE_BACKEND", "snarkjs")
+
+# "snarkjs" shells out to the CLI; "native" uses the in-process verifier in groth16_verifier.
+VERIFY_BACKENDS = ("snarkjs", "native")
+VERIFY_BACKEND = os.environ.get("ZKSNARK_VERIFY_BACKEND", "snarkjs")
+
+# Where spawn-per-call snarkjs runs exchange files: "disk" (a fresh temp dir per
+# call), "shm" or "memfd" (per-thread buffers in memory, reused); see scratch_io.py.
+SCRATCH_MODE = resolve_mode(os.environ.get("ZKSNARK_SCRATCH", "disk"))
+
+# Persistent snarkjs workers (see snarkjs_pool.py). A size of 0 keeps the
+# spawn-per-call behaviour. SNARKJS_WORKER_CMD replaces "node snarkjs_worker.js"
+# (e.g. with a stand-in worker); the artifact paths are always appended.
+SNARKJS_POOL_SIZE = int(os.environ.get("SNARKJS_POOL_SIZE", "0"))
+SNARKJS_JOB_TIMEOUT = float(os.environ.get("SNARKJS_JOB_TIMEOUT", "30"))
+SNARKJS_WORKER_CMD = os.environ.get("SNARKJS_WORKER_CMD")
+WORKER_SCRIPT_PATH = Path(__file__).resolve().parent / "scripts" / "snarkjs_worker.js"
 
 
 class ZkSnarkDependencyError(RuntimeError):
     """Raised when required zkSNARK tooling or artifacts are missing."""
 
 
-def _check_artifacts() -> None:
-    missing = []
-    for path in (WASM_PATH, ZKEY_PATH, VERIFICATION_KEY_PATH):
-        if not Path(path).exists():
-            missing.append(str(path))
+# Artifacts are validated once and re-read only when they change on disk;
+# the state is reported under "artifacts" in /api/health.
+ARTIFACTS = ArtifactRegistry({
+    "wasm": WASM_PATH,
+    "zkey": ZKEY_PATH,
+    "vkey": VERIFICATION_KEY_PATH,
+})
+
+
+def _check_artifact_files(names: List[str] = None) -> None:
+    problems = ARTIFACTS.problems(names)
+    missing = [path for path, error in problems.items() if error == "missing"]
     if missing:
         raise ZkSnarkDependencyError(
             "Missing zkSNARK artifacts. Run 'pwsh scripts/setup_snark.ps1' first. "
             f"Missing: {', '.join(missing)}"
         )
+    if problems:
+        raise ZkSnarkDependencyError(
+            "Invalid zkSNARK artifacts: "
+            + "; ".join(f"{path} ({error})" for path, error in problems.items())
+        )
+
 
+def _probe_snarkjs() -> bool:
     try:
         use_shell = sys.platform == "win32"
         result = subprocess.run([SNARKJS_CMD, "--version"], capture_output=True, shell=use_shell)
-        # snarkjs returns non-zero exit code even for --version, so just check it ran
-        if result.returncode > 100 or (result.returncode != 0 and not result.stdout):
-            raise subprocess.CalledProcessError(result.returncode, SNARKJS_CMD)
-    except (subprocess.CalledProcessError, FileNotFoundError) as exc:
+    except (OSError, subprocess.SubprocessError):
+        return False
+    # snarkjs returns non-zero exit code even for --version, so just check it ran
+    return not (result.returncode > 100 or (result.returncode != 0 and not result.stdout))
+
+
+def _check_artifacts() -> None:
+    _check_artifact_files()
+
+    if not ARTIFACTS.check_tool("snarkjs", SNARKJS_CMD, _probe_snarkjs):
         raise ZkSnarkDependencyError(
             f"snarkjs CLI not available at '{SNARKJS_CMD}'. Install via 'npm install -g snarkjs' "
             "and ensure it's on PATH or set SNARKJS_PATH."
-        ) from exc
+        )
+
+
+# Metrics stage for each snarkjs subcommand; process creation is timed
+# separately as "process_spawn".
+_SNARKJS_STAGES = {
+    ("wtns", "calculate"): "witness_snarkjs",
+    ("groth16", "prove"): "prove_snarkjs",
+    ("groth16", "verify"): "verify_snarkjs_cli",
+}
 
 
-def _run_snarkjs(args: List[str]) -> subprocess.CompletedProcess:
+def _run_snarkjs(args: List[str], pass_fds=()) -> subprocess.CompletedProcess:
     # On Windows, use shell=True to properly execute .cmd files
     use_shell = sys.platform == "win32"
-    result = subprocess.run(args, capture_output=True, text=True, shell=use_shell)
+    with METRICS.timer("process_spawn"):
+        proc = subprocess.Popen(
+            args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, shell=use_shell, pass_fds=pass_fds
+        )
+    with METRICS.timer(_SNARKJS_STAGES.get(tuple(args[1:3]), "snarkjs")):
+        try:
+            stdout, stderr = proc.communicate()
+        except BaseException:
+            proc.kill()
+            proc.wait()
+            raise
+    result = subprocess.CompletedProcess(args, proc.returncode, stdout, stderr)
     if result.returncode != 0:
         raise RuntimeError(
             f"Command {' '.join(args)} failed with code {result.returncode}:\n{result.stderr}"
@@ -63,67 +143,260 @@ def _run_snarkjs(args: List[str]) -> subprocess.CompletedProcess:
     return result
 
 
-def generate_proof(g0: int, secret_x: int, commitment_y: int) -> Tuple[Dict, List[str]]:
+_worker_pool: Optional[SnarkjsWorkerPool] = None
+_worker_pool_lock = threading.Lock()
+# Arguments of the last enable_worker_pool call, reused when hot-swapped
+# artifacts force a restart.
+_worker_pool_args: Tuple = (None, None, None)
+_worker_pool_stale = False
+
+
+def _artifact_changed(name: str) -> None:
+    global _worker_pool_stale
+    # The native prover and verifier (and bn254 behind them) are imported on
+    # first use; a module that was never loaded has nothing cached.
+    if name == "zkey" and "groth16_prover" in sys.modules:
+        sys.modules["groth16_prover"].forget_prover(ZKEY_PATH)
+    elif name == "vkey" and "groth16_verifier" in sys.modules:
+        sys.modules["groth16_verifier"].forget_verifier(VERIFICATION_KEY_PATH)
+    # Workers hold every artifact in memory.
+    _worker_pool_stale = True
+
+
+ARTIFACTS.on_change(_artifact_changed)
+
+
+def _worker_command() -> List[str]:
+    if SNARKJS_WORKER_CMD:
+        prefix = shlex.split(SNARKJS_WORKER_CMD, posix=sys.platform != "win32")
+    else:
+        prefix = [shutil.which("node") or "node", str(WORKER_SCRIPT_PATH)]
+    return prefix + [str(WASM_PATH), str(ZKEY_PATH), str(VERIFICATION_KEY_PATH)]
+
+
+def _start_worker_pool(size: int = None, command: List[str] = None, job_timeout: float = None):
+    # Caller holds _worker_pool_lock.
+    _check_artifact_files()
+    try:
+        return SnarkjsWorkerPool(
+            command or _worker_command(),
+            size=size or SNARKJS_POOL_SIZE or 1,
+            job_timeout=job_timeout or SNARKJS_JOB_TIMEOUT,
+        )
+    except WorkerPoolError as exc:
+        raise ZkSnarkDependencyError(
+            f"Could not start snarkjs workers: {exc}. Install snarkjs and set NODE_PATH, "
+            "or set SNARKJS_POOL_SIZE=0 to spawn the CLI per call."
+        ) from exc
+
+
+def enable_worker_pool(
+    size: int = None, command: List[str] = None, job_timeout: float = None
+) -> SnarkjsWorkerPool:
+    """Start (or restart) the snarkjs worker pool used by generate_proof and verify_proof."""
+    global _worker_pool, _worker_pool_args, _worker_pool_stale
+    with _worker_pool_lock:
+        if _worker_pool is not None:
+            _worker_pool.shutdown()
+            _worker_pool = None
+        _worker_pool_args = (size, command, job_timeout)
+        _worker_pool = _start_worker_pool(size, command, job_timeout)
+        _worker_pool_stale = False
+        return _worker_pool
+
+
+def get_worker_pool() -> Optional[SnarkjsWorkerPool]:
+    """
+    Return the active worker pool, starting it on first use when SNARKJS_POOL_SIZE > 0.
+
+    A running pool is restarted if the artifacts changed on disk since its
+    workers loaded them.
     """
-    Generate a Groth16 proof using snarkjs for the relation Poseidon(g0, X) = Y.
+    global _worker_pool, _worker_pool_stale
+    if _worker_pool is None and SNARKJS_POOL_SIZE <= 0:
+        return None
+    ARTIFACTS.refresh()
+    if _worker_pool is None or _worker_pool_stale:
+        with _worker_pool_lock:
+            if _worker_pool is not None and _worker_pool_stale:
+                _worker_pool.shutdown()
+                _worker_pool = None
+            if _worker_pool is None:
+                _worker_pool = _start_worker_pool(*_worker_pool_args)
+                _worker_pool_stale = False
+    return _worker_pool
+
+
+def shutdown_worker_pool() -> None:
+    global _worker_pool
+    with _worker_pool_lock:
+        if _worker_pool is not None:
+            _worker_pool.shutdown()
+            _worker_pool = None
+
+
+atexit.register(shutdown_worker_pool)
+
+
+def calculate_witness(input_payload: Dict) -> List[int]:
+    """Compute the circuit witness in-process from the .r1cs/.sym files."""
+    try:
+        calculator = get_witness_calculator(R1CS_PATH, SYM_PATH)
+    except FileNotFoundError as exc:
+        raise ZkSnarkDependencyError(
+            "Missing circuit constraint files. Run 'pwsh scripts/setup_snark.ps1' first. "
+            f"Missing: {exc.filename}"
+        ) from exc
+    try:
+        with METRICS.timer("witness_native"):
+            return calculator.calculate(input_payload)
+    except WitnessError as exc:
+        raise RuntimeError(f"Witness generation failed: {exc}") from exc
+
+
+def _native_prover():
+    from groth16_prover import get_prover
+
+    _check_artifact_files(["zkey"])
+    return get_prover(ZKEY_PATH)
+
+
+def _generate_proof_native(input_payload: Dict) -> Tuple[Dict, List[str]]:
+    prover = _native_prover()
+    witness = calculate_witness(input_payload)
+    with METRICS.timer("prove_native"):
+        return prover.prove(witness)
+
+
+def generate_proof(
+    g0: int, secret_x: int, commitment_y: int, backend: str = None
+) -> Tuple[Dict, List[str]]:
+    """
+    Generate a Groth16 proof for the relation Poseidon(g0, X) = Y.
+
+    ``backend`` selects between snarkjs and the in-process prover; it
+    defaults to the ZKSNARK_PROVE_BACKEND environment variable.
 
     Returns a tuple of (proof_json, public_signals).
     """
+    input_payload = {
+        "g0": str(int(g0)),
+        "Y": str(int(commitment_y)),
+        "X": str(int(secret_x)),
+    }
+    # X is the witness; never log it.
+    logger.debug("proving g0=%s Y=%s", input_payload["g0"], input_payload["Y"])
+
+    backend = backend or PROVE_BACKEND
+    try:
+        with METRICS.timer("generate_proof"):
+            result = _generate_proof(input_payload, backend)
+    except ZkSnarkDependencyError:
+        METRICS.inc("zkp_proof_generation_total", outcome="dependency_error")
+        raise
+    except Exception:
+        METRICS.inc("zkp_proof_generation_total", outcome="error")
+        raise
+    METRICS.inc("zkp_proof_generation_total", outcome="ok")
+    return result
+
+
+def _generate_proof(input_payload: Dict, backend: str) -> Tuple[Dict, List[str]]:
+    if backend == "native":
+        return _generate_proof_native(input_payload)
+    if backend != "snarkjs":
+        raise ValueError(f"Unknown prove backend '{backend}', expected one of {PROVE_BACKENDS}")
+
+    pool = get_worker_pool()
+    if pool is not None:
+        try:
+            with METRICS.timer("prove_pool"):
+                return pool.prove(input_payload)
+        except WorkerJobError:
+            raise
+        except WorkerPoolError as exc:
+            raise ZkSnarkDependencyError(f"snarkjs worker pool unavailable: {exc}") from exc
+
     _check_artifacts()
 
-    with tempfile.TemporaryDirectory() as temp_dir:
-        temp_path = Path(temp_dir)
-        input_json = temp_path / "input.json"
-        witness_wtns = temp_path / "witness.wtns"
-        proof_json = temp_path / "proof.json"
-        public_json = temp_path / "public.json"
-
-        input_payload = {
-            "g0": str(int(g0)),
-            "Y": str(int(commitment_y)),
-            "X": str(int(secret_x)),
-        }
-        print(f"[DEBUG SNARK] Input payload: {input_payload}")
-        input_json.write_text(json.dumps(input_payload), encoding="utf-8")
+    outputs = ("proof.json", "public.json") if WITNESS_BACKEND == "native" else (
+        "witness.wtns", "proof.json", "public.json"
+    )
+    with scratch_space(SCRATCH_MODE, outputs) as scratch:
+        if WITNESS_BACKEND == "native":
+            witness = encode_wtns(calculate_witness(input_payload))
+            with METRICS.timer("scratch_io"):
+                scratch.write("witness.wtns", witness)
+        else:
+            with METRICS.timer("json"):
+                data = json.dumps(input_payload).encode("utf-8")
+            with METRICS.timer("scratch_io"):
+                scratch.write("input.json", data)
 
-        _run_snarkjs([
-            SNARKJS_CMD,
-            "wtns",
-            "calculate",
-            str(WASM_PATH),
-            str(input_json),
-            str(witness_wtns),
-        ])
+            _run_snarkjs([
+                SNARKJS_CMD,
+                "wtns",
+                "calculate",
+                str(WASM_PATH),
+                scratch.path("input.json"),
+                scratch.path("witness.wtns"),
+            ], scratch.pass_fds())
 
         _run_snarkjs([
             SNARKJS_CMD,
             "groth16",
             "prove",
             str(ZKEY_PATH),
-            str(witness_wtns),
-            str(proof_json),
-            str(public_json),
-        ])
+            scratch.path("witness.wtns"),
+            scratch.path("proof.json"),
+            scratch.path("public.json"),
+        ], scratch.pass_fds())
 
-        proof = json.loads(proof_json.read_text(encoding="utf-8"))
-        public_signals = json.loads(public_json.read_text(encoding="utf-8"))
-        
-        print(f"[DEBUG SNARK] Public signals from proof: {public_signals}")
+        with METRICS.timer("scratch_io"):
+            proof_data = scratch.read("proof.json")
+            public_data = scratch.read("public.json")
+        with METRICS.timer("json"):
+            proof = json.loads(proof_data)
+            public_signals = json.loads(public_data)
+        logger.debug("snarkjs public signals: %s", public_signals)
 
     return proof, public_signals
 
 
-def verify_proof(proof: Dict, public_signals: List[str]) -> bool:
-    """Verify a Groth16 proof using snarkjs verify command."""
-    _check_artifacts()
+def rerandomize_proof(proof: Dict) -> Dict:
+    """
+    Return a fresh, unlinkable proof for the same statement as ``proof``.
+
+    Works on proofs from either prove backend; only delta2 is read from the
+    proving key.
+    """
+    from groth16_prover import rerandomize_proof as rerandomize
+
+    return rerandomize(proof, _native_prover().key.delta2)
+
+
+def _verify_proof_snarkjs(proof: Dict, public_signals: List[str]) -> Optional[bool]:
+    pool = get_worker_pool()
+    if pool is not None:
+        try:
+            with METRICS.timer("verify_pool"):
+                return pool.verify(proof, public_signals)
+        except WorkerJobError:
+            # The worker failed on this job: no verdict, which callers treat as
+            # a rejection but must not remember as an invalid proof.
+            return None
+        except WorkerPoolError as exc:
+            raise ZkSnarkDependencyError(f"snarkjs worker pool unavailable: {exc}") from exc
 
-    with tempfile.TemporaryDirectory() as temp_dir:
-        temp_path = Path(temp_dir)
-        proof_json = temp_path / "proof.json"
-        public_json = temp_path / "public.json"
+    _check_artifacts()
 
-        proof_json.write_text(json.dumps(proof), encoding="utf-8")
-        public_json.write_text(json.dumps(public_signals), encoding="utf-8")
+    with scratch_space(SCRATCH_MODE) as scratch:
+        with METRICS.timer("json"):
+            proof_data = json.dumps(proof).encode("utf-8")
+            public_data = json.dumps(public_signals).encode("utf-8")
+        with METRICS.timer("scratch_io"):
+            scratch.write("proof.json", proof_data)
+            scratch.write("public.json", public_data)
 
         try:
             _run_snarkjs([
@@ -131,9 +404,123 @@ def verify_proof(proof: Dict, public_signals: List[str]) -> bool:
                 "groth16",
                 "verify",
                 str(VERIFICATION_KEY_PATH),
-                str(public_json),
-                str(proof_json),
-            ])
+                scratch.path("public.json"),
+                scratch.path("proof.json"),
+            ], scratch.pass_fds())
         except RuntimeError:
             return False
     return True
+
+
+def _native_verifier():
+    from groth16_verifier import get_verifier
+
+    _check_artifact_files(["vkey"])
+    return get_verifier(VERIFICATION_KEY_PATH)
+
+
+def _verify_proof_native(proof: Dict, public_signals: List[str]) -> bool:
+    return _native_verifier().verify(proof, public_signals)
+
+
+def verify_proof(proof: Dict, public_signals: List[str], backend: str = None) -> Optional[bool]:
+    """
+    Verify a Groth16 proof.
+
+    ``backend`` selects between the snarkjs CLI and the in-process verifier;
+    it defaults to the ZKSNARK_VERIFY_BACKEND environment variable.  Returns
+    None instead of a verdict when a snarkjs worker fails on the job.
+    """
+    backend = backend or VERIFY_BACKEND
+    if backend == "native":
+        verify = _verify_proof_native
+    elif backend == "snarkjs":
+        verify = _verify_proof_snarkjs
+    else:
+        raise ValueError(f"Unknown verify backend '{backend}', expected one of {VERIFY_BACKENDS}")
+    try:
+        with METRICS.timer(f"verify_{backend}"):
+            valid = verify(proof, public_signals)
+    except ZkSnarkDependencyError:
+        METRICS.inc("zkp_verify_outcomes_total", verdict="dependency_error")
+        raise
+    METRICS.inc("zkp_verify_outcomes_total", verdict="error" if valid is None else "valid" if valid else "invalid")
+    return valid
+
+
+def verify_proofs_batch(
+    proofs: List[Dict], public_signals_list: List[List[str]], backend: str = None
+) -> List[Optional[bool]]:
+    """
+    Verify several Groth16 proofs and return one verdict per proof.
+
+    The native backend checks a random linear combination of all proofs with
+    a single final exponentiation and bisects to find bad proofs when the
+    combined check fails; the snarkjs backend verifies them one by one.  As
+    with verify_proof, an entry is None instead of a verdict when a snarkjs
+    worker failed on that proof's job; callers must not treat it as invalid.
+    """
+    if len(proofs) != len(public_signals_list):
+        raise ValueError("proofs and public_signals_list must have the same length")
+    backend = backend or VERIFY_BACKEND
+    if backend == "native":
+        if not proofs:
+            return []
+        with METRICS.timer("verify_batch_native"):
+            verdicts = _native_verifier().verify_batch(proofs, public_signals_list)
+        valid = sum(1 for v in verdicts if v)
+        METRICS.inc("zkp_verify_outcomes_total", valid, verdict="valid")
+        METRICS.inc("zkp_verify_outcomes_total", len(verdicts) - valid, verdict="invalid")
+        return verdicts
+    return [
+        verify_proof(proof, public_signals, backend=backend)
+        for proof, public_signals in zip(proofs, public_signals_list)
+    ]
+
+
+def _warm_up_proof() -> Tuple[Dict, List[str]]:
+    # A well-formed proof built from the verification key's own points, with
+    # all-zero public signals: it parses and runs the full check, and fails it.
+    vkey = json.loads(VERIFICATION_KEY_PATH.read_text(encoding="utf-8"))
+    proof = {
+        "pi_a": vkey["vk_alpha_1"],
+        "pi_b": vkey["vk_beta_2"],
+        "pi_c": vkey["vk_alpha_1"],
+        "protocol": "groth16",
+        "curve": "bn128",
+    }
+    return proof, ["0"] * int(vkey["nPublic"])
+
+
+def warm_up_verifier(backend: str = None) -> Dict[str, float]:
+    """
+    Load the verifier for ``backend`` and run one verification, so the first
+    login does not pay for it; returns the seconds each step took.
+
+    The native backend parses the verification key; the snarkjs backend
+    starts the worker pool, or checks the artifacts and the CLI when there is
+    none.  The proof checked is invalid by construction and is not counted in
+    the verification outcomes.  Raises ZkSnarkDependencyError like
+    verify_proof, and RuntimeError if the check gives no verdict.
+    """
+    backend = backend or VERIFY_BACKEND
+    if backend not in VERIFY_BACKENDS:
+        raise ValueError(f"Unknown verify backend '{backend}', expected one of {VERIFY_BACKENDS}")
+    timings = {}
+    started = time.perf_counter()
+    if backend == "native":
+        _native_verifier()
+    elif get_worker_pool() is None:
+        _check_artifacts()
+    timings["verifier_load"] = time.perf_counter() - started
+
+    proof, public_signals = _warm_up_proof()
+    started = time.perf_counter()
+    verify = _verify_proof_native if backend == "native" else _verify_proof_snarkjs
+    verdict = verify(proof, public_signals)
+    timings["first_verify"] = time.perf_counter() - started
+    if verdict is None:
+        raise RuntimeError("Warm-up verification got no verdict from the snarkjs workers")
+    if verdict:
+        logger.warning("warm-up proof unexpectedly verified with the %s backend", backend)
+    return timings